@@ -0,0 +1,92 @@
+"""Cold import time of the application, checked against a budget.
+
+Each run imports the target module in a fresh interpreter and subtracts the time of an empty
+interpreter start, so the figure is what a container start or a new worker process pays for our
+imports. The run fails (exit status 1) when the median exceeds --budget-ms or when one of the
+dependencies that must only load on first use (datahugger, sickle, requests, psycopg2, asyncpg)
+was imported, so it can be used as a CI check:
+
+    python -m benchmarks.bench_import_time --budget-ms 1200
+    python -m benchmarks.bench_import_time --module src.filemetrix.api.v1.pid_fetcher --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFERRED = ("datahugger", "sickle", "requests", "psycopg2", "asyncpg")
+
+_PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(m for m in {deferred!r} if m in sys.modules)))
+"""
+
+
+def _run(code: str, importtime: bool = False) -> tuple[float, subprocess.CompletedProcess]:
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    start = time.perf_counter()
+    result = subprocess.run(args, capture_output=True, text=True, env=os.environ.copy())
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(f"Importing failed:\n{result.stderr}")
+    return elapsed, result
+
+
+def measure(module: str, runs: int) -> tuple[float, float, list[str]]:
+    """(median seconds for the import, median interpreter baseline, deferred modules that were loaded)."""
+    probe = _PROBE.format(module=module, deferred=DEFERRED)
+    _run(probe)  # warm the bytecode cache, as a deployed image would have it
+    baseline = statistics.median(_run("pass")[0] for _ in range(runs))
+    timings, loaded = [], []
+    for _ in range(runs):
+        elapsed, result = _run(probe)
+        timings.append(elapsed)
+        loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return statistics.median(timings) - baseline, baseline, loaded
+
+
+def top_packages(module: str, count: int) -> list[tuple[int, str]]:
+    """The `count` slowest packages (cumulative microseconds of their first import) from `-X importtime`."""
+    _, result = _run(f"import {module}", importtime=True)
+    own = module.split(".")[0]
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if cumulative.strip().isdigit() and "." not in name and name not in (own, "site", "encodings"):
+            rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.filemetrix.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1200.0)
+    parser.add_argument("--top", type=int, default=10, help="Show the slowest imported packages (0 to skip)")
+    args = parser.parse_args()
+
+    seconds, baseline, loaded = measure(args.module, args.runs)
+    print(f"import {args.module}: {seconds * 1000:.0f} ms (median of {args.runs}, "
+          f"interpreter start {baseline * 1000:.0f} ms excluded), budget {args.budget_ms:.0f} ms")
+    for cumulative, name in top_packages(args.module, args.top) if args.top else []:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported at startup instead of on first use: {', '.join(loaded)}")
+        failed = True
+    if seconds * 1000 > args.budget_ms:
+        print("FAIL: import time exceeds the budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Concurrent-request throughput of the metric endpoints, sync vs async DB layer.
+
+"before" mounts endpoints that call the synchronous infra/db.py helpers directly from
+`async def` handlers (the old repo_metrics behaviour); "after" mounts the real repo_metrics
+router, which uses the async engine. While the metric requests are in flight, a light probe
+endpoint is polled to show how long unrelated requests wait behind them.
+
+Needs a reachable Postgres configured through the usual DB_* settings:
+
+    python -m benchmarks.bench_metrics_concurrency --requests 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from src.filemetrix.api.v1 import repo_metrics
+from src.filemetrix.infra.commons import API_PREFIX
+from src.filemetrix.infra.db import get_dataset_count, get_file_metadata_count_grouped_by_mime_type, dispose_engines
+
+PATHS = [f"{API_PREFIX}/dataset/count", f"{API_PREFIX}/file-metadata/count/grouped/mime_type"]
+
+
+def build_before_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get(PATHS[0])
+    async def dataset_count():
+        return JSONResponse(content={"total-datasets": get_dataset_count()})
+
+    @app.get(PATHS[1])
+    async def grouped_by_mime_type():
+        return JSONResponse(content=get_file_metadata_count_grouped_by_mime_type())
+
+    @app.get("/probe")
+    async def probe():
+        return {"status": "ok"}
+
+    return app
+
+
+def build_after_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(repo_metrics.router)
+
+    @app.get("/probe")
+    async def probe():
+        return {"status": "ok"}
+
+    return app
+
+
+async def run(app: FastAPI, total: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                response = await client.get(PATHS[i % len(PATHS)])
+                response.raise_for_status()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/probe")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    probe_latencies.sort()
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "probe_p50_ms": round(statistics.median(probe_latencies) * 1000, 2) if probe_latencies else None,
+        "probe_max_ms": round(probe_latencies[-1] * 1000, 2) if probe_latencies else None,
+    }
+
+
+async def main(total: int, concurrency: int):
+    for label, app in (("before (sync helpers)", build_before_app()), ("after (async engine)", build_after_app())):
+        print(f"{label}: {await run(app, total, concurrency)}")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,115 @@
+"""Onedata share crawl time against a local mock Onezone REST server, by crawl parallelism.
+
+The mock serves `/shares/{id}/public` and paged `/shares/data/{id}/children` listings for
+synthetic trees, answering each request after `--latency` seconds:
+
+- deep: a chain of `--depth` nested directories, each holding a few files
+- wide: one root with `--width` subdirectories, each holding a few files
+- paged: one directory with `--files` files, listed `--page-size` entries per page
+
+Deep chains are inherently sequential; wide trees should scale with parallelism. No network
+access is needed:
+
+    python -m benchmarks.bench_onedata_crawl --latency 0.02 --parallelism 1 4 8 16
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.filemetrix.services import onedata_hugger
+
+FILES_PER_DIR = 3
+
+
+def build_tree(kind: str, depth: int, width: int, files: int) -> dict[str, list[dict]]:
+    """Directory id -> children, rooted at "root"."""
+    tree = {}
+
+    def files_of(dir_id: str, count: int) -> list[dict]:
+        return [{"fileId": f"{dir_id}-f{i}", "name": f"file{i}.txt", "type": "REG", "size": 1024}
+                for i in range(count)]
+
+    if kind == "deep":
+        for level in range(depth):
+            dir_id = "root" if level == 0 else f"d{level}"
+            children = files_of(dir_id, FILES_PER_DIR)
+            if level + 1 < depth:
+                children.append({"fileId": f"d{level + 1}", "name": f"dir{level + 1}", "type": "DIR"})
+            tree[dir_id] = children
+    elif kind == "wide":
+        tree["root"] = [{"fileId": f"w{i}", "name": f"dir{i}", "type": "DIR"} for i in range(width)]
+        for i in range(width):
+            tree[f"w{i}"] = files_of(f"w{i}", FILES_PER_DIR)
+    else:
+        tree["root"] = files_of("root", files)
+    return tree
+
+
+def start_mock_server(tree: dict, latency: float, page_size: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(latency)
+            path = self.path.removeprefix("/api/v3/onezone")
+            if path.endswith("/public"):
+                payload = {"rootFileId": "root", "spaceId": "space", "fileType": "DIR"}
+            else:
+                dir_id = path.removeprefix("/shares/data/").removesuffix("/children")
+                children = tree.get(dir_id, [])
+                start = int(body.get("token") or 0)
+                end = start + page_size
+                payload = {"children": children[start:end], "isLast": end >= len(children),
+                           "nextPageToken": str(end) if end < len(children) else None}
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(domain: str, parallelism: int) -> tuple[int, float]:
+    start = time.perf_counter()
+    files = onedata_hugger.gather_file_infos_for_directory(domain, "space", "root", parallelism=parallelism)
+    return len(files), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server delay per request (s)")
+    parser.add_argument("--depth", type=int, default=50)
+    parser.add_argument("--width", type=int, default=200)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    onedata_hugger.REST_API_SCHEME = "http"
+    print(f"{'tree':<6} {'parallelism':>11} {'files':>7} {'seconds':>8} {'files/s':>9}")
+    for kind in ("deep", "wide", "paged"):
+        server = start_mock_server(build_tree(kind, args.depth, args.width, args.files), args.latency, args.page_size)
+        domain = f"127.0.0.1:{server.server_port}"
+        try:
+            for parallelism in args.parallelism:
+                count, seconds = crawl(domain, parallelism)
+                print(f"{kind:<6} {parallelism:>11} {count:>7} {seconds:>8.3f} {count / seconds:>9.0f}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Onedata share resolution time with a cold and a warm share cache, against a local mock server.
+
+Each identifier is a URL that redirects `--hops` times before reaching a Onedata share link, as a
+DOI behind a landing page does; the mock also serves the share's `/public` document. Every request
+is answered after `--latency` seconds. The first round walks every redirect chain, later rounds
+should be answered from the cache without any request. No network access is needed:
+
+    python -m benchmarks.bench_onedata_shares --identifiers 50 --hops 3 --rounds 3
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.filemetrix.services import onedata_hugger
+from src.filemetrix.services.onedata_shares import OnedataShareCache
+
+
+def start_mock_server(hops: int, latency: float) -> tuple[ThreadingHTTPServer, list]:
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_HEAD(self):
+            # /id/{k}/{hop}: redirect to the next hop, then to the share of identifier k.
+            requests_seen.append(self.path)
+            time.sleep(latency)
+            _, _, k, hop = self.path.split("/")
+            if int(hop) + 1 < hops:
+                location = f"http://{self.headers['Host']}/id/{k}/{int(hop) + 1}"
+            else:
+                location = f"https://{self.headers['Host']}/share/s{k}"
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            requests_seen.append(self.path)
+            time.sleep(latency)
+            data = json.dumps({"rootFileId": "root", "spaceId": "space", "fileType": "DIR"}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests_seen
+
+
+def resolve_all(identifiers: list[str]) -> float:
+    start = time.perf_counter()
+    for identifier in identifiers:
+        onedata_hugger._share_public(*onedata_hugger.find_share(identifier, onedata_hugger.MAX_REDIRECTS))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock server delay per request (s)")
+    parser.add_argument("--identifiers", type=int, default=50)
+    parser.add_argument("--hops", type=int, default=3, help="Redirects before the share link")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    onedata_hugger.REST_API_SCHEME = "http"
+    onedata_hugger.onedata_share_cache = OnedataShareCache()
+    server, requests_seen = start_mock_server(args.hops, args.latency)
+    identifiers = [f"http://127.0.0.1:{server.server_port}/id/{k}/0" for k in range(args.identifiers)]
+    print(f"{'round':<6} {'lookups':>7} {'requests':>8} {'seconds':>8} {'lookups/s':>10}")
+    try:
+        for round_number in range(1, args.rounds + 1):
+            before = len(requests_seen)
+            seconds = resolve_all(identifiers)
+            print(f"{round_number:<6} {len(identifiers):>7} {len(requests_seen) - before:>8} {seconds:>8.3f} "
+                  f"{len(identifiers) / seconds:>10.0f}")
+    finally:
+        server.shutdown()
+    print(f"cache: {onedata_hugger.onedata_share_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Serialization time and bytes on the wire for the large JSON endpoints.
+
+Serves synthetic payloads shaped like `/repos` (RepositoryModel rows), `/repositories` (the
+re3data list) and a PID file listing through two in-process apps:
+
+- before: the standard JSONResponse, with the model_dump/isoformat pass repo_metrics used and the
+  file listing returned as a dict (FastAPI's jsonable_encoder)
+- after: infra.responses.JSONResponse (orjson) behind the compression middleware
+
+Each request goes through the full ASGI stack; the table shows the median time per request and
+the response size for every Accept-Encoding the app can produce. No database is needed:
+
+    python -m benchmarks.bench_serialization --repos 500 --registry 3000 --files 50000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse as StandardJSONResponse
+
+from src.filemetrix.infra.db import HarvestStatus, RepositoryModel
+from src.filemetrix.infra.responses import JSONResponse, add_compression
+
+
+def make_repos(count: int) -> list[RepositoryModel]:
+    start = datetime(2024, 1, 1)
+    return [RepositoryModel(id=i, name=f"Repository {i}", url=f"https://repo{i}.example.org/oai",
+                            metadata_prefix="oai_datacite", metadata_format="datacite",
+                            harvest_ds_start=start + timedelta(hours=i), harvest_ds_end=start + timedelta(hours=i, minutes=30),
+                            harvest_ds_status=HarvestStatus.COMPLETED)
+            for i in range(count)]
+
+
+def make_registry(count: int) -> list[dict]:
+    return [{"id": f"r3d1000{i:05d}", "doi": f"https://doi.org/10.17616/R3{i:05d}", "name": f"Data Archive {i}",
+             "link": {"@href": f"https://www.re3data.org/api/beta/repository/r3d1000{i:05d}"}}
+            for i in range(count)]
+
+
+def make_files(count: int) -> list[dict]:
+    return [{"name": f"data/part-{i:06d}.csv", "link": f"https://dataverse.example.org/api/access/datafile/{i}",
+             "size": 1024 * (i % 5000), "hash": f"{i:032x}", "hash_type": "md5",
+             "raw_metadata": {"contentType": "text/csv", "checksum": {"value": f"{i:032x}", "type": "MD5"},
+                              "fileAccessRequest": False, "publicationDate": "2024-05-01"}}
+            for i in range(count)]
+
+
+def build_before_app(repos, registry, files) -> FastAPI:
+    app = FastAPI()
+
+    def serialize(obj):
+        data = obj.model_dump()
+        for k, v in data.items():
+            if isinstance(v, datetime):
+                data[k] = v.isoformat()
+        return data
+
+    @app.get("/repos")
+    async def get_repos():
+        return StandardJSONResponse(content=[serialize(repo) for repo in repos])
+
+    @app.get("/repositories")
+    async def get_repositories():
+        return StandardJSONResponse(content=registry)
+
+    @app.get("/pid")
+    async def get_pid():
+        return {"files": files}
+
+    return app
+
+
+def build_after_app(repos, registry, files) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+    add_compression(app)
+
+    @app.get("/repos")
+    async def get_repos():
+        return JSONResponse(content=repos)
+
+    @app.get("/repositories")
+    async def get_repositories():
+        return JSONResponse(content=registry)
+
+    @app.get("/pid")
+    async def get_pid():
+        return JSONResponse(content={"files": files}, headers={"X-Cache": "HIT"})
+
+    return app
+
+
+async def measure(app: FastAPI, path: str, encoding: str, runs: int) -> tuple[float, int]:
+    """(median seconds per request, bytes on the wire) for `path` requested with `encoding`."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        timings, size = [], 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Accept-Encoding": encoding})
+            await response.aread()
+            timings.append(time.perf_counter() - start)
+            size = response.num_bytes_downloaded
+            response.raise_for_status()
+    return statistics.median(timings), size
+
+
+async def run(args):
+    repos, registry, files = make_repos(args.repos), make_registry(args.registry), make_files(args.files)
+    before, after = build_before_app(repos, registry, files), build_after_app(repos, registry, files)
+    encodings = ["identity", "gzip", "br"]
+    print(f"{'endpoint':<14}{'variant':<8}{'encoding':<10}{'median ms':>10}{'bytes':>12}")
+    for path, label in (("/repos", f"/repos ({args.repos})"), ("/repositories", f"/repositories ({args.registry})"),
+                        ("/pid", f"PID ({args.files})")):
+        seconds, size = await measure(before, path, "identity", args.runs)
+        print(f"{path:<14}{'before':<8}{'identity':<10}{seconds * 1000:>10.1f}{size:>12}  {label}")
+        for encoding in encodings:
+            seconds, size = await measure(after, path, encoding, args.runs)
+            print(f"{path:<14}{'after':<8}{encoding:<10}{seconds * 1000:>10.1f}{size:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=500)
+    parser.add_argument("--registry", type=int, default=3000)
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+from src.filemetrix.infra.commons import API_PREFIX
+from src.filemetrix.infra.db import get_pool_stats, get_query_stats
+from src.filemetrix.infra.lazy_import import lazy_import_stats
+from src.filemetrix.infra.mail_outbox import mail_outbox
+from src.filemetrix.infra.metrics import metrics_registry
+from src.filemetrix.infra.responses import JSONResponse
+from src.filemetrix.api.v1.pid_fetcher import single_flight_stats
+from src.filemetrix.services.data_versions import data_versions
+from src.filemetrix.services.harvest_executor import harvest_executor
+from src.filemetrix.services.oai_sets import oai_set_cache
+from src.filemetrix.services.onedata_shares import onedata_share_cache
+from src.filemetrix.services.pid_cache import pid_cache
+from src.filemetrix.services.re3data_details import re3data_details
+from src.filemetrix.services.re3data_registry import re3data_registry
+from src.filemetrix.services.resolver_pool import resolver_pool
+
+router = APIRouter(prefix=API_PREFIX)
+
+# Prometheus scrapes /metrics at the root, outside API_PREFIX and without the API key.
+metrics_router = APIRouter()
+
+
+@router.get("/internal/metrics", tags=["Internal Metrics"],
+    summary="Internal runtime metrics",
+    description="Process-local runtime statistics: DB connection pool usage and checkout wait times; per-function query latency; "
+                "PID cache hit/miss counts, coalesced PID lookups and resolver pool queue depth/wait times; re3data registry freshness; "
+                "repository detail, OAI set and Onedata share cache hits; mail outbox and harvest executor state; "
+                "lazily imported modules; repo metrics revalidations.")
+async def internal_metrics():
+    return JSONResponse(
+        status_code=200,
+        content={
+            "db_pool": get_pool_stats(),
+            "db_queries": get_query_stats(),
+            "pid_cache": pid_cache.stats(),
+            "pid_single_flight": single_flight_stats(),
+            "pid_resolver": resolver_pool.stats(),
+            "re3data_registry": re3data_registry.stats(),
+            "re3data_details": re3data_details.stats(),
+            "oai_sets": oai_set_cache.stats(),
+            "onedata_shares": onedata_share_cache.stats(),
+            "mail_outbox": mail_outbox.stats(),
+            "lazy_imports": lazy_import_stats(),
+            "harvest_executor": harvest_executor.stats(),
+            "data_versions": data_versions.stats(),
+        }
+    )
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of harvest throughput, PID fetch latency, DB pool and request latency."""
+    return Response(content=generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
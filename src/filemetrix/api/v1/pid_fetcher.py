@@ -1,31 +1,302 @@
 import asyncio
-import json
 import logging
+import math
 import time
 import xml.etree.ElementTree as ET
 from urllib.parse import unquote
 
-import datahugger
-import requests
-from datahugger import RepositoryNotSupportedError
-from datahugger.utils import get_datapublisher_from_doi, get_re3data_repositories
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from src.filemetrix.infra.commons import app_settings, API_PREFIX
+from src.filemetrix.infra.commons import API_PREFIX, get_int_setting, get_float_setting
+from src.filemetrix.infra.deadline import Deadline, DeadlineExceeded
+from src.filemetrix.infra.lazy_import import LazyModule
+from src.filemetrix.infra.metrics import PID_FETCH_SECONDS
+from src.filemetrix.infra.responses import JSONResponse, dumps
+from src.filemetrix.infra.tracing import get_tracer
 from src.filemetrix.services import onedata_hugger
+from src.filemetrix.services.harvested_files import get_harvested_files, get_harvested_extensions, \
+    find_harvested_dataset_pid, iter_harvested_files
+from src.filemetrix.services.pid_cache import pid_cache, normalize_pid
+from src.filemetrix.services.re3data_details import re3data_details
+from src.filemetrix.services.re3data_registry import re3data_registry
+from src.filemetrix.services.resolver_pool import resolver_pool, ResolverBusyError
 
 router = APIRouter(prefix=API_PREFIX)
 
+# datahugger pulls in its resolvers, requests_cache and friends; load it on the first resolution.
+datahugger = LazyModule("datahugger")
+datahugger_utils = LazyModule("datahugger.utils")
+requests = LazyModule("requests")
+
+BATCH_MAX_PIDS = get_int_setting("pid_batch_max_pids", 1000)
+BATCH_CONCURRENCY = get_int_setting("pid_batch_concurrency", 8)
+REQUEST_TIMEOUT_SECONDS = get_float_setting("pid_request_timeout_seconds", 300.0)
+MAX_REQUEST_TIMEOUT_SECONDS = get_float_setting("pid_request_timeout_max_seconds", 1800.0)
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+# Extra wait beyond the deadline so a partial listing cut off at the deadline still reaches the caller.
+PARTIAL_RESULT_GRACE_SECONDS = 0.5
+# Limit for the DOI publisher lookup and the repository's OAI GetRecord behind /repository-info.
+REPOSITORY_INFO_TIMEOUT_SECONDS = get_float_setting("repository_info_request_timeout_seconds", 30.0)
+
+
+def _cache_bypassed(request: Request) -> bool:
+    """True when the client sent `Cache-Control: no-cache` (or the HTTP/1.0 `Pragma: no-cache`)."""
+    cache_control = request.headers.get("cache-control", "").lower()
+    return "no-cache" in cache_control or "no-cache" in request.headers.get("pragma", "").lower()
+
+
+def _request_deadline(request: Request) -> Deadline:
+    """Deadline from the `X-Request-Timeout` header (seconds), capped by the configured maximum."""
+    seconds = REQUEST_TIMEOUT_SECONDS
+    header = request.headers.get(REQUEST_TIMEOUT_HEADER)
+    if header:
+        try:
+            seconds = float(header)
+        except ValueError:
+            logging.warning(f"Ignoring invalid {REQUEST_TIMEOUT_HEADER} header: {header}")
+    return Deadline(max(0.0, min(seconds, MAX_REQUEST_TIMEOUT_SECONDS)))
+
+
+def _traced_datahugger_info(pid: str):
+    with get_tracer().start_as_current_span("datahugger.info") as span:
+        span.set_attribute("filemetrix.pid", pid)
+        metadata = datahugger.info(pid, {"type": "file"})
+        span.set_attribute("filemetrix.file_count", len(metadata.files))
+        return metadata
+
+
+def _traced_onedata_info(pid: str, deadline: Deadline | None = None):
+    with get_tracer().start_as_current_span("onedata_hugger.info") as span:
+        span.set_attribute("filemetrix.pid", pid)
+        metadata = onedata_hugger.info(pid, deadline)
+        span.set_attribute("filemetrix.resolved", bool(metadata))
+        return metadata
+
+
+def _traced_onedata_pages(pid: str, deadline: Deadline | None = None):
+    with get_tracer().start_as_current_span("onedata_hugger.iter_info_pages") as span:
+        span.set_attribute("filemetrix.pid", pid)
+        pages = onedata_hugger.iter_info_pages(pid, deadline)
+        span.set_attribute("filemetrix.resolved", pages is not None)
+        return pages
+
+
+def _resolve_metadata(pid: str, deadline: Deadline | None = None, onedata_fallback: bool = True):
+    """Resolve file metadata through datahugger, falling back to Onedata, and cache complete listings.
+
+    Raises the original RepositoryNotSupportedError when neither can resolve the PID. datahugger
+    takes no timeout, so the deadline is only checked before calling it; callers stop waiting for
+    it with asyncio.wait_for. Caching here means a listing that arrives after the caller gave up
+    still serves the retry.
+    """
+    if deadline is not None:
+        deadline.check()
+    try:
+        metadata = _traced_datahugger_info(pid)
+    except datahugger.RepositoryNotSupportedError:
+        if not onedata_fallback:
+            raise
+        # fall-back and try to resolve the identifier as Onedata dataset
+        metadata = _traced_onedata_info(pid, deadline)
+        if not metadata:
+            raise
+    if not getattr(metadata, "partial", False):
+        pid_cache.put(pid, metadata.files)
+    return metadata
+
+
+# Single-flight: one resolution task per normalized PID; concurrent requests await the same task.
+# A task runs under the deadline of the request that started it (the Onedata walk returns a partial
+# listing when it passes), so a caller only joins a task allowed to run at least as long as itself;
+# otherwise it starts its own, which then becomes the one later callers join.
+_in_flight: dict[str, tuple[asyncio.Task, float]] = {}  # key -> (task, its deadline's expires_at or inf)
+_single_flight_stats = {"resolutions": 0, "coalesced": 0, "shorter_deadline_skipped": 0}
+
+
+def _forget_in_flight(key: str, entry: tuple):
+    # A replaced task may finish after its successor was registered; only remove our own entry.
+    if _in_flight.get(key) is entry:
+        del _in_flight[key]
+
+
+async def resolve_metadata(pid: str, deadline: Deadline | None = None, onedata_fallback: bool = True):
+    """Resolve `pid` on the resolver pool, sharing the result (or error) with concurrent callers for the same PID.
+
+    Raises ResolverBusyError when the pool's wait queue is full and DeadlineExceeded when `deadline`
+    passes first. The task is shielded so a caller that disconnects or times out does not cancel the
+    lookup for the others. Callers never join a task whose deadline ends before their own, so a
+    partial listing cut short for one request is not handed to a request that could wait longer.
+    """
+    key = normalize_pid(pid) if onedata_fallback else f"{normalize_pid(pid)} (datahugger only)"
+    expires_at = math.inf if deadline is None else deadline.expires_at
+    entry = _in_flight.get(key)
+    if entry is not None and entry[1] >= expires_at:
+        task = entry[0]
+        _single_flight_stats["coalesced"] += 1
+        logging.info(f"Joining in-flight resolution of {key}")
+    else:
+        if entry is not None:
+            _single_flight_stats["shorter_deadline_skipped"] += 1
+            logging.info(f"In-flight resolution of {key} has a shorter deadline; resolving separately")
+        # The resolution gets its own child deadline: whether it ends up partial must not depend on other
+        # resolutions (other /batch items) that ran out of the same request deadline.
+        resolution_deadline = None if deadline is None else deadline.child()
+        task = asyncio.create_task(resolver_pool.run(_resolve_metadata, pid, resolution_deadline, onedata_fallback,
+                                                       deadline=resolution_deadline))
+        entry = _in_flight[key] = (task, expires_at)
+        task.add_done_callback(lambda _, entry=entry: _forget_in_flight(key, entry))
+        _single_flight_stats["resolutions"] += 1
+    if deadline is None:
+        return await asyncio.shield(task)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), deadline.remaining() + PARTIAL_RESULT_GRACE_SECONDS)
+    except TimeoutError:
+        raise deadline.fail()
+
+
+def single_flight_stats() -> dict:
+    return {**_single_flight_stats, "in_flight": len(_in_flight)}
+
+
+def _busy_response(e: ResolverBusyError, duration: float | None = None) -> JSONResponse:
+    content = {"error": "Resolver busy", "message": str(e)}
+    if duration is not None:
+        content["duration"] = duration
+    return JSONResponse(status_code=503, content=content, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _iter_files(files: list):
+    for file in files:
+        yield file
+
+
+async def _iter_pages(pages):
+    """Advance a blocking page generator on the resolver pool, one page at a time."""
+    async for page in onedata_hugger.aiter_pages(pages, resolver_pool.run):
+        for file in page:
+            yield file
+
+
+async def _open_live_stream(pid: str, deadline: Deadline):
+    """File entries of a live resolution: datahugger's listing, or Onedata pages fetched as the response is written.
+
+    Raises RepositoryNotSupportedError (like resolve_metadata) before anything is streamed.
+    """
+    try:
+        metadata = await resolve_metadata(pid, deadline, onedata_fallback=False)
+        return _iter_files(metadata.files)
+    except datahugger.RepositoryNotSupportedError:
+        pages = await resolver_pool.run(_traced_onedata_pages, pid, deadline, deadline=deadline)
+        if pages is None:
+            raise
+        return _iter_pages(pages)
+
+
+async def _serialize_files(files, ndjson: bool):
+    """Write `files` one entry at a time, as `{"files": [...]}` or as NDJSON lines.
+
+    The status line is already sent, so a failure mid-listing ends it with `"partial": true` and the error.
+    """
+    error = None
+    if not ndjson:
+        yield b'{"files":['
+    separator = b""
+    try:
+        async for file in files:
+            if ndjson:
+                yield dumps(file) + b"\n"
+            else:
+                yield separator + dumps(file)
+                separator = b","
+    except Exception as e:
+        logging.warning(f"File listing stream stopped early: {e}")
+        error = str(e)
+    if ndjson:
+        if error:
+            yield dumps({"partial": True, "error": error}) + b"\n"
+    else:
+        yield b"]" + (b',"partial":true,"error":' + dumps(error) if error else b"") + b"}"
+
+
+def _streaming_files_response(files, ndjson: bool, cache_status: str) -> StreamingResponse:
+    return StreamingResponse(
+        _serialize_files(files, ndjson),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers={"X-Cache": cache_status},
+    )
+
+
+def _files_response(files: list, cache_status: str, partial: bool = False) -> JSONResponse:
+    """A complete listing, rendered directly rather than through FastAPI's jsonable_encoder."""
+    headers = {"X-Cache": cache_status}
+    content = {"files": files}
+    if partial:
+        headers["X-Partial-Result"] = "true"
+        content["partial"] = True
+    return JSONResponse(status_code=200, content=content, headers=headers)
+
+
+def _deadline_response(e: DeadlineExceeded, duration: float | None = None) -> JSONResponse:
+    content = {"error": "Deadline exceeded", "message": str(e)}
+    if duration is not None:
+        content["duration"] = duration
+    return JSONResponse(status_code=504, content=content)
+
+
+async def _resolve_batch_item(pid: str, bypass_cache: bool, deadline: Deadline) -> dict:
+    """Resolve one PID of a batch; errors are reported in the result instead of raised."""
+    start_time = time.perf_counter()
+    result = {"pid": pid}
+    try:
+        files = None if bypass_cache else pid_cache.get(pid)
+        if files is not None:
+            result.update(files=files, cache="HIT")
+            outcome = "cache_hit"
+        elif not bypass_cache and (files := await get_harvested_files(pid)) is not None:
+            result.update(files=files, cache="DB")
+            outcome = "db"
+        else:
+            metadata = await resolve_metadata(pid, deadline)
+            result.update(files=metadata.files, cache="BYPASS" if bypass_cache else "MISS")
+            if getattr(metadata, "partial", False):
+                result["partial"] = True
+            outcome = "ok"
+    except datahugger.RepositoryNotSupportedError as e:
+        result.update(error="Repository not supported", message=str(e))
+        outcome = "unsupported"
+    except ResolverBusyError as e:
+        result.update(error="Resolver busy", message=str(e), retry_after=e.retry_after)
+        outcome = "rejected"
+    except DeadlineExceeded as e:
+        result.update(error="Deadline exceeded", message=str(e))
+        outcome = "timeout"
+    except Exception as e:
+        logging.error(f"Error fetching metadata for {pid}: {e}")
+        result.update(error="Error fetching metadata", message=str(e))
+        outcome = "error"
+    duration = time.perf_counter() - start_time
+    PID_FETCH_SECONDS.labels("batch", outcome).observe(duration)
+    result["duration"] = duration
+    return result
+
 # All discovery-related endpoints:
 # - /repositories (re3data cache)
 # - /repository-collections/{r3id}
 # - /repository-info/{pid:path}
 # - /extensions/{pid:path}
+# - /batch (POST, several PIDs at once)
 # - /{pid:path} (main PID fetcher)
 
 
+def _fetch_oai_record(oai_url: str) -> "requests.Response":
+    with get_tracer().start_as_current_span("oai.get_record") as span:
+        span.set_attribute("http.url", oai_url)
+        response = requests.get(oai_url, timeout=REPOSITORY_INFO_TIMEOUT_SECONDS)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
+
 # This endpoint retrieves repository information for a given PID
 # and fetches OAI data if available from the repository. It uses re3data
 # to find the repository based on the publisher extracted from the PID (DOI).
@@ -39,110 +310,209 @@ async def retrieve_repo_info(pid: str):
 
     decoded_pid = unquote(pid).replace("doi:", "")
     try:
-        publisher = get_datapublisher_from_doi(decoded_pid)
+        # Both lookups block on remote servers; run them off the event loop. datahugger takes no timeout,
+        # so the wait for the publisher is bounded here (its thread finishes on its own).
+        publisher = await asyncio.wait_for(
+            asyncio.to_thread(datahugger_utils.get_datapublisher_from_doi, decoded_pid),
+            REPOSITORY_INFO_TIMEOUT_SECONDS)
         if not publisher:
             raise HTTPException(status_code=404, detail="Publisher not found for PID")
-        data_repos = get_re3data_repositories()
-        for repo in data_repos:
-            if publisher.lower() == repo["name"].lower():
-                repo_data =requests.get(f"https://www.re3data.org/api/v1/repository/{repo['id']}")
-                url = "http://transformer.labs.dansdemo.nl/transform/r3data-xml-to-json.xsl"
-                headers = {
-                    "Content-Type": "application/xml",
-                    "Authorization": f"Bearer {app_settings.METADATA_TRANSFORMER_SERVICE_API_KEY}"
-                }
-                transformer_response = requests.post(url, headers=headers, data=repo_data.text)
-                result = json.loads(transformer_response.text)
-                r = result["result"]
-                rst = json.loads(r)
-                oai = rst["repository"].get("oai", {})
-                if oai:
-                    oai_url = f"{oai.split('?')[0]}?verb=GetRecord&identifier={pid}&metadataPrefix=oai_dc"
-                    logging.info(oai_url)
-                    response = requests.get(oai_url)
-                    if response.status_code != 200:
-                        raise HTTPException(status_code=response.status_code, detail="Failed to fetch OAI data")
-
-                    logging.info(f"Fetched OAI data from {oai_url}")
-                    xml_data = response.text
-                    ns = {  'dc': 'http://purl.org/dc/elements/1.1/',
-                            'oai_dc': 'http://www.openarchives.org/OAI/2.0/oai_dc/',
-                            'oai': 'http://www.openarchives.org/OAI/2.0/'}
-                    root = ET.fromstring(xml_data)
-                    title = root.find('.//dc:title', ns)
-                    identifier = root.find('.//dc:identifier', ns)
-                    rst["title"] = title.text if title is not None else None
-                    rst["identifier"] = identifier.text if identifier is not None else None
-
-                    set_specs = [elem.text for elem in root.findall('.//oai:header/oai:setSpec', ns)]
-
-                    rst["collections"] = set_specs
-                else:
-                    logging.warning("No OAI information found in repository data")
-                    rst["title"] = ""
-                    rst["identifier"] = decoded_pid
-                    rst["collections"] = []
-
-                return Response(content=json.dumps(rst), media_type="application/json")
-        raise HTTPException(status_code=404, detail="Repository not found in re3data")
+        re3data_registry.ensure_fresh()
+        if not re3data_registry.loaded:
+            raise HTTPException(status_code=503, detail="The re3data registry is still loading")
+        repo = re3data_registry.find_by_name(publisher)
+        if not repo:
+            raise HTTPException(status_code=404, detail="Repository not found in re3data")
+        rst = await asyncio.to_thread(re3data_details.get, repo['id'])
+        oai = rst["repository"].get("oai", {})
+        if oai:
+            oai_url = f"{oai.split('?')[0]}?verb=GetRecord&identifier={pid}&metadataPrefix=oai_dc"
+            logging.info(oai_url)
+            response = await asyncio.to_thread(_fetch_oai_record, oai_url)
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail="Failed to fetch OAI data")
+
+            logging.info(f"Fetched OAI data from {oai_url}")
+            xml_data = response.text
+            ns = {  'dc': 'http://purl.org/dc/elements/1.1/',
+                    'oai_dc': 'http://www.openarchives.org/OAI/2.0/oai_dc/',
+                    'oai': 'http://www.openarchives.org/OAI/2.0/'}
+            root = ET.fromstring(xml_data)
+            title = root.find('.//dc:title', ns)
+            identifier = root.find('.//dc:identifier', ns)
+            rst["title"] = title.text if title is not None else None
+            rst["identifier"] = identifier.text if identifier is not None else None
+
+            set_specs = [elem.text for elem in root.findall('.//oai:header/oai:setSpec', ns)]
+
+            rst["collections"] = set_specs
+        else:
+            logging.warning("No OAI information found in repository data")
+            rst["title"] = ""
+            rst["identifier"] = decoded_pid
+            rst["collections"] = []
+
+        return JSONResponse(status_code=200, content=rst)
+    except HTTPException:
+        raise
+    except (TimeoutError, requests.exceptions.Timeout):
+        raise HTTPException(status_code=504, detail="Timed out looking up the repository")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/extensions/{pid:path}",tags=["PID Fetcher"],)
-async def get_extensions(pid: str):
+async def get_extensions(pid: str, request: Request):
     decoded_pid = unquote(pid).replace("doi:", "")
+    start_time = time.perf_counter()
+    bypass_cache = _cache_bypassed(request)
+    deadline = _request_deadline(request)
     try:
-        metadata = await asyncio.to_thread(datahugger.info, decoded_pid, {"type": "file"})
+        files = None if bypass_cache else pid_cache.get(decoded_pid)
+        if files is None and not bypass_cache:
+            # Harvested datasets: answer from a DISTINCT mime_type query instead of listing every file.
+            extensions = await get_harvested_extensions(decoded_pid)
+            if extensions is not None:
+                PID_FETCH_SECONDS.labels("get_extensions", "db").observe(time.perf_counter() - start_time)
+                return JSONResponse(status_code=200, content={"extensions": extensions}, headers={"X-Cache": "DB"})
+        if files is None:
+            metadata = await resolve_metadata(decoded_pid, deadline)
+            files = metadata.files
+            PID_FETCH_SECONDS.labels("get_extensions", "ok").observe(time.perf_counter() - start_time)
+        else:
+            PID_FETCH_SECONDS.labels("get_extensions", "cache_hit").observe(time.perf_counter() - start_time)
         extensions = set()
-        for file in metadata.files:
+        for file in files:
             raw_metadata = file.get('raw_metadata', {})
             content_type = raw_metadata.get('contentType')
             if content_type:
                 ext = content_type.split('/')[-1]
                 extensions.add(ext)
         return JSONResponse(status_code=200, content={"extensions": list(extensions)})
-    except RepositoryNotSupportedError as e:
+    except datahugger.RepositoryNotSupportedError as e:
+        PID_FETCH_SECONDS.labels("get_extensions", "unsupported").observe(time.perf_counter() - start_time)
         logging.error(f"Repository not supported: {e}")
         raise HTTPException(status_code=400, detail="Repository not supported")
+    except ResolverBusyError as e:
+        PID_FETCH_SECONDS.labels("get_extensions", "rejected").observe(time.perf_counter() - start_time)
+        return _busy_response(e)
+    except DeadlineExceeded as e:
+        PID_FETCH_SECONDS.labels("get_extensions", "timeout").observe(time.perf_counter() - start_time)
+        logging.warning(f"Deadline exceeded for extensions of {decoded_pid}")
+        return _deadline_response(e)
     except Exception as e:
+        PID_FETCH_SECONDS.labels("get_extensions", "error").observe(time.perf_counter() - start_time)
         logging.error(f"Error fetching metadata: {e}")
         raise HTTPException(status_code=500, detail="Error fetching metadata")
 
+@router.post("/batch", tags=["PID Fetcher"],
+    summary="Fetch metadata files for several PIDs",
+    description="Accepts a JSON list of PIDs (or `{\"pids\": [...], \"concurrency\": n}`) and resolves them concurrently. "
+                "Results are streamed as NDJSON, one line per PID in completion order, each with its own `duration` and either `files` or `error`/`message`. "
+                "`X-Request-Timeout` (seconds) bounds the whole batch.")
+async def get_pids_batch(request: Request):
+    payload = await request.json()
+    pids = payload if isinstance(payload, list) else payload.get("pids")
+    if not isinstance(pids, list) or not all(isinstance(pid, str) for pid in pids):
+        raise HTTPException(status_code=400, detail="Expected a list of PIDs")
+    if len(pids) > BATCH_MAX_PIDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_PIDS} PIDs per batch")
+    concurrency = BATCH_CONCURRENCY
+    if isinstance(payload, dict) and payload.get("concurrency"):
+        concurrency = max(1, min(int(payload["concurrency"]), BATCH_CONCURRENCY))
+    bypass_cache = _cache_bypassed(request)
+    # One deadline for the whole batch: PIDs still unresolved when it passes are reported as timed out.
+    deadline = _request_deadline(request)
+    semaphore = asyncio.Semaphore(concurrency)
+    logging.info(f"Batch resolution of {len(pids)} PIDs with {concurrency} workers")
+
+    async def resolve(pid: str) -> dict:
+        async with semaphore:
+            return await _resolve_batch_item(unquote(pid), bypass_cache, deadline)
+
+    async def stream_results():
+        tasks = [asyncio.create_task(resolve(pid)) for pid in pids]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield dumps(await next_result) + b"\n"
+        finally:
+            # Client went away: stop the remaining lookups (shared single-flight resolutions keep running).
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 @router.get(
     "/{pid:path}",
     response_class=JSONResponse,
     summary="Fetch metadata files for a given PID",
-    description="Retrieves metadata files for the provided persistent identifier (PID). Optionally allows downloading the files.",
+    description="Retrieves metadata files for the provided persistent identifier (PID). Optionally allows downloading the files. "
+                "`X-Request-Timeout` (seconds) sets a deadline: 504 when nothing was resolved in time, or a listing marked `partial` when it was cut short. "
+                "`stream=true` writes the files array incrementally and `Accept: application/x-ndjson` returns one file per line; "
+                "Onedata listings are then sent page by page as they are fetched.",
     tags=["PID Fetcher"])
-async def get_pid(pid: str):
+async def get_pid(pid: str, request: Request, stream: bool = False):
     start_time = time.perf_counter()
     logging.info("get doi")
     decoded_doi = unquote(pid)
-    print(f"Received DOI: {decoded_doi}")
     logging.info(f"Received DOI: {decoded_doi}")
+    bypass_cache = _cache_bypassed(request)
+    deadline = _request_deadline(request)
+    ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+    streaming = stream or ndjson
+    cached_files = None if bypass_cache else pid_cache.get(decoded_doi)
+    if cached_files is not None:
+        duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "cache_hit").observe(duration)
+        logging.info(f"Return cached metadata files for {decoded_doi} ({duration:.4f} seconds)")
+        if streaming:
+            return _streaming_files_response(_iter_files(cached_files), ndjson, "HIT")
+        return _files_response(cached_files, "HIT")
+    if streaming and not bypass_cache:
+        dataset_pid = await find_harvested_dataset_pid(decoded_doi)
+        if dataset_pid is not None:
+            PID_FETCH_SECONDS.labels("get_pid", "db").observe(time.perf_counter() - start_time)
+            logging.info(f"Stream harvested metadata files for {decoded_doi} from the database")
+            return _streaming_files_response(iter_harvested_files(dataset_pid), ndjson, "DB")
+    harvested_files = None if bypass_cache or streaming else await get_harvested_files(decoded_doi)
+    if harvested_files is not None:
+        duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "db").observe(duration)
+        logging.info(f"Return harvested metadata files for {decoded_doi} from the database ({duration:.4f} seconds)")
+        return _files_response(harvested_files, "DB")
     try:
-        metadata = await asyncio.to_thread(datahugger.info, decoded_doi, {"type": "file"})
-        # metadata =datahugger.info(decoded_doi)
-    except RepositoryNotSupportedError as e:
-        # fall-back and try to resolve the identifier as Onedata dataset
-        metadata = onedata_hugger.info(decoded_doi)
-        if not metadata:
-            duration = time.perf_counter() - start_time
-            if duration > 30:
-                logging.warning(f"Request duration exceeded 30 seconds: {duration:.4f} seconds")
-                print(f"WARNING: Request duration exceeded 30 seconds: {duration:.4f} seconds")
-            logging.error(f"Repository not supported: {e}")
-            logging.info(f"Request duration: {duration:.4f} seconds")
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Repository not supported", "message": str(e), "duration": duration}
-            )
+        if streaming:
+            files = await _open_live_stream(decoded_doi, deadline)
+            # Observed at the first byte; the listing may still take a while to send.
+            PID_FETCH_SECONDS.labels("get_pid", "stream").observe(time.perf_counter() - start_time)
+            return _streaming_files_response(files, ndjson, "BYPASS" if bypass_cache else "MISS")
+        metadata = await resolve_metadata(decoded_doi, deadline)
+    except datahugger.RepositoryNotSupportedError as e:
+        duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "unsupported").observe(duration)
+        if duration > 30:
+            logging.warning(f"Request duration exceeded 30 seconds: {duration:.4f} seconds")
+        logging.error(f"Repository not supported: {e}")
+        logging.info(f"Request duration: {duration:.4f} seconds")
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Repository not supported", "message": str(e), "duration": duration}
+        )
+    except ResolverBusyError as e:
+        duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "rejected").observe(duration)
+        return _busy_response(e, duration)
+    except DeadlineExceeded as e:
+        duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "timeout").observe(duration)
+        logging.warning(f"Deadline exceeded for {decoded_doi} after {duration:.4f} seconds")
+        return _deadline_response(e, duration)
     except Exception as e:
         duration = time.perf_counter() - start_time
+        PID_FETCH_SECONDS.labels("get_pid", "error").observe(duration)
         if duration > 30:
             logging.warning(f"Request duration exceeded 30 seconds: {duration:.4f} seconds")
-            print(f"WARNING: Request duration exceeded 30 seconds: {duration:.4f} seconds")
         logging.error(f"Error fetching metadata: {e}")
         logging.info(f"Request duration: {duration:.4f} seconds")
         return JSONResponse(
@@ -151,9 +521,8 @@ async def get_pid(pid: str):
         )
     logging.info(f"Return metadata files for {decoded_doi}")
     duration = time.perf_counter() - start_time
+    PID_FETCH_SECONDS.labels("get_pid", "ok").observe(duration)
     if duration > 30:
         logging.warning(f"Request duration exceeded 30 seconds: {duration:.4f} seconds")
-        print(f"WARNING: Request duration exceeded 30 seconds: {duration:.4f} seconds")
     logging.info(f"Request duration: {duration:.4f} seconds")
-    print(f"Request duration: {duration:.4f} seconds")
-    return {"files": metadata.files}
+    return _files_response(metadata.files, "BYPASS" if bypass_cache else "MISS", getattr(metadata, "partial", False))
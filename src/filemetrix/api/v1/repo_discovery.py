@@ -1,54 +1,124 @@
+import asyncio
+import base64
+import bisect
 import json
 import logging
-import os
-import xml.etree.ElementTree as ET
-from datetime import date
 
-import requests
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
 
-from src.filemetrix.infra.commons import app_settings, API_PREFIX
+from src.filemetrix.infra.commons import API_PREFIX
+from src.filemetrix.infra.lazy_import import LazyModule
+from src.filemetrix.infra.responses import JSONResponse, etag_matches, make_etag
+from src.filemetrix.services.oai_sets import oai_base_url, oai_set_cache
+from src.filemetrix.services.re3data_details import re3data_details
+from src.filemetrix.services.re3data_registry import re3data_registry
 
 router = APIRouter(prefix=API_PREFIX)
 
+requests = LazyModule("requests")
+
+
+def _registry_loading() -> JSONResponse:
+    return JSONResponse(status_code=503, content={"message": "The re3data registry is still loading"},
+                        headers={"Retry-After": "30"})
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        rank, name, r3id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(rank), str(name), str(r3id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/repositories", tags=["Repo Discovery"],)
-async def repositories():
+async def repositories(request: Request):
     """
-    Retrieve a list of available repositories from re3data, cached daily.
+    Retrieve the list of available repositories from re3data (in-memory registry, refreshed in the background).
     """
-    cache_file = "repositories_cache.json"
-    today = date.today().isoformat()
-
-    # Try to load from cache
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cache = json.load(f)
-            if cache.get("date") == today and "repos" in cache:
-                return JSONResponse(status_code=200, content=cache["repos"])
-        except Exception as e:
-            logging.warning(f"Failed to read cache: {e}")
-
-    # Fetch from remote and update cache
-    try:
-        data_repos = requests.get("https://www.re3data.org/api/v1/repositories")
-        data_repos.raise_for_status()
-        tree = ET.fromstring(data_repos.content)
-        repos = [{elem.tag: elem.text for elem in node if elem.tag != "link"} for node in tree]
-
-        # Save to cache
-        try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump({"date": today, "repos": repos}, f)
-        except Exception as e:
-            logging.warning(f"Failed to write cache: {e}")
-
-        return JSONResponse(status_code=200, content=repos)
-    except Exception as e:
-        logging.error(f"Error fetching repositories: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch repositories")
+    re3data_registry.ensure_fresh()
+    if not re3data_registry.loaded:
+        return _registry_loading()
+    etag = make_etag(re3data_registry.content_hash)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=re3data_registry.json_bytes(), media_type="application/json", headers={"ETag": etag})
+
+
+@router.get("/repositories/search", tags=["Repo Discovery"],
+    summary="Search the re3data repository catalogue",
+    description="Matches `q` against repository names (exact, prefix, word prefix, then substring), optionally filtered by "
+                "re3data `id` and `doi`. Results are paged: pass `next_cursor` back as `cursor`. "
+                "Responses carry an ETag; `If-None-Match` returns 304 while the catalogue is unchanged.")
+async def search_repositories(
+        request: Request,
+        q: str | None = None,
+        id: str | None = None,
+        doi: str | None = None,
+        limit: int = Query(50, ge=1, le=500),
+        cursor: str | None = None):
+    re3data_registry.ensure_fresh()
+    if not re3data_registry.loaded:
+        return _registry_loading()
+    etag = make_etag(re3data_registry.content_hash, q or "", id or "", doi or "", str(limit), cursor or "")
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    results = re3data_registry.index.search(q, id, doi)
+    start = 0
+    if cursor:
+        # Keyset pagination: resume after the last key of the previous page, which stays valid across refreshes.
+        start = bisect.bisect_right([result[:3] for result in results], _decode_cursor(cursor))
+    page = results[start:start + limit]
+    next_cursor = _encode_cursor(page[-1][:3]) if page and start + limit < len(results) else None
+    return JSONResponse(
+        status_code=200,
+        content={"total": len(results), "items": [result[3] for result in page], "next_cursor": next_cursor},
+        headers={"ETag": etag},
+    )
+
+async def _oai_base_url_of(r3id: str) -> str | None:
+    if re3data_registry.loaded and not re3data_registry.get(r3id):
+        raise HTTPException(status_code=404, detail=f"Repository '{r3id}' not found")
+    rst = await asyncio.to_thread(re3data_details.get, r3id)
+    oai = rst["repository"].get("oai", {})
+    return oai_base_url(oai) if oai else None
+
+
+@router.get("/repository-collections", tags=["PID Fetcher"],
+    summary="Retrieve the OAI sets of several repositories",
+    description="Enumerates the OAI-PMH sets of every given repository concurrently, keyed by repository ID. "
+                "Repositories that could not be listed are reported under `errors`.")
+async def repositories_collections(r3id: list[str] = Query(..., min_length=1, max_length=50)):
+    re3data_registry.ensure_fresh()
+    r3ids = list(dict.fromkeys(r3id))
+    base_urls, errors = {}, {}
+    results = await asyncio.gather(*(_oai_base_url_of(i) for i in r3ids), return_exceptions=True)
+    for result_id, result in zip(r3ids, results):
+        if isinstance(result, HTTPException):
+            errors[result_id] = result.detail
+        elif isinstance(result, Exception):
+            logging.error(f"Error fetching repository details of {result_id}: {result}")
+            errors[result_id] = "Failed to fetch repository details"
+        else:
+            base_urls[result_id] = result
+
+    sets = await oai_set_cache.list_sets_many(sorted({url for url in base_urls.values() if url}))
+    collections = {}
+    for result_id, base_url in base_urls.items():
+        result = sets[base_url] if base_url else []
+        if isinstance(result, Exception):
+            logging.error(f"Error listing OAI sets of {base_url}: {result}")
+            errors[result_id] = "Failed to fetch OAI data"
+        else:
+            collections[result_id] = [s["setSpec"] for s in result]
+    return {"collections": collections, "errors": errors}
+
 
 @router.get("/repository-collections/{r3id}", tags=["PID Fetcher"],
     summary="Retrieve details of a specific repository",
@@ -57,46 +127,20 @@ async def repository_details(r3id: str):
     """
     Retrieve details of a specific repository from re3data.
     """
-    cache_file = "repositories_cache.json"
+    re3data_registry.ensure_fresh()
     try:
-        # Try to load from cache
-        if os.path.exists(cache_file):
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cache = json.load(f)
-            repos = cache.get("repos", [])
-            repo = next((r for r in repos if r.get("id") == r3id), None)
-            if not repo:
-                return HTTPException(status_code=404, detail=f"Repository '{r3id}' not found", headers={})
-
-        response = requests.get(f"https://www.re3data.org/api/v1/repository/{r3id}")
-        response.raise_for_status()
-        url = "http://transformer.labs.dansdemo.nl/transform/r3data-xml-to-json.xsl"
-        headers = {
-            "Content-Type": "application/xml",
-            "Authorization": f"Bearer {app_settings.METADATA_TRANSFORMER_SERVICE_API_KEY}"
-        }
-        transformer_response = requests.post(url, headers=headers, data=response.text)
-        result = json.loads(transformer_response.text)
-        r = result["result"]
-        rst = json.loads(r)
-        oai = rst["repository"].get("oai", {})
+        base_url = await _oai_base_url_of(r3id)
         set_specs = []
-        if oai:
-            oai_url = f"{oai.split('?')[0]}?verb=ListSets"
-            logging.info(oai_url)
-            response = requests.get(oai_url)
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch OAI data")
-            logging.info(f"Fetched OAI data from {oai_url}")
-            xml_data = response.text
-            ns = {'oai': 'http://www.openarchives.org/OAI/2.0/'}
-            root = ET.fromstring(xml_data)
-            set_specs = [elem.text for elem in root.findall('.//oai:setSpec', ns)]
+        if base_url:
+            sets = await asyncio.to_thread(oai_set_cache.list_sets, base_url)
+            set_specs = [s["setSpec"] for s in sets]
 
         return JSONResponse(status_code=200, content=set_specs)
+    except HTTPException:
+        raise
     except requests.HTTPError as e:
         logging.error(f"HTTP error fetching repository details: {e}")
-        return HTTPException(status_code=e.response.status_code, detail=str(e))
+        raise HTTPException(status_code=e.response.status_code, detail="Failed to fetch OAI data")
     except Exception as e:
         logging.error(f"Error fetching repository details: {e}")
-        return HTTPException(status_code=500, detail="Failed to fetch repository details")
+        raise HTTPException(status_code=500, detail="Failed to fetch repository details")
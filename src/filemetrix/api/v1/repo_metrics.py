@@ -1,31 +1,83 @@
-from datetime import datetime
+import logging
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
 
 from src.filemetrix.infra.commons import API_PREFIX
-from src.filemetrix.infra.db import get_repo_by_id, get_repo_by_prefix_and_url, get_all_repos, get_dataset_count, \
-    get_file_metadata_count, get_dataset_count_by_repo_id, get_file_metadata_count_by_repo_id, \
-    get_dataset_count_by_repo_id_and_status, HarvestStatus, get_dataset_count_by_repo_id_and_fm_status, \
-    get_file_metadata_count_grouped_by_mime_type, get_file_metadata_count_grouped_by_mime_type_by_repo_id, \
-    get_total_file_size_by_repo_id, get_dataset_count_grouped_by_publication_month, get_dataset_count_grouped_by_repo, \
-    get_file_metadata_count_grouped_by_repo, get_total_file_size_grouped_by_repo
-
-router = APIRouter(prefix=API_PREFIX)
-
-def serialize(obj):
-    data = obj.model_dump()
-    for k, v in data.items():
-        if isinstance(v, datetime):
-            data[k] = v.isoformat()
-    return data
+from src.filemetrix.infra.db import HarvestStatus, get_repo_by_id_async, get_repo_by_prefix_and_url_async, \
+    get_all_repos_async, get_repo_count_async, get_dataset_count_async, get_file_metadata_count_async, \
+    get_dataset_count_by_repo_id_async, get_file_metadata_count_by_repo_id_async, \
+    get_dataset_count_by_repo_id_and_status_async, get_dataset_count_by_repo_id_and_fm_status_async, \
+    get_file_metadata_count_grouped_by_mime_type_async, get_file_metadata_count_grouped_by_mime_type_by_repo_id_async, \
+    get_total_file_size_by_repo_id_async, get_dataset_count_grouped_by_publication_month_async, \
+    get_dataset_count_grouped_by_repo_async, get_file_metadata_count_grouped_by_repo_async, \
+    get_total_file_size_grouped_by_repo_async
+from src.filemetrix.infra.responses import JSONResponse, etag_matches, make_etag
+from src.filemetrix.services.data_versions import DataVersion, data_versions
+
+
+def _unmodified_since(request: Request, version: DataVersion) -> bool:
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or version.last_modified is None or version.harvesting:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return version.last_modified.replace(microsecond=0) <= since
+
+
+class ConditionalRoute(APIRoute):
+    """Revalidates against the data version of the repository in the path (`repo_id` or `id`), or of all
+    repositories, before the handler runs: a current If-None-Match (or, without one, If-Modified-Since)
+    gets a 304 and none of the handler's queries. Other 200 responses carry ETag and Last-Modified."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def conditional_handler(request: Request) -> Response:
+            repo_id = request.path_params.get("repo_id", request.path_params.get("id"))
+            try:
+                version = await data_versions.get(int(repo_id) if repo_id is not None else None)
+            except ValueError:
+                version = None  # not an id; the handler reports the validation error
+            except Exception as e:
+                logging.warning(f"Could not determine the data version for {request.url.path}: {e}")
+                version = None
+            if version is None:
+                return await handler(request)
+
+            headers = {"ETag": make_etag(version.tag, request.url.path, request.url.query), "Cache-Control": "no-cache"}
+            if version.last_modified is not None:
+                headers["Last-Modified"] = format_datetime(version.last_modified, usegmt=True)
+            if "if-none-match" in request.headers:
+                not_modified = etag_matches(request, headers["ETag"])
+            else:
+                not_modified = _unmodified_since(request, version)
+            if not_modified:
+                data_versions.record_not_modified()
+                return Response(status_code=304, headers=headers)
+            response = await handler(request)
+            if response.status_code == 200:
+                response.headers.update(headers)
+            return response
+
+        return conditional_handler
+
+
+router = APIRouter(prefix=API_PREFIX, route_class=ConditionalRoute)
 
 @router.get("/repo/{id}", tags=["Repo Metrics"])
 async def get_repo_by_id_public(id: int):
-    repo = get_repo_by_id(id)
+    repo = await get_repo_by_id_async(id)
     if not repo:
         return HTTPException(status_code=404, detail="Repository not found.")
-    return JSONResponse(status_code=200, content=serialize(repo))
+    return JSONResponse(status_code=200, content=repo)
 
 @router.get("/harvest/metadata_prefix/url:path", tags=["Repo Metrics"])
 async def harvest_metadata(metadata_prefix: str = None, url: str = None):
@@ -34,55 +86,49 @@ async def harvest_metadata(metadata_prefix: str = None, url: str = None):
             status_code=400,
             detail="Both 'metadata_prefix' and 'url' must be provided."
         )
-    repose = get_repo_by_prefix_and_url(metadata_prefix, url)
+    repose = await get_repo_by_prefix_and_url_async(metadata_prefix, url)
     return JSONResponse(
         status_code=200,
-        content=repose.model_dump()
+        content=repose
     )
 
 @router.get("/repos", tags=["Repo Metrics"])
 async def get_repos_public():
-    repos = get_all_repos()
-    # Use model_dump(mode="json") if available, else fallback to manual conversion
-    def serialize(obj):
-        data = obj.model_dump()
-        for k, v in data.items():
-            if isinstance(v, datetime):
-                data[k] = v.isoformat()
-        return data
+    repos = await get_all_repos_async()
+    # The response renders the rows (and their datetimes) itself; no model_dump pass needed.
     return JSONResponse(
         status_code=200,
-        content=[serialize(repo) for repo in repos]
+        content=repos
     )
 
 
 @router.get("/dataset/count", tags=["Repo Metrics"])
 async def dataset_count():
-    count = get_dataset_count()
+    count = await get_dataset_count_async()
     return JSONResponse(
         status_code=200,
-        content={"total-datasets": count, "number-of-repositories": len(get_all_repos())}
+        content={"total-datasets": count, "number-of-repositories": await get_repo_count_async()}
     )
 
 
 
 @router.get("/file-metadata/count", tags=["Repo Metrics"])
 async def file_metadata_count():
-    count = get_file_metadata_count()
+    count = await get_file_metadata_count_async()
     return JSONResponse(
         status_code=200,
-        content={"total-file-metadata": count, "number-of-repositories": len(get_all_repos())}
+        content={"total-file-metadata": count, "number-of-repositories": await get_repo_count_async()}
     )
 
 
 
 @router.get("/dataset/count/{repo_id}", tags=["Repo Metrics"])
 async def dataset_count_by_repo_id(repo_id: int):
-    repo = get_repo_by_id(repo_id)
+    repo = await get_repo_by_id_async(repo_id)
     if not repo:
         return HTTPException(status_code=404, detail="Repository not found.")
 
-    count = get_dataset_count_by_repo_id(repo_id)
+    count = await get_dataset_count_by_repo_id_async(repo_id)
     return JSONResponse(
         status_code=200,
         content={"repo-name": repo.name, "dataset-count": count}
@@ -92,11 +138,11 @@ async def dataset_count_by_repo_id(repo_id: int):
 
 @router.get("/file-metadata/count/{repo_id}", tags=["Repo Metrics"])
 async def file_metadata_count_by_repo_id(repo_id: int):
-    repo = get_repo_by_id(repo_id)
+    repo = await get_repo_by_id_async(repo_id)
     if not repo:
         return HTTPException(status_code=404, detail="Repository not found.")
 
-    count = get_file_metadata_count_by_repo_id(repo_id)
+    count = await get_file_metadata_count_by_repo_id_async(repo_id)
     return JSONResponse(
         status_code=200,
         content={"file-metadata": count, "repo-name": repo.name}
@@ -105,10 +151,10 @@ async def file_metadata_count_by_repo_id(repo_id: int):
 
 @router.get("/dataset/count/{repo_id}/status/{harvest_status}", tags=["Repo Metrics"])
 async def dataset_count_by_repo_id_and_status(repo_id: int, harvest_status: HarvestStatus):
-    repo = get_repo_by_id(repo_id)
+    repo = await get_repo_by_id_async(repo_id)
     if not repo:
         return HTTPException(status_code=404, detail="Repository not found.")
-    count = get_dataset_count_by_repo_id_and_status(repo_id, harvest_status)
+    count = await get_dataset_count_by_repo_id_and_status_async(repo_id, harvest_status)
     if count == 0 and harvest_status == HarvestStatus.IN_PROGRESS:
         return JSONResponse(
             status_code=200,
@@ -124,10 +170,10 @@ async def dataset_count_by_repo_id_and_status(repo_id: int, harvest_status: Harv
 
 @router.get("/dataset/count/{repo_id}/file-metadata/{harvest_status}", tags=["Repo Metrics"])
 async def dataset_count_by_repo_id_and_fm_status(repo_id: int, harvest_status: HarvestStatus):
-    repo = get_repo_by_id(repo_id)
+    repo = await get_repo_by_id_async(repo_id)
     if not repo:
         return HTTPException(status_code=404, detail="Repository not found.")
-    count = get_dataset_count_by_repo_id_and_fm_status(repo_id, harvest_status)
+    count = await get_dataset_count_by_repo_id_and_fm_status_async(repo_id, harvest_status)
     if count == 0:
         return JSONResponse(
             status_code=200,
@@ -140,7 +186,7 @@ async def dataset_count_by_repo_id_and_fm_status(repo_id: int, harvest_status: H
 
 @router.get("/file-metadata/count/grouped/mime_type", tags=["Repo Metrics"])
 async def file_metadata_count_grouped_by_mime_type():
-    result = get_file_metadata_count_grouped_by_mime_type()
+    result = await get_file_metadata_count_grouped_by_mime_type_async()
     return JSONResponse(
         status_code=200,
         content=result
@@ -149,7 +195,7 @@ async def file_metadata_count_grouped_by_mime_type():
 
 @router.get("/file-metadata/count/grouped/mime_type/{repo_id}", tags=["Repo Metrics"])
 async def file_metadata_count_grouped_by_mime_type_by_repo_id(repo_id: int):
-    result = get_file_metadata_count_grouped_by_mime_type_by_repo_id(repo_id)
+    result = await get_file_metadata_count_grouped_by_mime_type_by_repo_id_async(repo_id)
     return JSONResponse(
         status_code=200,
         content=result
@@ -168,9 +214,9 @@ def format_size(size_bytes: int) -> str:
 
 @router.get("/file-metadata/total-size/{repo_id}", tags=["Repo Metrics"])
 async def file_metadata_total_size_by_repo_id(repo_id: int):
-    total_size = get_total_file_size_by_repo_id(repo_id)
+    total_size = await get_total_file_size_by_repo_id_async(repo_id)
     total_size_int = int(total_size)
-    repo = get_repo_by_id(repo_id)
+    repo = await get_repo_by_id_async(repo_id)
     return JSONResponse(
         status_code=200,
         content={
@@ -183,7 +229,7 @@ async def file_metadata_total_size_by_repo_id(repo_id: int):
 
 @router.get("/dataset/count/grouped-by-publication/month/{repo_id}", tags=["Repo Metrics"])
 async def dataset_count_grouped_by_month(repo_id: int):
-    result = get_dataset_count_grouped_by_publication_month(repo_id)
+    result = await get_dataset_count_grouped_by_publication_month_async(repo_id)
     return JSONResponse(
         status_code=200,
         content=result
@@ -191,7 +237,7 @@ async def dataset_count_grouped_by_month(repo_id: int):
 
 @router.get("/dataset/count/grouped/repo", tags=["Repo Metrics"])
 async def dataset_count_grouped_by_repo():
-    result = get_dataset_count_grouped_by_repo()
+    result = await get_dataset_count_grouped_by_repo_async()
     return JSONResponse(
         status_code=200,
         content=result
@@ -199,7 +245,7 @@ async def dataset_count_grouped_by_repo():
 
 @router.get("/file-metadata/count/grouped/repo", tags=["Repo Metrics"])
 async def file_metadata_count_grouped_by_repo():
-    result = get_file_metadata_count_grouped_by_repo()
+    result = await get_file_metadata_count_grouped_by_repo_async()
     return JSONResponse(
         status_code=200,
         content=result
@@ -208,7 +254,7 @@ async def file_metadata_count_grouped_by_repo():
 
 @router.get("/file-metadata/total-size/grouped/repo", tags=["Repo Metrics"])
 async def file_metadata_total_size_grouped_by_repo():
-    result = get_total_file_size_grouped_by_repo()
+    result = await get_total_file_size_grouped_by_repo_async()
     return JSONResponse(
         status_code=200,
         content=result
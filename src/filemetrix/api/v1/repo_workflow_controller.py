@@ -1,13 +1,12 @@
-import asyncio
 import logging
 
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
 
-from src.filemetrix.infra.commons import send_mail, app_settings, API_PREFIX
+from src.filemetrix.infra.commons import API_PREFIX
 from src.filemetrix.infra.db import RepositoryModel, insert_repo, get_repo_by_id, get_repo_by_prefix_and_url, \
-    HarvestStatus, delete_file_metadata_by_dataset_pid
-from src.filemetrix.services.oai_harvester_client import OaiHarvesterClient
+    insert_harvest_job, get_harvest_job, get_active_harvest_job
+from src.filemetrix.infra.responses import JSONResponse
+from src.filemetrix.services.harvest_executor import harvest_executor
 
 # Create an API router instance
 router = APIRouter(prefix=API_PREFIX)
@@ -49,13 +48,31 @@ async def add_repo(
         return HTTPException(
             status_code=400, detail="Invalid JSON payload or processing error"
         )
-from fastapi import BackgroundTasks
+
+
+def _queue_harvest(repo: RepositoryModel, kind: str, message: str) -> JSONResponse:
+    """Queue a harvest job for the executors; one queued or running job per repository at a time."""
+    job = insert_harvest_job(repo.id, kind)
+    if job is None:
+        active = get_active_harvest_job(repo.id)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "message": f"Repository '{repo.name}' harvest is already in progress. Please wait until it is completed.",
+                "job-id": active.id if active else None}
+        )
+    # Start at once when this process runs an executor; otherwise the next poll picks it up.
+    harvest_executor.wake()
+    return JSONResponse(
+        status_code=200,
+        content={"message": message, "repository": repo.name, "job-id": job.id}
+    )
+
 
 @router.post("/harvest/{metadata_prefix}/{url:path}", tags=["Repo Management"])
 @router.post("/harvest/{repo_id}", tags=["Repo Management"])
 async def pid_harvest(
     request: Request,
-    background_tasks: BackgroundTasks,
     repo_id: int = None,
     metadata_prefix: str = None,
     url: str = None
@@ -78,36 +95,14 @@ async def pid_harvest(
             headers={"X-Error": "Repository not found."}
         )
 
-    if repo.harvest_ds_status == HarvestStatus.IN_PROGRESS:
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": f"Repository '{repo.name}' harvest is already in progress. Please wait until it is completed."}
-        )
-
     logging.info(f"Processing harvest PID, repo name: {repo.name}")
-    subject = f"Dataset harvest for repository {repo.name} started"
-    body = f"Dataset harvest for repository {repo.name} has started. Please check the status later."
-    send_mail(subject, body)
-    def run_harvest_sync():
-        async def run_harvest():
-            harvester = OaiHarvesterClient(repo)
-            await harvester.harvest_identifiers()
-        asyncio.run(run_harvest())
+    return _queue_harvest(repo, "identifiers", "Dataset harvest in progress")
 
-    background_tasks.add_task(run_harvest_sync)
-
-    return JSONResponse(
-        status_code=200,
-        content={"message": "Dataset harvest in progress", "repository": repo.name}
-    )
-from fastapi import BackgroundTasks
 
 @router.post("/harvest-filemetadata/{metadata_prefix}/{url:path}", tags=["Repo Management"])
 @router.post("/harvest-filemetadata/{repo_id}", tags=["Repo Management"])
 async def filemetadata_harvest(
     request: Request,
-    background_tasks: BackgroundTasks,
     repo_id: int = None,
     metadata_prefix: str = None,
     url: str = None
@@ -137,38 +132,12 @@ async def filemetadata_harvest(
             headers={"X-Error": "Repository harvest not completed."}
         )
     logging.info(f"Processing filemetadata: {repo.name}")
-    print(f"Processing filemetadata: {repo.name}")
-    subject = f"File metadata harvest for repository {repo.name} started"
-    body = f"File metadata harvest for repository {repo.name} has started. Please check the status later."
-    send_mail(subject, body)
-    def run_harvest_sync():
-        async def run_harvest():
-            logging.info(f"Starting file metadata harvest for repository: {repo.name}")
-            print(f"Starting file metadata harvest for repository: {repo.name}")
-            harvester = OaiHarvesterClient(repo)
-            # tasks = [
-            #     harvester.harvest_files(dataset.pid, app_settings.PID_FETCHER_URL)
-            #     for dataset in repo.datasets
-            #     if not dataset.harvest_fm_status == HarvestStatus.COMPLETED
-            # ]
-            tasks = []
-            for dataset in repo.datasets:
-                if dataset.harvest_fm_status == HarvestStatus.IN_PROGRESS:
-                    delete_file_metadata_by_dataset_pid(dataset.pid)# TODO: Need to review this
-                if dataset.harvest_fm_status != HarvestStatus.COMPLETED:
-                    tasks.append(harvester.harvest_files(dataset.repo_id, dataset.pid, app_settings.PID_FETCHER_URL))
-
-            await asyncio.gather(*tasks)
-            logging.info(f"File metadata harvest completed for repository: {repo.name}")
-            print(f"File metadata harvest completed for repository: {repo.name}")
-            subject = f"File metadata harvest for repository {repo.name} completed"
-            body = f"File metadata harvest for repository {repo.name} has completed successfully."
-            send_mail(subject, body)
-        asyncio.run(run_harvest())
-
-    background_tasks.add_task(run_harvest_sync)
+    return _queue_harvest(repo, "files", "File metadata harvest in progress")
 
-    return JSONResponse(
-        status_code=200,
-        content={"message": "File metadata harvest in progress", "repository": repo.name}
-    )
+
+@router.get("/harvest-job/{job_id}", tags=["Repo Management"])
+async def harvest_job_status(job_id: int):
+    job = get_harvest_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Harvest job not found.")
+    return JSONResponse(status_code=200, content=job.model_dump(mode="json"))
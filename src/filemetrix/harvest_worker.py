@@ -0,0 +1,50 @@
+"""Harvest executor process for FileMetrix.
+
+Runs the harvests queued through the API (POST /harvest/..., /harvest-filemetadata/...) so the web
+workers only serve requests. Start one or more next to the API (`harvest_executor_embedded` is
+false by default, so the API itself runs no harvests):
+
+    python -m src.filemetrix.harvest_worker
+
+Any number of these processes can run against the same database; a Postgres advisory lock per
+repository ensures a repository is only harvested by one of them at a time. SIGTERM/SIGINT stop
+claiming new jobs and the process exits once its running harvests end; harvests cut short by a
+kill are queued again by the next executor that polls.
+
+Harvest throughput, PID fetch latency and DB pool metrics are served for Prometheus on
+`harvest_worker_metrics_port` (give each process on a host its own port; 0 disables it).
+"""
+import logging
+import signal
+
+from src.filemetrix.infra.commons import get_int_setting
+from src.filemetrix.infra.db import create_tables, ensure_database_exists, init_engines
+from src.filemetrix.infra.log_config import setup_logging
+from src.filemetrix.infra.mail_outbox import mail_outbox
+from src.filemetrix.infra.metrics import serve_metrics
+from src.filemetrix.services.harvest_executor import harvest_executor
+
+
+def main():
+    setup_logging("harvest")
+    serve_metrics(get_int_setting("harvest_worker_metrics_port", 9464))
+    init_engines()
+    if ensure_database_exists():
+        create_tables()
+    else:
+        logging.warning("Database is not reachable yet; the executor keeps polling until it is.")
+
+    def stop(signum, frame):
+        logging.info(f"Received signal {signum}, stopping the harvest executor")
+        harvest_executor.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        harvest_executor.run_forever()
+    finally:
+        mail_outbox.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,35 @@ def _as_bool(val, default=False):
     return default
 
 
+def get_int_setting(name: str, default: int) -> int:
+    """Read an integer setting (dynaconf, then env var), falling back to `default` when missing or invalid."""
+    raw = app_settings.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        logging.warning("Setting %s=%r is not an integer, falling back to %s", name, raw, default)
+        return default
+
+
+def get_float_setting(name: str, default: float) -> float:
+    """Read a float setting (dynaconf, then env var), falling back to `default` when missing or invalid."""
+    raw = app_settings.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        logging.warning("Setting %s=%r is not a number, falling back to %s", name, raw, default)
+        return default
+
+
+def get_bool_setting(name: str, default: bool) -> bool:
+    """Read a boolean setting (dynaconf, then env var) using the same parsing rules as the mail flags."""
+    return _as_bool(app_settings.get(name), default)
+
+
 def _normalize_mail_to(raw):
     # Accept list or comma-separated string
     if raw is None:
@@ -100,7 +129,8 @@ def _normalize_mail_to(raw):
     return []
 
 
-def send_mail(subject: str, body: str, to: list | None = None, from_addr: str | None = None) -> bool:
+def mail_config(to: list | None = None, from_addr: str | None = None) -> dict | None:
+    """SMTP settings and recipients for one message; None (after logging) when no recipient is configured."""
     mail_host = app_settings.get("mail_host") or os.environ.get("MAIL_HOST") or "smtp.gmail.com"
     try:
         mail_port = int(app_settings.get("mail_port", os.environ.get("MAIL_PORT", 587)))
@@ -119,7 +149,7 @@ def send_mail(subject: str, body: str, to: list | None = None, from_addr: str |
 
     if not mail_to:
         logging.error("No recipient specified for email. mail_to=%s", mail_to_raw)
-        return False
+        return None
 
     from_addr = from_addr or app_settings.get("mail_from") or os.environ.get("MAIL_FROM") or mail_usr or "no-reply@example.com"
 
@@ -133,41 +163,74 @@ def send_mail(subject: str, body: str, to: list | None = None, from_addr: str |
     except Exception:
         interval = 2
 
+    return {
+        "host": mail_host, "port": mail_port, "use_tls": mail_use_tls, "use_ssl": mail_use_ssl,
+        "use_auth": mail_use_auth, "usr": mail_usr, "pass": mail_pass, "to": mail_to, "from": from_addr,
+        "retries": retries, "interval": interval,
+    }
+
+
+def build_mail(config: dict, subject: str, body: str) -> MIMEMultipart:
     msg = MIMEMultipart()
-    msg["From"] = from_addr
-    msg["To"] = ", ".join(mail_to)
+    msg["From"] = config["from"]
+    msg["To"] = ", ".join(config["to"])
     msg["Subject"] = subject
     msg.attach(MIMEText(body, "plain"))
+    return msg
+
+
+def smtp_connect(config: dict) -> smtplib.SMTP:
+    """Open (and if configured, secure and authenticate) an SMTP connection; the caller closes it with quit()."""
+    if config["use_ssl"]:
+        logging.debug("Connecting to SMTP (SSL) %s:%s", config["host"], config["port"])
+        server = smtplib.SMTP_SSL(config["host"], config["port"], timeout=10)
+        try:
+            if config["use_auth"] and config["usr"] and config["pass"]:
+                server.login(config["usr"], config["pass"])
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    logging.debug("Connecting to SMTP %s:%s (tls=%s)", config["host"], config["port"], config["use_tls"])
+    server = smtplib.SMTP(config["host"], config["port"], timeout=10)
+    try:
+        server.ehlo()
+        if config["use_tls"]:
+            # Only attempt STARTTLS if the server advertises it
+            if server.has_extn("starttls"):
+                server.starttls()
+                server.ehlo()
+            else:
+                logging.warning("STARTTLS extension not supported by server; continuing without TLS.")
+        # Only attempt login if auth is requested and server supports AUTH
+        if config["use_auth"] and config["usr"] and config["pass"]:
+            if server.has_extn("auth"):
+                server.login(config["usr"], config["pass"])
+            else:
+                logging.warning("SMTP server does not advertise AUTH extension; skipping login.")
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def send_mail(subject: str, body: str, to: list | None = None, from_addr: str | None = None) -> bool:
+    """Send one email now, blocking (with retries); request handlers and harvests should use mail_outbox instead."""
+    config = mail_config(to, from_addr)
+    if config is None:
+        return False
+    retries, interval = config["retries"], config["interval"]
+    msg = build_mail(config, subject, body)
 
     attempt = 1
     while attempt <= retries:
         try:
-            if mail_use_ssl:
-                logging.debug("[mail attempt %d/%d] Connecting to SMTP (SSL) %s:%s", attempt, retries, mail_host, mail_port)
-                with smtplib.SMTP_SSL(mail_host, mail_port, timeout=10) as server:
-                    if mail_use_auth and mail_usr and mail_pass:
-                        server.login(mail_usr, mail_pass)
-                    server.sendmail(from_addr, mail_to, msg.as_string())
-            else:
-                logging.debug("[mail attempt %d/%d] Connecting to SMTP %s:%s (tls=%s)", attempt, retries, mail_host, mail_port, mail_use_tls)
-                with smtplib.SMTP(mail_host, mail_port, timeout=10) as server:
-                    server.ehlo()
-                    if mail_use_tls:
-                        # Only attempt STARTTLS if the server advertises it
-                        if server.has_extn("starttls"):
-                            server.starttls()
-                            server.ehlo()
-                        else:
-                            logging.warning("STARTTLS extension not supported by server; continuing without TLS.")
-                    # Only attempt login if auth is requested and server supports AUTH
-                    if mail_use_auth and mail_usr and mail_pass:
-                        if server.has_extn("auth"):
-                            server.login(mail_usr, mail_pass)
-                        else:
-                            logging.warning("SMTP server does not advertise AUTH extension; skipping login.")
-                    server.sendmail(from_addr, mail_to, msg.as_string())
-
-            logging.info("Email sent successfully to %s", mail_to)
+            logging.debug("[mail attempt %d/%d] Sending email via %s:%s", attempt, retries, config["host"], config["port"])
+            with smtp_connect(config) as server:
+                server.sendmail(config["from"], config["to"], msg.as_string())
+
+            logging.info("Email sent successfully to %s", config["to"])
             return True
         except smtplib.SMTPAuthenticationError as e:
             logging.error("Authentication failed when sending email: %s", e)
@@ -1,19 +1,22 @@
 import logging
+import threading
 from enum import Enum
 from typing import Optional, List
 from datetime import datetime
 
-import psycopg2
-from psycopg2 import OperationalError
 import os
-from sqlalchemy import Column, Integer, BigInteger
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Column, Integer, BigInteger, Index, text
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.sql.schema import UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 from sqlmodel import create_engine, Session
 from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from src.filemetrix.infra.commons import app_settings
+from src.filemetrix.infra.db_pool import pool_kwargs, pool_snapshot
+from src.filemetrix.infra.lazy_import import LazyModule
+from src.filemetrix.infra.query_metrics import instrument_engine, query_stats
 
 # Read DB config with fallbacks to environment variables.
 # Use app_settings.get() to avoid AttributeError when keys are missing.
@@ -31,8 +34,81 @@ except (TypeError, ValueError):
     port = 5432
 
 
+psycopg2 = LazyModule("psycopg2")
+
 DB_URL = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{dbname}"
-engine = create_engine(DB_URL, echo=False)
+# Async engine for request-path queries (repo_metrics); the harvesters keep using the sync engine.
+ASYNC_DB_URL = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{dbname}"
+
+# Engines (and with them the psycopg2/asyncpg drivers) are created by the app lifespan, or on first
+# use by scripts, so importing this module stays cheap and each worker process builds its own pools.
+_engine = None
+_async_engine = None
+_async_sessionmaker = None
+_engine_lock = threading.Lock()
+
+
+def init_engines():
+    """Create the sync and async engines once, with the configured pools and query instrumentation."""
+    global _engine, _async_engine, _async_sessionmaker
+    with _engine_lock:
+        if _engine is not None:
+            return
+        engine = create_engine(DB_URL, echo=False, **pool_kwargs())
+        async_engine = create_async_engine(ASYNC_DB_URL, echo=False, **pool_kwargs(use_async=True))
+        # Time every statement and attribute it to the helper below that issued it.
+        instrument_engine(engine)
+        instrument_engine(async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False)
+        _async_engine = async_engine
+        _engine = engine
+
+
+def get_engine():
+    if _engine is None:
+        init_engines()
+    return _engine
+
+
+def get_async_engine():
+    if _async_engine is None:
+        init_engines()
+    return _async_engine
+
+
+def async_session():
+    """A new AsyncSession on the async engine; use as `async with async_session() as session`."""
+    if _async_sessionmaker is None:
+        init_engines()
+    return _async_sessionmaker()
+
+
+async def dispose_engines():
+    """Close all pooled connections; the engines are recreated on next use."""
+    global _engine, _async_engine, _async_sessionmaker
+    with _engine_lock:
+        engine, async_engine = _engine, _async_engine
+        _engine = _async_engine = _async_sessionmaker = None
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
+
+def get_pool_stats() -> dict:
+    """Occupancy and checkout-wait statistics of the sync and async connection pools (once created)."""
+    engine, async_engine = _engine, _async_engine
+    if engine is None or async_engine is None:
+        return {}
+    return {
+        "sync": pool_snapshot(engine.pool),
+        "async": pool_snapshot(async_engine.sync_engine.pool),
+    }
+
+
+def get_query_stats() -> dict:
+    """Per-function statement latency histograms, row counts and slow-statement counts."""
+    return query_stats.snapshot()
 
 
 def ensure_database_exists() -> bool:
@@ -57,7 +133,7 @@ def ensure_database_exists() -> bool:
                 cur.execute(f'CREATE DATABASE "{dbname}"')
         conn.close()
         return True
-    except OperationalError as oe:
+    except psycopg2.OperationalError as oe:
         logging.warning("Could not connect to Postgres to ensure database exists: %s", oe)
         return False
     except Exception as e:
@@ -127,10 +203,38 @@ class FileMetaDataModel(SQLModel, table=True):
     dataset: Optional["DatasetModel"] = Relationship(back_populates="files")
 
 
+class HarvestJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class HarvestJobModel(SQLModel, table=True):
+    """A harvest requested through the API; harvest executors claim and run it (services/harvest_executor.py)."""
+    __tablename__ = "harvest_job"
+    # At most one queued or running job per repository, whichever the kind, enforced by Postgres
+    # so concurrent requests on different web workers cannot both queue a harvest.
+    __table_args__ = (Index("uix_harvest_job_active_repo", "repo_id", unique=True,
+                            postgresql_where=text("status IN ('queued', 'running')")),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    repo_id: int = Field(foreign_key="repository.id", index=True)
+    kind: str  # "identifiers" or "files"
+    # Stored as the plain enum value, which the partial index above relies on.
+    status: str = Field(default=HarvestJobStatus.QUEUED.value, index=True)
+    attempts: int = Field(default=0)
+    requested_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+
+
 def create_tables() -> bool:
     """Attempt to create tables. Return True on success, False on failure."""
     try:
-        SQLModel.metadata.create_all(engine, checkfirst=True)
+        SQLModel.metadata.create_all(get_engine(), checkfirst=True)
         return True
     except OperationalError as oe:
         logging.warning("Could not create tables because Postgres is unreachable: %s", oe)
@@ -141,7 +245,7 @@ def create_tables() -> bool:
 
 
 def insert_repo(repo: RepositoryModel):
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         try:
             session.add(repo)
             session.commit()
@@ -158,7 +262,7 @@ def insert_repo(repo: RepositoryModel):
 
 
 def insert_dataset(dataset: DatasetModel):
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         try:
             session.add(dataset)
             session.commit()
@@ -173,31 +277,42 @@ def insert_dataset(dataset: DatasetModel):
 
 def insert_file_metadata(file_metadata: FileMetaDataModel):
     try:
-        with Session(engine) as session:
+        with Session(get_engine()) as session:
             session.add(file_metadata)
             session.commit()
             session.refresh(file_metadata)
             return file_metadata
     except IntegrityError as e:
         logging.error(f"Integrity error occurred: {e}")
-        print(f"Integrity error occurred: {e}")
     except Exception as e:
         logging.error(f"An error occurred: {e}")
-        print(f"An error occurred: {e}")
+
+def insert_file_metadata_batch(file_metadata: List[FileMetaDataModel]) -> int:
+    """Insert rows in one transaction; when it fails, fall back to inserting them one by one. Returns rows inserted."""
+    if not file_metadata:
+        return 0
+    try:
+        with Session(get_engine()) as session:
+            session.add_all(file_metadata)
+            session.commit()
+            return len(file_metadata)
+    except Exception as e:
+        logging.warning(f"Batch insert of {len(file_metadata)} file metadata rows failed, inserting one by one: {e}")
+    return sum(1 for fm in file_metadata if insert_file_metadata(FileMetaDataModel(**fm.model_dump(exclude={"id"}))))
 
 def get_repo_by_id(repo_id: int) -> Optional[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(RepositoryModel).options(selectinload(RepositoryModel.datasets)).get(repo_id)
 
 def get_repo_by_prefix_and_url(metadata_prefix: str, url: str) -> Optional[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(RepositoryModel).filter(
             RepositoryModel.metadata_prefix == metadata_prefix,
             RepositoryModel.url == url
         ).first()
 
 def get_all_repos() -> List[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(RepositoryModel).order_by(RepositoryModel.id).all()
 
 
@@ -207,7 +322,7 @@ def update_repository_harvest_info(
     harvest_end: Optional[datetime] = None,
     harvest_status: Optional[str] = None,
 ) -> Optional[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         repo = session.get(RepositoryModel, repo_id)
         if not repo:
             return None
@@ -223,19 +338,19 @@ def update_repository_harvest_info(
         return repo
 
 def get_file_metadata_count() -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(FileMetaDataModel).count()
 
 def get_dataset_count() -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(DatasetModel).count()
 
 def get_dataset_count_by_repo_id(repo_id: int) -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return session.query(DatasetModel).filter(DatasetModel.repo_id == repo_id).count()
 
 def get_file_metadata_count_by_repo_id(repo_id: int) -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return (
             session.query(FileMetaDataModel)
             .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
@@ -244,7 +359,7 @@ def get_file_metadata_count_by_repo_id(repo_id: int) -> int:
         )
 
 def get_dataset_count_by_repo_id_and_status(repo_id: int, harvest_status: HarvestStatus) -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return (
             session.query(DatasetModel)
             .join(RepositoryModel, DatasetModel.repo_id == RepositoryModel.id)
@@ -256,7 +371,7 @@ def get_dataset_count_by_repo_id_and_status(repo_id: int, harvest_status: Harves
         )
 
 def get_dataset_count_by_repo_id_and_fm_status(repo_id: int, harvest_status: HarvestStatus) -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return (
             session.query(DatasetModel)
             .filter(
@@ -269,7 +384,7 @@ def get_dataset_count_by_repo_id_and_fm_status(repo_id: int, harvest_status: Har
 from sqlalchemy import func
 
 def get_file_metadata_count_grouped_by_mime_type():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(FileMetaDataModel.mime_type, func.count(FileMetaDataModel.id))
             .group_by(FileMetaDataModel.mime_type)
@@ -280,7 +395,7 @@ def get_file_metadata_count_grouped_by_mime_type():
 from sqlalchemy import func
 
 def get_file_metadata_count_grouped_by_mime_type_by_repo_id(repo_id: int):
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(FileMetaDataModel.mime_type, func.count(FileMetaDataModel.id))
             .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
@@ -293,7 +408,7 @@ def get_file_metadata_count_grouped_by_mime_type_by_repo_id(repo_id: int):
 from sqlalchemy import func
 
 def get_total_file_size_by_repo_id(repo_id: int) -> int:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         total_size = (
             session.query(func.coalesce(func.sum(FileMetaDataModel.size), 0))
             .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
@@ -303,7 +418,7 @@ def get_total_file_size_by_repo_id(repo_id: int) -> int:
         return total_size
 
 def update_dataset_harvest_fm_start_in_progress(pid: str) -> Optional["DatasetModel"]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         dataset = session.query(DatasetModel).filter(DatasetModel.pid == pid).first()
         if not dataset:
             return None
@@ -315,7 +430,7 @@ def update_dataset_harvest_fm_start_in_progress(pid: str) -> Optional["DatasetMo
         return dataset
 
 def update_dataset_harvest_fm_end_completed(pid: str) -> Optional["DatasetModel"]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         dataset = session.query(DatasetModel).filter(DatasetModel.pid == pid).first()
         if not dataset:
             return None
@@ -326,14 +441,14 @@ def update_dataset_harvest_fm_end_completed(pid: str) -> Optional["DatasetModel"
         session.refresh(dataset)
         return dataset
 
-def delete_file_metadata_by_dataset_pid(dataset_pid: int) -> int:
-    with Session(engine) as session:
+def delete_file_metadata_by_dataset_pid(dataset_pid: str) -> int:
+    with Session(get_engine()) as session:
         deleted = session.query(FileMetaDataModel).filter(FileMetaDataModel.dataset_pid == dataset_pid).delete()
         session.commit()
         return deleted
 
 def dataset_exists(pid: str, repo_id: int) -> bool:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         return (
             session.query(DatasetModel)
             .filter(DatasetModel.pid == pid, DatasetModel.repo_id == repo_id)
@@ -344,7 +459,7 @@ def dataset_exists(pid: str, repo_id: int) -> bool:
 from sqlalchemy import func, extract
 
 def get_dataset_count_grouped_by_publication_month(repo_id: int):
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(
                 extract('year', DatasetModel.publication_date).label('year'),
@@ -363,7 +478,7 @@ def get_dataset_count_grouped_by_publication_month(repo_id: int):
         ]
 
 def get_dataset_count_grouped_by_repo():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(RepositoryModel.name, func.count(DatasetModel.id).label("count"))
             .join(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
@@ -373,7 +488,7 @@ def get_dataset_count_grouped_by_repo():
         return [{"repo-name": name, "dataset-count": count} for name, count in results]
 
 def get_file_metadata_count_grouped_by_repo():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(RepositoryModel.name, func.count(FileMetaDataModel.id).label("count"))
             .join(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
@@ -394,7 +509,7 @@ def format_size(size_bytes: int) -> str:
     return " and ".join(parts) if parts else "0 byte"
 
 def get_total_file_size_grouped_by_repo():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         results = (
             session.query(
                 RepositoryModel.name,
@@ -415,7 +530,7 @@ def get_total_file_size_grouped_by_repo():
         ]
 
 def get_repo_by_dataset_pid(dataset_pid: str) -> Optional[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         dataset = session.query(DatasetModel).filter(DatasetModel.pid == dataset_pid).first()
         if not dataset:
             return None
@@ -423,7 +538,7 @@ def get_repo_by_dataset_pid(dataset_pid: str) -> Optional[RepositoryModel]:
         return repo
 
 def get_repo_by_file_metadata_link(file_link: str) -> Optional[RepositoryModel]:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         file_metadata = session.query(FileMetaDataModel).filter(FileMetaDataModel.link == file_link).first()
         if not file_metadata:
             return None
@@ -431,4 +546,249 @@ def get_repo_by_file_metadata_link(file_link: str) -> Optional[RepositoryModel]:
         if not dataset:
             return None
         repo = session.query(RepositoryModel).get(dataset.repo_id)
-        return repo
\ No newline at end of file
+        return repo
+
+def insert_harvest_job(repo_id: int, kind: str) -> Optional[HarvestJobModel]:
+    """Queue a harvest of `repo_id`; None when the repository already has a queued or running job."""
+    with Session(get_engine()) as session:
+        job = HarvestJobModel(repo_id=repo_id, kind=kind)
+        try:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            return job
+        except IntegrityError:
+            session.rollback()
+            return None
+
+def get_harvest_job(job_id: int) -> Optional[HarvestJobModel]:
+    with Session(get_engine()) as session:
+        return session.get(HarvestJobModel, job_id)
+
+def get_active_harvest_job(repo_id: int) -> Optional[HarvestJobModel]:
+    with Session(get_engine()) as session:
+        return session.query(HarvestJobModel).filter(
+            HarvestJobModel.repo_id == repo_id,
+            HarvestJobModel.status.in_([HarvestJobStatus.QUEUED.value, HarvestJobStatus.RUNNING.value]),
+        ).first()
+
+
+# Async variants of the metric queries served by repo_metrics. They run on the async engine so
+# COUNT/SUM queries do not block the event loop while other requests are waiting.
+from sqlalchemy import select
+
+
+async def get_repo_by_id_async(repo_id: int) -> Optional[RepositoryModel]:
+    async with async_session() as session:
+        return await session.get(RepositoryModel, repo_id)
+
+async def get_repo_by_prefix_and_url_async(metadata_prefix: str, url: str) -> Optional[RepositoryModel]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(RepositoryModel)
+            .where(RepositoryModel.metadata_prefix == metadata_prefix, RepositoryModel.url == url)
+            .limit(1)
+        )
+        return result.scalars().first()
+
+async def get_all_repos_async() -> List[RepositoryModel]:
+    async with async_session() as session:
+        result = await session.execute(select(RepositoryModel).order_by(RepositoryModel.id))
+        return list(result.scalars().all())
+
+async def get_repo_count_async() -> int:
+    async with async_session() as session:
+        return await session.scalar(select(func.count()).select_from(RepositoryModel))
+
+async def get_file_metadata_count_async() -> int:
+    async with async_session() as session:
+        return await session.scalar(select(func.count()).select_from(FileMetaDataModel))
+
+async def get_dataset_count_async() -> int:
+    async with async_session() as session:
+        return await session.scalar(select(func.count()).select_from(DatasetModel))
+
+async def get_dataset_count_by_repo_id_async(repo_id: int) -> int:
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.count()).select_from(DatasetModel).where(DatasetModel.repo_id == repo_id)
+        )
+
+async def get_file_metadata_count_by_repo_id_async(repo_id: int) -> int:
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.count(FileMetaDataModel.id))
+            .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
+            .where(DatasetModel.repo_id == repo_id)
+        )
+
+async def get_dataset_count_by_repo_id_and_status_async(repo_id: int, harvest_status: HarvestStatus) -> int:
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.count(DatasetModel.id))
+            .join(RepositoryModel, DatasetModel.repo_id == RepositoryModel.id)
+            .where(DatasetModel.repo_id == repo_id, RepositoryModel.harvest_ds_status == harvest_status)
+        )
+
+async def get_dataset_count_by_repo_id_and_fm_status_async(repo_id: int, harvest_status: HarvestStatus) -> int:
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.count(DatasetModel.id))
+            .where(DatasetModel.repo_id == repo_id, DatasetModel.harvest_fm_status == harvest_status)
+        )
+
+async def get_file_metadata_count_grouped_by_mime_type_async():
+    async with async_session() as session:
+        results = await session.execute(
+            select(FileMetaDataModel.mime_type, func.count(FileMetaDataModel.id))
+            .group_by(FileMetaDataModel.mime_type)
+            .order_by(func.count(FileMetaDataModel.id).desc())
+        )
+        return [{"mime_type": mime_type, "count": count} for mime_type, count in results.all()]
+
+async def get_file_metadata_count_grouped_by_mime_type_by_repo_id_async(repo_id: int):
+    async with async_session() as session:
+        results = await session.execute(
+            select(FileMetaDataModel.mime_type, func.count(FileMetaDataModel.id))
+            .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
+            .where(DatasetModel.repo_id == repo_id)
+            .group_by(FileMetaDataModel.mime_type)
+        )
+        return [{"mime_type": mime_type, "count": count} for mime_type, count in results.all()]
+
+async def get_total_file_size_by_repo_id_async(repo_id: int) -> int:
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.coalesce(func.sum(FileMetaDataModel.size), 0))
+            .join(DatasetModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
+            .where(DatasetModel.repo_id == repo_id)
+        )
+
+async def get_dataset_count_grouped_by_publication_month_async(repo_id: int):
+    year = extract('year', DatasetModel.publication_date).label('year')
+    month = extract('month', DatasetModel.publication_date).label('month')
+    async with async_session() as session:
+        results = await session.execute(
+            select(year, month, func.count(DatasetModel.id).label('count'))
+            .where(DatasetModel.repo_id == repo_id)
+            .group_by(year, month)
+            .order_by(year, month)
+        )
+        return [
+            {"year": int(y), "month": int(m), "count": count}
+            for y, m, count in results.all()
+            if y is not None and m is not None
+        ]
+
+async def get_dataset_count_grouped_by_repo_async():
+    async with async_session() as session:
+        results = await session.execute(
+            select(RepositoryModel.name, func.count(DatasetModel.id).label("count"))
+            .join(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
+            .group_by(RepositoryModel.name)
+        )
+        return [{"repo-name": name, "dataset-count": count} for name, count in results.all()]
+
+async def get_file_metadata_count_grouped_by_repo_async():
+    async with async_session() as session:
+        results = await session.execute(
+            select(RepositoryModel.name, func.count(FileMetaDataModel.id).label("count"))
+            .join(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
+            .join(FileMetaDataModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
+            .group_by(RepositoryModel.name)
+        )
+        return [{"repo-name": name, "file-metadata-count": count} for name, count in results.all()]
+
+async def get_total_file_size_grouped_by_repo_async():
+    async with async_session() as session:
+        results = await session.execute(
+            select(
+                RepositoryModel.name,
+                func.coalesce(func.sum(FileMetaDataModel.size), 0).label("total_size")
+            )
+            .join(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
+            .join(FileMetaDataModel, FileMetaDataModel.dataset_pid == DatasetModel.pid)
+            .group_by(RepositoryModel.name)
+        )
+        return [
+            {
+                "repository-name": name,
+                "total-file-size": int(total_size),
+                "total-file-size-in-friendly": format_size(int(total_size))
+            }
+            for name, total_size in results.all()
+        ]
+
+async def get_repo_data_versions_async() -> List[tuple]:
+    """Per repository, what its metrics change with: (id, harvest_ds_start, harvest_ds_end, harvest_ds_status,
+    newest dataset id, latest harvest_fm_start, latest harvest_fm_end, datasets with a file harvest in progress).
+
+    Reads repository and dataset only; file_metadata is never scanned.
+    """
+    async with async_session() as session:
+        results = await session.execute(
+            select(
+                RepositoryModel.id,
+                RepositoryModel.harvest_ds_start,
+                RepositoryModel.harvest_ds_end,
+                RepositoryModel.harvest_ds_status,
+                func.max(DatasetModel.id),
+                func.max(DatasetModel.harvest_fm_start),
+                func.max(DatasetModel.harvest_fm_end),
+                func.count(DatasetModel.id).filter(DatasetModel.harvest_fm_status == HarvestStatus.IN_PROGRESS),
+            )
+            .outerjoin(DatasetModel, DatasetModel.repo_id == RepositoryModel.id)
+            .group_by(RepositoryModel.id)
+            .order_by(RepositoryModel.id)
+        )
+        return [tuple(row) for row in results.all()]
+
+async def get_latest_file_metadata_id_async() -> Optional[int]:
+    """Highest file_metadata id (a primary key index lookup); it grows with every file row inserted."""
+    async with async_session() as session:
+        return await session.scalar(select(func.max(FileMetaDataModel.id)))
+
+async def get_harvested_dataset_async(pids: List[str], harvested_since: datetime) -> Optional[DatasetModel]:
+    """First dataset among `pids` whose file-metadata harvest completed at or after `harvested_since`."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(DatasetModel)
+            .where(
+                DatasetModel.pid.in_(pids),
+                DatasetModel.harvest_fm_status == HarvestStatus.COMPLETED,
+                DatasetModel.harvest_fm_end >= harvested_since,
+            )
+            .limit(1)
+        )
+        return result.scalars().first()
+
+async def get_file_metadata_by_dataset_pid_async(dataset_pid: str) -> List[FileMetaDataModel]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(FileMetaDataModel)
+            .where(FileMetaDataModel.dataset_pid == dataset_pid)
+            .order_by(FileMetaDataModel.id)
+        )
+        return list(result.scalars().all())
+
+async def iter_file_metadata_by_dataset_pid_async(dataset_pid: str, batch_size: int = 1000):
+    """Yield the file rows of a dataset `batch_size` rows at a time from a server-side cursor."""
+    async with async_session() as session:
+        rows = await session.stream_scalars(
+            select(FileMetaDataModel)
+            .where(FileMetaDataModel.dataset_pid == dataset_pid)
+            .order_by(FileMetaDataModel.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in rows:
+            yield row
+
+async def get_distinct_mime_types_by_dataset_pid_async(dataset_pid: str) -> List[str]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(FileMetaDataModel.mime_type)
+            .where(FileMetaDataModel.dataset_pid == dataset_pid)
+            .distinct()
+        )
+        return [mime_type for mime_type in result.scalars().all() if mime_type]
+
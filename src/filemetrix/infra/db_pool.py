@@ -0,0 +1,154 @@
+import logging
+import sys
+import threading
+import time
+
+import greenlet
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from src.filemetrix.infra.commons import get_int_setting, get_float_setting, get_bool_setting
+from src.filemetrix.infra.stats import Histogram
+
+# Pool configuration (dynaconf keys / env vars). Defaults match SQLAlchemy's QueuePool defaults, except
+# pre-ping, enabled so connections dropped by Postgres are replaced transparently, and recycling after
+# 30 minutes, matching conf/settings.toml.
+POOL_SIZE = get_int_setting("db_pool_size", 5)
+POOL_MAX_OVERFLOW = get_int_setting("db_pool_max_overflow", 10)
+POOL_TIMEOUT = get_float_setting("db_pool_timeout", 30.0)
+POOL_RECYCLE = get_int_setting("db_pool_recycle", 1800)
+POOL_PRE_PING = get_bool_setting("db_pool_pre_ping", True)
+POOL_WAIT_WARN_SECONDS = get_float_setting("db_pool_wait_warn_seconds", 1.0)
+
+# Frames from these modules are skipped when looking for the function that asked for a connection.
+_LIBRARY_PREFIXES = ("sqlalchemy", "sqlmodel", "psycopg2", "asyncpg", __name__)
+
+
+def iter_caller_frames():
+    """Yield frames from the caller outwards.
+
+    Statements issued through the async engine run inside a greenlet spawned by SQLAlchemy; once
+    that greenlet's own stack is exhausted the walk continues in the parent greenlet, which holds
+    the coroutine frames of the application code awaiting the query.
+    """
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            yield frame
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return
+        frame = current.gr_frame
+
+
+def caller_name(skip: tuple = ()) -> str:
+    """Return `module.function` of the first application frame below the SQLAlchemy machinery.
+
+    `skip` lists additional module prefixes to step over (e.g. the instrumentation calling this).
+    """
+    prefixes = _LIBRARY_PREFIXES + tuple(skip)
+    for frame in iter_caller_frames():
+        module = frame.f_globals.get("__name__", "")
+        if not module.startswith(prefixes):
+            return f"{module}.{frame.f_code.co_name}"
+    return "unknown"
+
+
+class PoolStats:
+    """Checkout counters for one instrumented pool class (sync or async engine)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = Histogram()
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.slow_waits = 0
+
+    def record_checkout(self, waited: float, overflowed: bool):
+        self.wait.observe(waited)
+        with self._lock:
+            self.checkouts += 1
+            if overflowed:
+                self.overflow_events += 1
+            if waited >= POOL_WAIT_WARN_SECONDS:
+                self.slow_waits += 1
+
+    def record_timeout(self, waited: float):
+        self.wait.observe(waited)
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = {
+                "checkouts": self.checkouts,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "slow_waits": self.slow_waits,
+            }
+        return {**counters, "wait_seconds": self.wait.snapshot()}
+
+
+class InstrumentedPoolMixin:
+    """Times every connection checkout and reports overflow connections and slow waits.
+
+    `_do_get` is the QueuePool hook that blocks when all connections are checked out, so the
+    time spent inside it is exactly the wait a caller experiences.
+    """
+
+    stats: PoolStats
+
+    def _do_get(self):
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            waited = time.perf_counter() - start
+            self.stats.record_timeout(waited)
+            logging.error("DB pool checkout timed out after %.3fs in %s (%s)", waited, caller_name(), self.status())
+            raise
+        waited = time.perf_counter() - start
+        overflowed = self.overflow() > max(overflow_before, 0)
+        self.stats.record_checkout(waited, overflowed)
+        if waited >= POOL_WAIT_WARN_SECONDS:
+            logging.warning("DB pool checkout waited %.3fs (threshold %.3fs) in %s (%s)",
+                            waited, POOL_WAIT_WARN_SECONDS, caller_name(), self.status())
+        return conn
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def pool_kwargs(use_async: bool = False) -> dict:
+    """Keyword arguments for `create_engine`/`create_async_engine` that apply the configured pool settings."""
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if use_async else InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def pool_snapshot(pool) -> dict:
+    """Current occupancy of `pool` combined with its checkout statistics."""
+    return {
+        "size": pool.size(),
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seconds": POOL_TIMEOUT,
+        "wait_warn_seconds": POOL_WAIT_WARN_SECONDS,
+        **type(pool).stats.snapshot(),
+    }
@@ -0,0 +1,49 @@
+import copy
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """Point in time by which a request must be answered, passed down to every blocking call it makes.
+
+    `exceeded` is set once any call ran out of time, so callers can tell a complete result from a partial one.
+    Work done for several results under one request deadline (a batch, a shared resolution) runs under a
+    `child()` each, so one result cut short does not mark the others partial.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.exceeded = False
+
+    def child(self) -> "Deadline":
+        """A deadline expiring at the same time with its own `exceeded` flag."""
+        child = copy.copy(self)
+        child.exceeded = False
+        return child
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def fail(self) -> DeadlineExceeded:
+        self.exceeded = True
+        return DeadlineExceeded(f"Deadline of {self.seconds:g}s exceeded")
+
+    def timeout(self, cap: float | None = None) -> float:
+        """Timeout for the next blocking call: what is left of the deadline, at most `cap`.
+
+        Raises DeadlineExceeded when nothing is left.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise self.fail()
+        return remaining if cap is None else min(remaining, cap)
+
+    def check(self):
+        self.timeout()
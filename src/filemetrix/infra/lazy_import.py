@@ -0,0 +1,52 @@
+import importlib
+import logging
+import threading
+import time
+import types
+
+_lock = threading.Lock()
+# Module name -> seconds its first import took, for the internal metrics endpoint.
+_load_seconds: dict[str, float] = {}
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a heavy module that is imported on first attribute access.
+
+    `requests = LazyModule("requests")` keeps `requests.get(...)` and `except requests.Timeout` working
+    while the import cost moves from process start to the first request that needs it. Annotations
+    that name the module's types must be strings (or the file must use `from __future__ import annotations`).
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    elapsed = time.perf_counter() - start
+                    _load_seconds[self.__name__] = round(elapsed, 4)
+                    logging.debug(f"Lazily imported {self.__name__} in {elapsed:.3f} seconds")
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import_stats() -> dict:
+    """Lazily imported modules loaded so far and how long each import took."""
+    with _lock:
+        return {"loaded": dict(_load_seconds)}
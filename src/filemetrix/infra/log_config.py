@@ -0,0 +1,158 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from src.filemetrix.infra.commons import app_settings, get_bool_setting, get_float_setting, get_int_setting
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+# Slow statements reported by infra/query_metrics.py; also written to `db_slow_query_log_file` when set.
+SLOW_QUERY_LOGGER = "filemetrix.slow_query"
+# LogRecord attributes; anything else on a record came from `extra=` and is added to the JSON output.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, thread, message, exception and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            doc["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                doc[key] = value
+        return json.dumps(doc, default=str)
+
+
+def _level(value, default: int) -> int:
+    if value is None or value == "":
+        return default
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else default
+
+
+def _logger_levels(raw) -> dict[str, int]:
+    """`log_levels` as a table ({"sqlalchemy.engine" = "WARNING"}) or, from the environment, "name=LEVEL,...". """
+    if isinstance(raw, str):
+        raw = dict(item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {name.strip(): _level(level, logging.INFO) for name, level in (raw or {}).items()}
+
+
+def process_log_file(path: str, role: str) -> str:
+    """`path` when this is the only process writing it (a single API process), else `path` with the role and
+    pid before the extension (fms.log -> fms.harvest-4711.log): the rotating handlers of several processes
+    must not share a file, or their midnight rollovers rename it under each other and lines are lost."""
+    if role == "api" and get_int_setting("web_workers", 1) <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{role}-{os.getpid()}{ext}"
+
+
+def _log_path(path: str, role: str) -> str:
+    if not os.path.isabs(path):
+        path = os.path.join(os.environ.get("BASE_DIR", "."), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return process_log_file(path, role)
+
+
+def setup_logging(role: str = "api") -> QueueListener:
+    """Route all logging through a queue, so callers never wait for formatting or file writes.
+
+    The root logger only gets a QueueHandler; a QueueListener thread writes to the rotating log
+    file, unless `log_console` is off to stdout, and slow-query records to `db_slow_query_log_file`
+    when set. `role` names the process kind ("api", "harvest") in per-process file names (see
+    `process_log_file`). Returns the started listener (stopped at exit).
+    """
+    log_file = _log_path(app_settings.get("log_file") or "./logs/fms.log", role)
+
+    file_handler = TimedRotatingFileHandler(log_file, when="midnight", interval=1, backupCount=7,
+                                            encoding="utf-8", utc=True)
+    file_handler.suffix = "%Y-%m-%d"
+    handlers: list[logging.Handler] = [file_handler]
+    if get_bool_setting("log_console", True):
+        handlers.append(logging.StreamHandler(sys.stdout))
+    slow_query_log_file = app_settings.get("db_slow_query_log_file")
+    if slow_query_log_file:
+        slow_query_handler = logging.FileHandler(_log_path(slow_query_log_file, role), encoding="utf-8")
+        slow_query_handler.addFilter(logging.Filter(SLOW_QUERY_LOGGER))
+        handlers.append(slow_query_handler)
+
+    formatter = JsonFormatter() if get_bool_setting("log_json", False) \
+        else logging.Formatter(app_settings.get("log_format") or DEFAULT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(_level(app_settings.get("log_level"), logging.INFO))
+    logging.getLogger(SLOW_QUERY_LOGGER).setLevel(_level(app_settings.get("db_slow_query_log_level"), logging.WARNING))
+    for name, level in _logger_levels(app_settings.get("log_levels")).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener):
+    # QueueListener.stop() fails when called twice; the app may already have stopped it.
+    if listener._thread is not None:
+        listener.stop()
+
+
+class SampledLogger:
+    """Logger for per-item messages in hot loops (one per record, file or identifier).
+
+    A message is emitted when `every` calls have been suppressed since the last one or
+    `interval` seconds have passed, and it carries the number of suppressed calls. Calls below
+    the logger's level return before any formatting.
+    """
+
+    def __init__(self, name: str, every: int | None = None, interval: float | None = None):
+        self.logger = logging.getLogger(name)
+        self.every = max(1, every or get_int_setting("log_sample_every", 1000))
+        self.interval = interval if interval is not None else get_float_setting("log_sample_interval_seconds", 10.0)
+        self._lock = threading.Lock()
+        self._suppressed = 0
+        self._last_emit = 0.0
+
+    def log(self, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._suppressed + 1 < self.every and now - self._last_emit < self.interval:
+                self._suppressed += 1
+                return
+            suppressed, self._suppressed, self._last_emit = self._suppressed, 0, now
+        if suppressed:
+            msg = f"{msg} (+{suppressed} similar suppressed)"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg: str, *args):
+        self.log(logging.WARNING, msg, *args)
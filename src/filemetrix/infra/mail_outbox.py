@@ -0,0 +1,211 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from src.filemetrix.infra.commons import build_mail, get_int_setting, mail_config, smtp_connect
+
+
+@dataclass
+class OutgoingMail:
+    subject: str
+    body: str
+    to: list | None = None
+    from_addr: str | None = None
+    queued_at: float = field(default_factory=time.time)
+    # Number of notifications merged into this email, for digests.
+    merged: int = 0
+
+
+_STOP = object()
+
+
+class MailOutbox:
+    """Background sender for notification emails: callers enqueue and return immediately.
+
+    One worker thread drains the queue in batches of up to `batch_size` over a single SMTP
+    connection, which stays open for `idle_seconds` after the last message; retries and their
+    sleeps happen on the worker only. With `digest_seconds` > 0, messages enqueued with
+    `digest=True` (per-repository harvest notifications) are collected and sent as one email per
+    recipient list at most every `digest_seconds`.
+    """
+
+    def __init__(self, max_size: int = 1000, batch_size: int = 50, digest_seconds: int = 0, idle_seconds: int = 30):
+        self.batch_size = max(1, batch_size)
+        self.digest_seconds = digest_seconds
+        self.idle_seconds = idle_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._digest: list[OutgoingMail] = []
+        self._server: smtplib.SMTP | None = None
+        self._server_used_at = 0.0
+        self._stats = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0, "digested": 0, "digests_sent": 0,
+                       "batches": 0, "connections": 0}
+
+    @classmethod
+    def from_settings(cls) -> "MailOutbox":
+        return cls(
+            max_size=get_int_setting("mail_outbox_max_size", 1000),
+            batch_size=get_int_setting("mail_batch_size", 50),
+            digest_seconds=get_int_setting("mail_digest_seconds", 0),
+            idle_seconds=get_int_setting("mail_connection_idle_seconds", 30),
+        )
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def enqueue(self, subject: str, body: str, to: list | None = None, from_addr: str | None = None,
+                digest: bool = False) -> bool:
+        """Queue an email for the worker; False when the outbox is full and the message was dropped."""
+        mail = OutgoingMail(subject, body, to, from_addr)
+        if digest and self.digest_seconds > 0:
+            with self._lock:
+                self._digest.append(mail)
+                self._stats["digested"] += 1
+        else:
+            try:
+                self._queue.put_nowait(mail)
+            except queue.Full:
+                self._count("dropped")
+                logging.error(f"Mail outbox is full, dropping email: {subject}")
+                return False
+            self._count("queued")
+        self._ensure_worker()
+        return True
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-outbox", daemon=True)
+                self._thread.start()
+
+    def _digest_due(self) -> float | None:
+        """Seconds until the pending digest is due (<= 0 when due), or None when nothing is pending."""
+        with self._lock:
+            if not self._digest:
+                return None
+            return self._digest[0].queued_at + self.digest_seconds - time.time()
+
+    def _take_digests(self) -> list[OutgoingMail]:
+        with self._lock:
+            pending, self._digest = self._digest, []
+        groups: dict[tuple, list[OutgoingMail]] = {}
+        for mail in pending:
+            groups.setdefault((tuple(mail.to) if mail.to else None, mail.from_addr), []).append(mail)
+        digests = []
+        for (to, from_addr), mails in groups.items():
+            sections = [
+                f"[{datetime.fromtimestamp(mail.queued_at).isoformat(timespec='seconds')}] {mail.subject}\n\n{mail.body}"
+                for mail in mails
+            ]
+            digests.append(OutgoingMail(
+                f"FileMetrix notifications digest ({len(mails)} notification{'s' if len(mails) != 1 else ''})",
+                "\n\n----------------------------------------\n\n".join(sections),
+                list(to) if to else None,
+                from_addr,
+                merged=len(mails),
+            ))
+        return digests
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            due = self._digest_due()
+            timeout = self.idle_seconds if due is None else max(0.0, min(due, self.idle_seconds))
+            batch = []
+            try:
+                item = self._queue.get(timeout=timeout)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            due = self._digest_due()
+            if due is not None and (due <= 0 or stopping):
+                batch.extend(self._take_digests())
+            if batch:
+                self._send_batch(batch)
+            elif self._server is not None and time.time() - self._server_used_at >= self.idle_seconds:
+                self._disconnect()
+        self._disconnect()
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    def _send_batch(self, batch: list[OutgoingMail]):
+        self._count("batches")
+        for mail in batch:
+            if self._send(mail) and mail.merged:
+                self._count("digests_sent")
+
+    def _send(self, mail: OutgoingMail) -> bool:
+        config = mail_config(mail.to, mail.from_addr)
+        if config is None:
+            self._count("failed")
+            return False
+        msg = build_mail(config, mail.subject, mail.body)
+        for attempt in range(1, config["retries"] + 1):
+            try:
+                if self._server is None:
+                    self._server = smtp_connect(config)
+                    self._count("connections")
+                self._server.sendmail(config["from"], config["to"], msg.as_string())
+                self._server_used_at = time.time()
+                self._count("sent")
+                logging.info(f"Email sent to {config['to']}: {mail.subject}")
+                return True
+            except smtplib.SMTPAuthenticationError as e:
+                logging.error(f"Authentication failed when sending email: {e}")
+                self._disconnect()
+                break
+            except Exception as e:
+                # The connection may have been dropped by the server; reconnect on the next attempt.
+                logging.warning(f"Failed to send email on attempt {attempt}/{config['retries']}: {e}")
+                self._disconnect()
+                if attempt < config["retries"]:
+                    time.sleep(config["interval"])
+        self._count("failed")
+        logging.error(f"Giving up on email: {mail.subject}")
+        return False
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending mail (including any digest) and stop the worker, waiting at most `timeout` seconds."""
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            if self._digest_due() is None:
+                return
+            self._ensure_worker()
+            thread = self._thread
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning("Mail outbox is full; not all queued emails will be sent")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(pending=self._queue.qsize(), digest_pending=len(self._digest))
+        stats.update(batch_size=self.batch_size, digest_seconds=self.digest_seconds)
+        return stats
+
+
+mail_outbox = MailOutbox.from_settings()
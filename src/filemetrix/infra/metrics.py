@@ -0,0 +1,265 @@
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess, start_http_server
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, HistogramMetricFamily
+
+from src.filemetrix.infra.commons import get_float_setting
+from src.filemetrix.infra.db import get_pool_stats, get_query_stats
+
+# Buckets for slow remote calls (PID resolution can take minutes).
+REMOTE_CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "filemetrix_http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+)
+HARVESTS_IN_FLIGHT = Gauge(
+    "filemetrix_harvests_in_flight",
+    "Harvests currently running in this process",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+HARVEST_ITEMS = Counter(
+    "filemetrix_harvest_items",
+    "Items handled by harvests (records for identifier harvests, datasets/files for file harvests)",
+    ["kind", "unit", "repo_id"],
+)
+HARVEST_THROUGHPUT = Gauge(
+    "filemetrix_harvest_items_per_second",
+    "Average throughput of the current (or last) harvest run",
+    ["kind", "unit", "repo_id"],
+    multiprocess_mode="max",
+)
+PID_FETCH_SECONDS = Histogram(
+    "filemetrix_pid_fetch_duration_seconds",
+    "Latency of PID file-listing resolution",
+    ["operation", "outcome"],
+    buckets=REMOTE_CALL_BUCKETS,
+)
+
+
+class HarvestRun:
+    """Counts items for one harvest run and keeps its items/sec gauges current."""
+
+    def __init__(self, kind: str, repo_id):
+        self.kind = kind
+        self.repo_id = str(repo_id)
+        self.started = time.monotonic()
+        self._totals: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, unit: str, n: int = 1):
+        HARVEST_ITEMS.labels(self.kind, unit, self.repo_id).inc(n)
+        with self._lock:
+            total = self._totals[unit] = self._totals.get(unit, 0) + n
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        HARVEST_THROUGHPUT.labels(self.kind, unit, self.repo_id).set(total / elapsed)
+
+
+@contextmanager
+def track_harvest(kind: str, repo_id):
+    """Mark a harvest as in flight for the duration of the block and yield its HarvestRun."""
+    HARVESTS_IN_FLIGHT.labels(kind).inc()
+    try:
+        yield HarvestRun(kind, repo_id)
+    finally:
+        HARVESTS_IN_FLIGHT.labels(kind).dec()
+
+
+def _histogram_family(name: str, documentation: str, labels: list, samples: list) -> HistogramMetricFamily:
+    """Convert infra.stats.Histogram snapshots ([(label_values, snapshot)]) to a Prometheus histogram."""
+    family = HistogramMetricFamily(name, documentation, labels=labels)
+    for label_values, snapshot in samples:
+        buckets = [(le, count) for le, count in snapshot["buckets"].items()]
+        family.add_metric(label_values, buckets, snapshot["sum"])
+    return family
+
+
+def _own_stats() -> dict:
+    from src.filemetrix.services.resolver_pool import resolver_pool
+
+    return {"pools": get_pool_stats(), "queries": get_query_stats(), "resolver": resolver_pool.stats()}
+
+
+def _process_stats(from_files: bool) -> tuple[list[str], list[tuple[list[str], dict]]]:
+    """(extra label names, [(their values, stats)]): this process's statistics, or with `from_files` those
+    every live web worker published to the multiprocess directory, labelled with its pid."""
+    if not from_files:
+        return [], [([], _own_stats())]
+    processes = []
+    stale_before = time.time() - 3 * PROCESS_STATS_SECONDS
+    for path in sorted(glob.glob(os.path.join(os.environ[MULTIPROC_DIR_ENV], "process_stats_*.json"))):
+        pid = os.path.basename(path)[len("process_stats_"):-len(".json")]
+        try:
+            if os.path.getmtime(path) < stale_before:
+                continue
+            with open(path, encoding="utf-8") as f:
+                processes.append(([pid], json.load(f)))
+        except (OSError, ValueError):
+            continue  # removed or being replaced by its worker
+    return ["pid"], processes
+
+
+class DatabaseCollector:
+    """Exports the DB pool and per-function query statistics gathered in infra/db_pool and infra/query_metrics.
+
+    With `from_files`, the statistics of every web worker (see `publish_process_stats`), with a `pid` label.
+    """
+
+    def __init__(self, from_files: bool = False):
+        self.from_files = from_files
+
+    def collect(self):
+        extra, processes = _process_stats(self.from_files)
+        engine_labels, function_labels = extra + ["engine"], extra + ["function"]
+        gauges = {
+            "size": GaugeMetricFamily("filemetrix_db_pool_size", "Configured pool size", labels=engine_labels),
+            "checked_out": GaugeMetricFamily("filemetrix_db_pool_checked_out", "Connections in use", labels=engine_labels),
+            "overflow": GaugeMetricFamily("filemetrix_db_pool_overflow", "Overflow connections open", labels=engine_labels),
+        }
+        counters = {
+            "checkouts": CounterMetricFamily("filemetrix_db_pool_checkouts", "Connection checkouts", labels=engine_labels),
+            "overflow_events": CounterMetricFamily("filemetrix_db_pool_overflow_events", "Checkouts that opened an overflow connection", labels=engine_labels),
+            "timeouts": CounterMetricFamily("filemetrix_db_pool_timeouts", "Checkouts that timed out", labels=engine_labels),
+        }
+        rows = CounterMetricFamily("filemetrix_db_query_rows", "Rows returned or affected by function", labels=function_labels)
+        waits, latencies = [], []
+        for process, stats in processes:
+            for engine_name, snapshot in stats["pools"].items():
+                for key, family in gauges.items():
+                    family.add_metric(process + [engine_name], snapshot[key])
+                for key, family in counters.items():
+                    family.add_metric(process + [engine_name], snapshot[key])
+                waits.append((process + [engine_name], snapshot["wait_seconds"]))
+            for function, function_stats in stats["queries"].items():
+                rows.add_metric(process + [function], function_stats["rows"])
+                latencies.append((process + [function], function_stats["latency_seconds"]))
+        yield from gauges.values()
+        yield from counters.values()
+        yield _histogram_family(
+            "filemetrix_db_pool_wait_seconds", "Time spent waiting for a pooled connection", engine_labels, waits,
+        )
+        yield _histogram_family(
+            "filemetrix_db_query_duration_seconds", "SQL statement latency by infra/db.py function", function_labels,
+            latencies,
+        )
+        yield rows
+
+
+class ResolverPoolCollector:
+    """Exports queue depth, rejections and wait times of the PID resolver pool (per web worker with `from_files`)."""
+
+    def __init__(self, from_files: bool = False):
+        self.from_files = from_files
+
+    def collect(self):
+        extra, processes = _process_stats(self.from_files)
+        queued = GaugeMetricFamily("filemetrix_pid_resolver_queued", "PID resolutions waiting for a resolver thread",
+                                   labels=extra)
+        running = GaugeMetricFamily("filemetrix_pid_resolver_running", "PID resolutions currently running", labels=extra)
+        rejected = CounterMetricFamily("filemetrix_pid_resolver_rejected",
+                                       "PID resolutions rejected because the queue was full", labels=extra)
+        for process, stats in processes:
+            queued.add_metric(process, stats["resolver"]["queued"])
+            running.add_metric(process, stats["resolver"]["running"])
+            rejected.add_metric(process, stats["resolver"]["rejected"])
+        yield from (queued, running, rejected)
+        yield _histogram_family(
+            "filemetrix_pid_resolver_wait_seconds", "Time PID resolutions waited for a resolver thread", extra,
+            [(process, stats["resolver"]["wait_seconds"]) for process, stats in processes],
+        )
+
+
+REGISTRY.register(DatabaseCollector())
+REGISTRY.register(ResolverPoolCollector())
+
+# prometheus_client's multiprocess mode: every process writes its samples to files in this directory.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+# How often each web worker publishes its DB pool and resolver statistics there; three missed rounds
+# (a crashed worker) drop them from /metrics.
+PROCESS_STATS_SECONDS = get_float_setting("metrics_process_stats_seconds", 5.0)
+
+
+def prepare_multiprocess_dir() -> str:
+    """Called by the web server before it starts several workers, which inherit the directory through the
+    environment. Uses PROMETHEUS_MULTIPROC_DIR when set (clearing files of earlier runs), else a new temp dir."""
+    directory = os.environ.get(MULTIPROC_DIR_ENV) or tempfile.mkdtemp(prefix="filemetrix-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.db")) + glob.glob(os.path.join(directory, "process_stats_*.json")):
+        os.remove(path)
+    os.environ[MULTIPROC_DIR_ENV] = directory
+    logging.info(f"Prometheus metrics of all web workers are aggregated through {directory}")
+    return directory
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry for /metrics: in multiprocess mode the samples of all worker processes summed up, plus the
+    DB pool and resolver statistics each worker published (labelled with its pid); otherwise this process's registry."""
+    if not os.environ.get(MULTIPROC_DIR_ENV):
+        return REGISTRY
+    publish_process_stats()  # the answering worker's own numbers are current
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(DatabaseCollector(from_files=True))
+    registry.register(ResolverPoolCollector(from_files=True))
+    return registry
+
+
+def _process_stats_path() -> str:
+    return os.path.join(os.environ[MULTIPROC_DIR_ENV], f"process_stats_{os.getpid()}.json")
+
+
+def publish_process_stats():
+    """Write this worker's DB pool and resolver statistics for the other workers' /metrics (multiprocess mode)."""
+    path = _process_stats_path()
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(_own_stats(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+_publisher_stop = threading.Event()
+
+
+def start_process_stats_publisher():
+    """In multiprocess mode, publish this worker's statistics every PROCESS_STATS_SECONDS until it stops."""
+    if not os.environ.get(MULTIPROC_DIR_ENV):
+        return
+
+    def run():
+        while not _publisher_stop.wait(PROCESS_STATS_SECONDS):
+            try:
+                publish_process_stats()
+            except Exception as e:
+                logging.warning(f"Could not publish process statistics for /metrics: {e}")
+
+    publish_process_stats()
+    threading.Thread(target=run, name="metrics-publisher", daemon=True).start()
+
+
+def mark_process_stopped():
+    """Drop this process's live gauges and published statistics from the multiprocess aggregate
+    (call on worker shutdown)."""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        _publisher_stop.set()
+        multiprocess.mark_process_dead(os.getpid())
+        try:
+            os.remove(_process_stats_path())
+        except FileNotFoundError:
+            pass
+
+
+def serve_metrics(port: int):
+    """Expose this process's metrics on http://0.0.0.0:`port`/metrics for processes without the API (harvest workers)."""
+    if port <= 0:
+        logging.info("Metrics endpoint disabled (port 0)")
+        return
+    start_http_server(port)
+    logging.info(f"Serving Prometheus metrics on port {port}")
@@ -0,0 +1,160 @@
+import logging
+import random
+import threading
+import time
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+
+from src.filemetrix.infra.commons import get_float_setting
+from src.filemetrix.infra.db_pool import iter_caller_frames, caller_name
+from src.filemetrix.infra.log_config import SLOW_QUERY_LOGGER
+from src.filemetrix.infra.stats import Histogram
+from src.filemetrix.infra.tracing import get_tracer
+
+SLOW_QUERY_SECONDS = get_float_setting("db_slow_query_seconds", 1.0)
+# Fraction (0..1) of slow statements for which an EXPLAIN plan is captured; 0 disables EXPLAIN.
+EXPLAIN_SAMPLE_RATE = get_float_setting("db_slow_query_explain_sample_rate", 0.0)
+
+# Module whose functions statements are attributed to.
+DB_MODULE = "src.filemetrix.infra.db"
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+# Handlers (including the optional db_slow_query_log_file) are attached by log_config.setup_logging,
+# so slow-query records go through the same queue listener as all other logging.
+slow_query_logger = logging.getLogger(SLOW_QUERY_LOGGER)
+
+
+def db_function_name() -> str:
+    """Name of the infra/db.py function that issued the current statement.
+
+    Falls back to the first application frame when the statement did not come from infra/db.py
+    (e.g. the health check or create_tables via SQLModel metadata).
+    """
+    for frame in iter_caller_frames():
+        if frame.f_globals.get("__name__") == DB_MODULE:
+            return frame.f_code.co_name
+    return caller_name(skip=(__name__,))
+
+
+class FunctionQueryStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = 0
+        self.rows = 0
+        self.slow = 0
+
+
+class QueryStats:
+    """Per-function statement latency and row counts, keyed by infra/db.py function name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._functions: dict[str, FunctionQueryStats] = {}
+
+    def record(self, function: str, elapsed: float, rows: int, slow: bool):
+        with self._lock:
+            stats = self._functions.get(function)
+            if stats is None:
+                stats = self._functions[function] = FunctionQueryStats()
+            stats.statements += 1
+            stats.rows += max(rows, 0)
+            if slow:
+                stats.slow += 1
+        stats.latency.observe(elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._functions.items())
+        return {
+            name: {
+                "statements": stats.statements,
+                "rows": stats.rows,
+                "slow": stats.slow,
+                "latency_seconds": stats.latency.snapshot(),
+            }
+            for name, stats in sorted(items)
+        }
+
+
+query_stats = QueryStats()
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    """Return the EXPLAIN plan of `statement`, using a raw DBAPI cursor so no events fire again.
+
+    The EXPLAIN runs in the caller's transaction, inside a savepoint: on Postgres a failed statement
+    aborts the whole transaction, and the caller's next statement would fail instead of this one.
+    """
+    if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT filemetrix_explain")
+    except Exception as e:
+        cursor.close()
+        return f"<EXPLAIN skipped: {e}>"
+    try:
+        cursor.execute(f"EXPLAIN {statement}", parameters)
+        plan = "\n".join(str(row[0]) for row in cursor.fetchall())
+    except Exception as e:
+        plan = f"<EXPLAIN failed: {e}>"
+        cursor.execute("ROLLBACK TO SAVEPOINT filemetrix_explain")
+    try:
+        cursor.execute("RELEASE SAVEPOINT filemetrix_explain")
+    finally:
+        cursor.close()
+    return plan
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    context._fm_query_function = db_function_name()
+    context._fm_query_span = get_tracer().start_span(
+        f"SQL {statement.lstrip().split(' ', 1)[0].upper()}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement,
+            "code.function": context._fm_query_function,
+        },
+    )
+    context._fm_query_start = time.perf_counter()
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_fm_query_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR, str(exception_context.original_exception)))
+        span.end()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_fm_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    function = context._fm_query_function
+    slow = elapsed >= SLOW_QUERY_SECONDS
+    context._fm_query_span.set_attribute("db.rowcount", cursor.rowcount)
+    context._fm_query_span.end()
+    query_stats.record(function, elapsed, cursor.rowcount, slow)
+    if not slow:
+        return
+    plan = None
+    if not executemany and EXPLAIN_SAMPLE_RATE > 0 and random.random() < EXPLAIN_SAMPLE_RATE:
+        plan = _explain(conn, statement, parameters)
+    slow_query_logger.warning(
+        "Slow query in %s took %.3fs (threshold %.3fs), rows=%s: %s%s",
+        function, elapsed, SLOW_QUERY_SECONDS, cursor.rowcount, " ".join(statement.split()),
+        f"\nEXPLAIN:\n{plan}" if plan else "",
+    )
+
+
+def instrument_engine(sync_engine):
+    """Attach the timing/tracing hooks to a (sync) Engine; pass `async_engine.sync_engine` for async engines."""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,80 @@
+import hashlib
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+import orjson
+from brotli_asgi import BrotliMiddleware
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse as _StarletteJSONResponse
+from pydantic import BaseModel
+from starlette.middleware.gzip import GZipMiddleware
+
+from src.filemetrix.infra.commons import get_bool_setting, get_int_setting
+
+
+def _default(obj):
+    """Encode what JSON has no type for: models (SQLModel rows), dates, sets, enums, decimals; str() otherwise."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON of `content`; datetimes, dataclasses and enums are encoded natively by orjson."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class JSONResponse(_StarletteJSONResponse):
+    """Drop-in for FastAPI's JSONResponse that renders with `dumps` (orjson).
+
+    Content may hold datetimes and SQLModel rows directly, so handlers need no `model_dump`/isoformat
+    pass of their own. Returning it from a handler also skips FastAPI's `jsonable_encoder`, which is the
+    slow part for large file listings.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def make_etag(*parts: str) -> str:
+    """Strong validator built from the values a response is derived from."""
+    return '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match names `etag` (or `*`), i.e. the client copy is current."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def add_compression(app: FastAPI):
+    """Compress responses of at least `http_compression_minimum_size` bytes: brotli for clients that
+    accept it (unless `http_brotli` is off), gzip otherwise. Streaming responses are compressed as they are sent."""
+    if not get_bool_setting("http_compression", True):
+        return
+    minimum_size = get_int_setting("http_compression_minimum_size", 1024)
+    gzip_level = get_int_setting("http_gzip_level", 6)
+    if get_bool_setting("http_brotli", True):
+        # Brotli sits inside gzip: clients without `br` fall through to GZipMiddleware, which leaves
+        # responses that already carry a Content-Encoding alone.
+        app.add_middleware(BrotliMiddleware, quality=get_int_setting("http_brotli_quality", 4),
+                           minimum_size=minimum_size, gzip_fallback=False)
+        app.add_middleware(GZipMiddleware, minimum_size=minimum_size, compresslevel=gzip_level)
+        logging.info(f"Response compression: brotli and gzip above {minimum_size} bytes")
+        return
+    app.add_middleware(GZipMiddleware, minimum_size=minimum_size, compresslevel=gzip_level)
+    logging.info(f"Response compression: gzip above {minimum_size} bytes")
@@ -0,0 +1,54 @@
+import threading
+
+# Upper bounds (in seconds) used for latency/wait histograms unless a caller provides its own.
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Small thread-safe histogram with fixed bucket upper bounds.
+
+    Keeps per-bucket counts plus count/sum/max so it can be rendered as JSON
+    on the internal metrics endpoint without pulling in a metrics library.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            idx = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    idx = i
+                    break
+            self._counts[idx] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> dict:
+        """Return cumulative bucket counts keyed by upper bound ("+Inf" for the overflow bucket)."""
+        with self._lock:
+            cumulative = {}
+            running = 0
+            for bound, c in zip(self.buckets, self._counts):
+                running += c
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = running + self._counts[-1]
+            return {
+                "count": self.count,
+                "sum": round(self.sum, 6),
+                "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+                "max": round(self.max, 6),
+                "buckets": cumulative,
+            }
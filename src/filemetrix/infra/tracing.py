@@ -0,0 +1,60 @@
+import logging
+import os
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from src.filemetrix.infra.commons import app_settings, get_bool_setting, get_float_setting
+
+TRACER_NAME = "filemetrix"
+# Not traced: probes and scrapes. The instrumentation matches these against the full URL
+# (scheme://host/path), so they are anchored on the path after the host; a PID that merely
+# contains "health" or "metrics" is still traced.
+EXCLUDED_URLS = r"^[a-z]+://[^/]+/health$,^[a-z]+://[^/]+/metrics$"
+
+_tracer: trace.Tracer = trace.get_tracer(TRACER_NAME)
+
+
+def get_tracer() -> trace.Tracer:
+    """Tracer of the provider installed by `setup_tracing`, or the no-op global tracer when tracing is off."""
+    return _tracer
+
+
+def setup_tracing(app=None, endpoint: str | None = None, exporter: SpanExporter | None = None,
+                  sample_ratio: float | None = None) -> TracerProvider | None:
+    """Install the tracer provider and instrument `app`.
+
+    Spans are exported to `endpoint` (OTLP/gRPC) when `otlp_enable` is set. Passing an `exporter`
+    (e.g. `InMemorySpanExporter`) enables tracing regardless of settings and exports synchronously,
+    which is what tests need to assert on spans. `sample_ratio` (or the `otlp_sample_ratio`
+    setting) is applied to new traces; sampled parents propagated by callers are always honoured.
+    """
+    global _tracer
+    if exporter is None and not get_bool_setting("otlp_enable", False):
+        logging.info("OpenTelemetry tracing disabled (otlp_enable is false)")
+        return None
+
+    ratio = sample_ratio if sample_ratio is not None else get_float_setting("otlp_sample_ratio", 1.0)
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.environ.get("APP_NAME", "Filemetrix Service")}),
+        sampler=ParentBased(TraceIdRatioBased(ratio)),
+    )
+    if exporter is None:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        endpoint = endpoint or app_settings.get("otlp_grpc_endpoint") or "http://localhost:4317"
+        insecure = get_bool_setting("otlp_insecure", True)
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint, insecure=insecure)))
+        logging.info("OpenTelemetry tracing enabled: exporting to %s (sample ratio %s)", endpoint, ratio)
+    else:
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+    _tracer = provider.get_tracer(TRACER_NAME)
+
+    if app is not None:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=provider, excluded_urls=EXCLUDED_URLS)
+    return provider
@@ -1,13 +1,23 @@
 import logging
 import os
 import sys
+import time
 from datetime import datetime
 
 import asyncio
 
-from src.filemetrix.api.v1 import repo_workflow_controller, repo_discovery, repo_metrics, pid_fetcher, health
-from src.filemetrix.infra.commons import app_settings, send_mail
-from src.filemetrix.infra.db import ensure_database_exists, create_tables
+from src.filemetrix.api.v1 import repo_workflow_controller, repo_discovery, repo_metrics, pid_fetcher, health, \
+    internal_metrics
+from src.filemetrix.infra.commons import app_settings, get_bool_setting, get_int_setting
+from src.filemetrix.infra.db import ensure_database_exists, create_tables, init_engines, dispose_engines
+from src.filemetrix.infra.log_config import setup_logging
+from src.filemetrix.infra.mail_outbox import mail_outbox
+from src.filemetrix.infra.metrics import HTTP_REQUEST_SECONDS, mark_process_stopped, prepare_multiprocess_dir, \
+    start_process_stats_publisher
+from src.filemetrix.infra.responses import JSONResponse, add_compression
+from src.filemetrix.infra.tracing import setup_tracing
+from src.filemetrix.services.harvest_executor import harvest_executor
+from src.filemetrix.services.re3data_registry import re3data_registry
 
 # Add the src directory to the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
@@ -22,7 +32,6 @@ from typing import Annotated
 
 import uvicorn
 from fastapi import FastAPI, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette import status
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -33,6 +42,10 @@ EXPOSE_PORT = os.environ.get("EXPOSE_PORT", 1966)
 OTLP_GRPC_ENDPOINT = os.environ.get("OTLP_GRPC_ENDPOINT", "http://localhost:4317")
 
 RELOAD_ENABLE = os.environ.get("RELOAD_ENABLE", "false").lower() == "true"
+# API worker processes; harvests run in harvest executors (embedded or `python -m src.filemetrix.harvest_worker`).
+WEB_WORKERS = get_int_setting("web_workers", 1)
+# Development convenience: run a harvest executor inside the web process instead of a separate harvest_worker.
+HARVEST_EXECUTOR_EMBEDDED = get_bool_setting("harvest_executor_embedded", False)
 
 
 api_keys = [app_settings.FILEMETRIX_SERVICE_API_KEY]
@@ -45,9 +58,9 @@ def auth_header(
     auth_cred: Annotated[HTTPAuthorizationCredentials, Depends(security)],
 ):
     if not auth_cred or auth_cred.credentials not in api_keys:
-            return HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED, detail="Forbidden"
-            )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Forbidden"
+        )
 
 
 project_details = a_commons.get_project_details(
@@ -55,37 +68,20 @@ project_details = a_commons.get_project_details(
     keys=["name", "version", "description", "title"],
 )
 
-import logging
-from logging.handlers import TimedRotatingFileHandler
-import os
-
-log_dir = os.path.join(os.environ.get("BASE_DIR", "."), "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "fms.log")
-
-handler = TimedRotatingFileHandler(
-    log_file,
-    when="midnight",  # rotate every second for testing
-    interval=1,
-    backupCount=7,
-    encoding="utf-8",
-    utc=True
-)
-handler.suffix = "%Y-%m-%d"
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s %(levelname)s %(message)s',
-    handlers=[handler]
-)
+# Every log call only enqueues; a listener thread formats and writes to the log file and stdout.
+log_listener = setup_logging()
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     logging.info("start up")
+    # Serve the re3data list from memory; it is revalidated in the background, never on a request.
+    re3data_registry.start()
     subject_success = "FileMetrix Service Startup Success"
     body_success = f"FileMetrix Service started successfully on {datetime.now().isoformat()}. Version: {project_details['version']}, Build Date: {build_date}."
     subject_error = "FileMetrix Service Startup Error"
     try:
+        # Each worker process builds its own connection pools here, not at import time.
+        init_engines()
         db_ready = ensure_database_exists()
         if not db_ready:
             logging.warning("Database is not reachable; starting in degraded mode (DB operations will fail until the DB is available).")
@@ -93,6 +89,9 @@ async def lifespan(application: FastAPI):
             created = create_tables()
             if not created:
                 logging.warning("Could not create tables; continuing startup (tables may be created later).")
+        if HARVEST_EXECUTOR_EMBEDDED:
+            harvest_executor.start()
+        start_process_stats_publisher()
 
         # Attempt to send startup email but don't fail the app if email sending fails
         try:
@@ -100,7 +99,7 @@ async def lifespan(application: FastAPI):
             mail_to = app_settings.get("mail_to") or os.environ.get("MAIL_TO")
             mail_host = app_settings.get("mail_host") or os.environ.get("MAIL_HOST")
             if mail_to and mail_host:
-                send_mail(subject_success, body_success)
+                mail_outbox.enqueue(subject_success, body_success)
             else:
                 logging.info("Skipping startup email because mail settings are not configured.")
         except Exception as mail_exc:
@@ -116,12 +115,19 @@ async def lifespan(application: FastAPI):
             mail_to = app_settings.get("mail_to") or os.environ.get("MAIL_TO")
             mail_host = app_settings.get("mail_host") or os.environ.get("MAIL_HOST")
             if mail_to and mail_host:
-                send_mail(subject_error, error_body)
+                mail_outbox.enqueue(subject_error, error_body)
         except Exception:
             logging.exception("Failed to send startup error email")
         logging.error(f"Startup error (non-fatal in dev): {e}")
         # Do not re-raise: allow the application to continue starting in degraded mode
         yield
+    finally:
+        # Send what is still queued (and any pending digest) before the process exits.
+        harvest_executor.stop()
+        await re3data_registry.stop()
+        mail_outbox.close()
+        mark_process_stopped()
+        await dispose_engines()
 
 build_date = os.environ.get("BUILD_DATE", "unknown")
 
@@ -146,6 +152,10 @@ tags_metadata = [
         "name": "Health",
         "description": "Service health checks",
     },
+    {
+        "name": "Internal Metrics",
+        "description": "Process-local runtime statistics for operators",
+    },
 ]
 app = FastAPI(
     title=project_details['title'],
@@ -153,8 +163,11 @@ app = FastAPI(
     version=f"{project_details['version']} (Build Date: {build_date})",
     lifespan=lifespan,
     openapi_tags=tags_metadata,
+    default_response_class=JSONResponse,
 )
 
+setup_tracing(app, endpoint=OTLP_GRPC_ENDPOINT)
+
 @app.exception_handler(StarletteHTTPException)
 async def custom_404_handler(request: Request, exc: StarletteHTTPException):
     if exc.status_code == 404:
@@ -162,6 +175,21 @@ async def custom_404_handler(request: Request, exc: StarletteHTTPException):
     return JSONResponse(status_code=exc.status_code, content={"message": exc.detail})
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, to keep PID paths from exploding the label set.
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.labels(request.method, route_path, str(status_code)).observe(time.perf_counter() - start)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -169,7 +197,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-app.include_router(pid_fetcher.router, tags=["PID Fetcher"], prefix="")
+add_compression(app)
+app.include_router(internal_metrics.router, tags=["Internal Metrics"], prefix="", dependencies=[Depends(auth_header)])
+app.include_router(internal_metrics.metrics_router, prefix="")
 app.include_router(repo_discovery.router, tags=["Repo Discovery"], prefix="")
 
 # Health check router (simple DB connectivity check)
@@ -179,6 +209,9 @@ app.include_router(repo_metrics.router, tags=["Repo Metrics"], prefix="")
 
 app.include_router(repo_workflow_controller.router, tags=["Repo Management"], prefix="", dependencies=[Depends(auth_header)])
 
+# Must stay last: the catch-all "/{pid:path}" route would otherwise shadow every other API_PREFIX route.
+app.include_router(pid_fetcher.router, tags=["PID Fetcher"], prefix="")
+
 
 @app.get("/", include_in_schema=False)
 async def root():
@@ -194,11 +227,16 @@ async def root():
     )
 
 if __name__ == "__main__":
+    workers = 1 if RELOAD_ENABLE else max(1, WEB_WORKERS)
+    if workers > 1:
+        # Each worker counts its own requests; /metrics sums all of them up from this directory.
+        prepare_multiprocess_dir()
     uvicorn.run(
-        f"{__name__}:app",
+        # Worker processes import the app by its module path; "__main__" only exists in this one.
+        "src.filemetrix.main:app" if workers > 1 else f"{__name__}:app",
         host="0.0.0.0",
         port=int(EXPOSE_PORT),
-        workers=1,
+        workers=workers,
         factory=False,
         reload=RELOAD_ENABLE,
     )
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from src.filemetrix.infra.commons import get_float_setting
+from src.filemetrix.infra.db import get_latest_file_metadata_id_async, get_repo_data_versions_async
+from src.filemetrix.infra.responses import make_etag
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    tag: str  # equal tags mean the rows the metrics are computed from did not change
+    last_modified: datetime | None  # UTC; None before anything was harvested
+    harvesting: bool  # file rows are being added without a newer timestamp, so last_modified lags behind
+
+
+def _utc(value: datetime) -> datetime:
+    # Harvest timestamps are stored naive, in the server's local time (datetime.now()).
+    return value.astimezone(timezone.utc)
+
+
+class DataVersions:
+    """Versions of the harvested data, for conditional requests on the repo_metrics endpoints.
+
+    One query over repository and dataset gives, per repository, the harvest timestamps and status,
+    the newest dataset id and the latest file harvest start/end; while a file harvest is running the
+    newest file_metadata id is added, since file rows then arrive without a newer timestamp. The result
+    is reused for `ttl_seconds`, so revalidating a client copy never runs a metric aggregation. Versions
+    only depend on the database, so every web worker hands out the same ETags.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self._versions: dict[int, DataVersion] = {}
+        self._overall: DataVersion | None = None
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._stats = {"lookups": 0, "refreshes": 0, "refresh_errors": 0, "not_modified": 0}
+
+    @classmethod
+    def from_settings(cls) -> "DataVersions":
+        return cls(ttl_seconds=get_float_setting("metrics_version_ttl_seconds", 5.0))
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_seconds
+
+    async def _refresh(self):
+        rows = await get_repo_data_versions_async()
+        latest_file_id = None
+        if any(row[7] for row in rows):
+            latest_file_id = await get_latest_file_metadata_id_async()
+        versions = {}
+        for repo_id, ds_start, ds_end, ds_status, dataset_id, fm_start, fm_end, in_progress in rows:
+            parts = [repo_id, ds_start, ds_end, ds_status, dataset_id, fm_start, fm_end, in_progress]
+            if in_progress:
+                parts.append(latest_file_id)
+            stamps = [value for value in (ds_start, ds_end, fm_start, fm_end) if value is not None]
+            versions[repo_id] = DataVersion(
+                tag=make_etag(*map(str, parts)),
+                last_modified=_utc(max(stamps)) if stamps else None,
+                harvesting=bool(in_progress),
+            )
+        stamps = [version.last_modified for version in versions.values() if version.last_modified]
+        self._overall = DataVersion(
+            tag=make_etag(*(version.tag for version in versions.values())),
+            last_modified=max(stamps) if stamps else None,
+            harvesting=any(version.harvesting for version in versions.values()),
+        )
+        self._versions = versions
+        self._loaded_at = time.monotonic()
+        self._stats["refreshes"] += 1
+
+    async def get(self, repo_id: int | None = None) -> DataVersion | None:
+        """Version of the data of `repo_id`, or of all repositories when None; None for an unknown repository."""
+        self._stats["lookups"] += 1
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    try:
+                        await self._refresh()
+                    except Exception:
+                        self._stats["refresh_errors"] += 1
+                        raise
+        return self._overall if repo_id is None else self._versions.get(repo_id)
+
+    def record_not_modified(self):
+        self._stats["not_modified"] += 1
+
+    def stats(self) -> dict:
+        age = None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 3)
+        return {**self._stats, "repositories": len(self._versions), "age_seconds": age,
+                "ttl_seconds": self.ttl_seconds}
+
+
+data_versions = DataVersions.from_settings()
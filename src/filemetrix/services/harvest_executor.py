@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from src.filemetrix.infra.commons import app_settings, get_float_setting, get_int_setting
+from src.filemetrix.infra.db import HarvestJobStatus, HarvestStatus, delete_file_metadata_by_dataset_pid, \
+    get_engine, get_repo_by_id
+from src.filemetrix.infra.mail_outbox import mail_outbox
+from src.filemetrix.infra.metrics import track_harvest
+from src.filemetrix.services.oai_harvester_client import OaiHarvesterClient
+
+# First key of the Postgres advisory lock (HARVEST_LOCK_NAMESPACE, repo_id) held while a repository is harvested.
+HARVEST_LOCK_NAMESPACE = 0x464D48  # "FMH"
+
+# Candidates examined per claim; queued jobs whose repository lock is taken are skipped.
+_CLAIM_BATCH = 20
+
+_CLAIM_SQL = text(
+    "SELECT id, repo_id, kind FROM harvest_job WHERE status = :queued "
+    "ORDER BY id LIMIT :limit FOR UPDATE SKIP LOCKED"
+)
+_START_SQL = text(
+    "UPDATE harvest_job SET status = :running, started_at = now(), attempts = attempts + 1, "
+    "worker = :worker, error = NULL WHERE id = :id"
+)
+_FINISH_SQL = text("UPDATE harvest_job SET status = :status, finished_at = now(), error = :error WHERE id = :id")
+_RUNNING_SQL = text("SELECT id, repo_id, attempts FROM harvest_job WHERE status = :running FOR UPDATE SKIP LOCKED")
+_REQUEUE_SQL = text("UPDATE harvest_job SET status = :status, error = :error WHERE id = :id")
+_TRY_LOCK_SQL = text("SELECT pg_try_advisory_lock(:namespace, :repo_id)")
+_UNLOCK_SQL = text("SELECT pg_advisory_unlock(:namespace, :repo_id)")
+
+
+async def harvest_identifiers(repo_id: int):
+    repo = get_repo_by_id(repo_id)
+    if repo is None:
+        raise ValueError(f"Repository {repo_id} no longer exists")
+    logging.info(f"Starting dataset harvest for repository: {repo.name}")
+    mail_outbox.enqueue(f"Dataset harvest for repository {repo.name} started",
+                        f"Dataset harvest for repository {repo.name} has started. Please check the status later.",
+                        digest=True)
+    await OaiHarvesterClient(repo).harvest_identifiers()
+
+
+async def harvest_file_metadata(repo_id: int):
+    repo = get_repo_by_id(repo_id)
+    if repo is None:
+        raise ValueError(f"Repository {repo_id} no longer exists")
+    logging.info(f"Starting file metadata harvest for repository: {repo.name}")
+    mail_outbox.enqueue(f"File metadata harvest for repository {repo.name} started",
+                        f"File metadata harvest for repository {repo.name} has started. Please check the status later.",
+                        digest=True)
+    harvester = OaiHarvesterClient(repo)
+    with track_harvest("files", repo.id) as progress:
+        tasks = []
+        for dataset in repo.datasets:
+            if dataset.harvest_fm_status == HarvestStatus.IN_PROGRESS:
+                # Rows of an interrupted run. Safe outside the re-insert's transaction: readers only serve completed
+                # file harvests, the dataset stays in_progress until every row is stored again, and the repository's
+                # advisory lock keeps other runs out meanwhile.
+                delete_file_metadata_by_dataset_pid(dataset.pid)
+            if dataset.harvest_fm_status != HarvestStatus.COMPLETED:
+                tasks.append(harvester.harvest_files(dataset.repo_id, dataset.pid, app_settings.PID_FETCHER_URL, progress))
+
+        await asyncio.gather(*tasks)
+    logging.info(f"File metadata harvest completed for repository: {repo.name}")
+    mail_outbox.enqueue(f"File metadata harvest for repository {repo.name} completed",
+                        f"File metadata harvest for repository {repo.name} has completed successfully.",
+                        digest=True)
+
+
+HARVESTS = {"identifiers": harvest_identifiers, "files": harvest_file_metadata}
+
+
+class HarvestExecutor:
+    """Runs the harvest jobs queued by the API, outside the web workers' request handling.
+
+    Jobs are claimed from the harvest_job table with FOR UPDATE SKIP LOCKED, so any number of
+    executors (the harvest_worker process, or the web process itself when `harvest_executor_embedded`
+    is on) can poll the same table. Before a job starts, its runner takes the Postgres advisory lock
+    (HARVEST_LOCK_NAMESPACE, repo_id) on a connection it keeps until the harvest ends: a repository
+    is only ever harvested once at a time, and when an executor dies its connection closes and the
+    lock goes with it. Running jobs whose lock is free were left behind by such an executor and are
+    queued again, up to `max_attempts` runs.
+    """
+
+    def __init__(self, concurrency: int = 2, poll_seconds: float = 5.0, max_attempts: int = 3):
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._pool: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._running: dict[int, int] = {}  # job id -> repo id
+        self._stats = {"claimed": 0, "completed": 0, "failed": 0, "requeued": 0, "lock_skips": 0, "poll_errors": 0}
+
+    @property
+    def worker_id(self) -> str:
+        # Computed on use: web workers may be forked after this module was imported.
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def from_settings(cls) -> "HarvestExecutor":
+        return cls(
+            concurrency=get_int_setting("harvest_executor_concurrency", 2),
+            poll_seconds=get_float_setting("harvest_executor_poll_seconds", 5.0),
+            max_attempts=get_int_setting("harvest_job_max_attempts", 3),
+        )
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] += n
+
+    def start(self):
+        """Poll for jobs on a background thread (embedded mode)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="harvest-executor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop claiming jobs. Harvests still running keep their lock until they end or the process exits."""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def wake(self):
+        """Claim now instead of at the next poll, e.g. right after a job was queued in this process."""
+        self._wakeup.set()
+
+    def run_forever(self):
+        logging.info(f"Harvest executor {self.worker_id} started (concurrency {self.concurrency})")
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="harvest")
+        while not self._stop.is_set():
+            try:
+                self.recover_stale_jobs()
+                while self._free_slots() > 0 and not self._stop.is_set():
+                    claimed = self._claim()
+                    if claimed is None:
+                        break
+                    self._pool.submit(self._run, *claimed)
+            except Exception as e:
+                self._count("poll_errors")
+                logging.warning(f"Harvest executor could not poll for jobs: {e}")
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+        logging.info(f"Harvest executor {self.worker_id} stopped")
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.concurrency - len(self._running)
+
+    def _claim(self):
+        """(job id, repo id, kind, connection holding the repository lock) of the next runnable job, or None."""
+        conn = get_engine().connect()
+        try:
+            with conn.begin():
+                rows = conn.execute(_CLAIM_SQL, {"queued": HarvestJobStatus.QUEUED.value, "limit": _CLAIM_BATCH}).all()
+                for job_id, repo_id, kind in rows:
+                    if not conn.scalar(_TRY_LOCK_SQL, {"namespace": HARVEST_LOCK_NAMESPACE, "repo_id": repo_id}):
+                        self._count("lock_skips")
+                        continue
+                    conn.execute(_START_SQL, {"running": HarvestJobStatus.RUNNING.value, "worker": self.worker_id,
+                                              "id": job_id})
+                    with self._lock:
+                        self._running[job_id] = repo_id
+                        self._stats["claimed"] += 1
+                    return job_id, repo_id, kind, conn
+        except Exception:
+            # The connection may hold a repository lock; drop it rather than return it to the pool.
+            conn.invalidate()
+            conn.close()
+            raise
+        conn.close()
+        return None
+
+    def _run(self, job_id: int, repo_id: int, kind: str, conn):
+        status, error = HarvestJobStatus.COMPLETED.value, None
+        try:
+            logging.info(f"Harvest job {job_id}: {kind} harvest of repository {repo_id}")
+            asyncio.run(HARVESTS[kind](repo_id))
+        except Exception as e:
+            status, error = HarvestJobStatus.FAILED.value, f"{type(e).__name__}: {e}"
+            logging.exception(f"Harvest job {job_id} failed")
+        try:
+            # Record the outcome before releasing the lock, so a running job is never seen unlocked.
+            with conn.begin():
+                conn.execute(_FINISH_SQL, {"status": status, "error": error, "id": job_id})
+            conn.execute(_UNLOCK_SQL, {"namespace": HARVEST_LOCK_NAMESPACE, "repo_id": repo_id})
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Could not record the outcome of harvest job {job_id}: {e}")
+            # Closing the DB session releases the lock; the job is then recovered as abandoned.
+            conn.invalidate()
+        finally:
+            conn.close()
+            with self._lock:
+                self._running.pop(job_id, None)
+                self._stats["completed" if status == HarvestJobStatus.COMPLETED.value else "failed"] += 1
+            self._wakeup.set()
+
+    def recover_stale_jobs(self) -> int:
+        """Queue again (or fail, after `max_attempts`) running jobs whose executor is gone; returns how many."""
+        recovered = 0
+        with get_engine().connect() as conn:
+            with conn.begin():
+                rows = conn.execute(_RUNNING_SQL, {"running": HarvestJobStatus.RUNNING.value}).all()
+                for job_id, repo_id, attempts in rows:
+                    if not conn.scalar(_TRY_LOCK_SQL, {"namespace": HARVEST_LOCK_NAMESPACE, "repo_id": repo_id}):
+                        continue
+                    # Nobody holds the repository lock, so the executor that ran this job has stopped.
+                    status = HarvestJobStatus.QUEUED.value if attempts < self.max_attempts else HarvestJobStatus.FAILED.value
+                    conn.execute(_REQUEUE_SQL, {"status": status, "id": job_id,
+                                                "error": f"Executor stopped during attempt {attempts}"})
+                    conn.execute(_UNLOCK_SQL, {"namespace": HARVEST_LOCK_NAMESPACE, "repo_id": repo_id})
+                    logging.warning(f"Harvest job {job_id} of repository {repo_id} was abandoned; now {status}")
+                    recovered += 1
+        if recovered:
+            self._count("requeued", recovered)
+        return recovered
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(running=len(self._running))
+        stats.update(worker=self.worker_id, concurrency=self.concurrency,
+                     active=self._thread is not None and self._thread.is_alive())
+        return stats
+
+
+harvest_executor = HarvestExecutor.from_settings()
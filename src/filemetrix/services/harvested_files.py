@@ -0,0 +1,110 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+from src.filemetrix.infra.commons import get_float_setting, get_int_setting
+from src.filemetrix.infra.db import (
+    FileMetaDataModel,
+    get_distinct_mime_types_by_dataset_pid_async,
+    get_file_metadata_by_dataset_pid_async,
+    get_harvested_dataset_async,
+    iter_file_metadata_by_dataset_pid_async,
+)
+from src.filemetrix.services.pid_cache import normalize_pid
+
+# Serve a PID from file_metadata when its harvest completed less than this long ago; 0 disables.
+DB_MAX_AGE_SECONDS = get_int_setting("pid_db_max_age_seconds", 604800)
+# After a failed lookup, skip the database for this long instead of waiting for the connect timeout on every request.
+DB_RETRY_SECONDS = get_float_setting("pid_db_retry_seconds", 30.0)
+
+_db_unavailable_until = 0.0
+
+
+def _db_available() -> bool:
+    return time.monotonic() >= _db_unavailable_until
+
+
+def _mark_db_unavailable(pid: str, e: Exception):
+    global _db_unavailable_until
+    _db_unavailable_until = time.monotonic() + DB_RETRY_SECONDS
+    logging.warning(
+        f"Could not read harvested files for {pid}, resolving live for the next {DB_RETRY_SECONDS:g}s: {e}"
+    )
+
+
+def pid_candidates(pid: str) -> list[str]:
+    """Spellings under which a PID may be stored in dataset.pid (OAI identifiers usually carry `doi:`)."""
+    candidates = [pid]
+    key = normalize_pid(pid)
+    for candidate in (key, f"doi:{key}", pid.removeprefix("doi:"), f"doi:{pid.removeprefix('doi:')}"):
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+def _date(value: datetime | None) -> str | None:
+    return value.date().isoformat() if value else None
+
+
+def file_metadata_to_file(row: FileMetaDataModel) -> dict:
+    """Rebuild a PID fetcher file entry, including the `raw_metadata` fields the harvester reads, from a stored row."""
+    raw_metadata = {
+        "contentType": row.mime_type,
+        "checksum": {"value": row.checksum_value, "type": row.checksum_type},
+        "fileAccessRequest": row.access_request,
+        "publicationDate": _date(row.publication_date),
+    }
+    if row.embargo:
+        raw_metadata["embargo"] = {"dateAvailable": _date(row.embargo)}
+    return {
+        "name": row.name,
+        "link": row.link,
+        "size": row.size,
+        "hash": row.checksum_value,
+        "hash_type": row.checksum_type,
+        "raw_metadata": raw_metadata,
+    }
+
+
+async def find_harvested_dataset_pid(pid: str) -> str | None:
+    """dataset.pid of a sufficiently fresh completed harvest of `pid`, or None (also when the DB is unavailable)."""
+    if DB_MAX_AGE_SECONDS <= 0 or not _db_available():
+        return None
+    try:
+        dataset = await get_harvested_dataset_async(
+            pid_candidates(pid), datetime.now() - timedelta(seconds=DB_MAX_AGE_SECONDS)
+        )
+    except Exception as e:
+        _mark_db_unavailable(pid, e)
+        return None
+    return dataset.pid if dataset else None
+
+
+async def get_harvested_files(pid: str) -> list[dict] | None:
+    dataset_pid = await find_harvested_dataset_pid(pid)
+    if dataset_pid is None:
+        return None
+    try:
+        rows = await get_file_metadata_by_dataset_pid_async(dataset_pid)
+    except Exception as e:
+        _mark_db_unavailable(pid, e)
+        return None
+    return [file_metadata_to_file(row) for row in rows]
+
+
+async def iter_harvested_files(dataset_pid: str):
+    """Stream the file entries of a dataset found by `find_harvested_dataset_pid` without loading all rows."""
+    async for row in iter_file_metadata_by_dataset_pid_async(dataset_pid):
+        yield file_metadata_to_file(row)
+
+
+async def get_harvested_extensions(pid: str) -> list[str] | None:
+    dataset_pid = await find_harvested_dataset_pid(pid)
+    if dataset_pid is None:
+        return None
+    try:
+        mime_types = await get_distinct_mime_types_by_dataset_pid_async(dataset_pid)
+    except Exception as e:
+        _mark_db_unavailable(pid, e)
+        return None
+    return sorted({mime_type.split('/')[-1] for mime_type in mime_types})
@@ -4,15 +4,20 @@ import pickle
 import json
 import logging
 from datetime import datetime
-import requests
 
-from sickle import Sickle
-
-from src.filemetrix.infra.commons import send_mail, app_settings
+from src.filemetrix.infra.commons import app_settings, get_float_setting, get_int_setting
+from src.filemetrix.infra.lazy_import import LazyModule
+from src.filemetrix.infra.log_config import SampledLogger
+from src.filemetrix.infra.mail_outbox import mail_outbox
+from src.filemetrix.infra.metrics import track_harvest, HarvestRun, PID_FETCH_SECONDS
+from src.filemetrix.infra.tracing import get_tracer
 from src.filemetrix.infra.db import RepositoryModel, update_repository_harvest_info, dataset_exists, DatasetModel, \
-    insert_dataset, update_dataset_harvest_fm_start_in_progress, FileMetaDataModel, insert_file_metadata, \
+    insert_dataset, update_dataset_harvest_fm_start_in_progress, FileMetaDataModel, insert_file_metadata_batch, \
     update_dataset_harvest_fm_end_completed
 
+# sickle (and with it requests and lxml) is only imported once a harvest starts.
+requests = LazyModule("requests")
+traced_sickle = LazyModule("src.filemetrix.services.traced_sickle")
 
 def transform_input(transformer_url, str_tobe_transformed):
     pass
@@ -29,6 +34,53 @@ def parse_datestamp(datestamp: str) -> datetime | None:
             continue
     raise ValueError(f"Unknown datestamp format: {datestamp}")
 
+# Per-record messages of a harvest are sampled; a large repository would otherwise log every record.
+_item_log = SampledLogger("filemetrix.harvest.items")
+
+# File metadata rows written per transaction while a dataset's listing streams in.
+FILES_BATCH_SIZE = get_int_setting("harvest_files_batch_size", 500)
+# (connect, read) timeout for the PID fetcher listing; the read timeout bounds each wait for the next bytes.
+FILES_FETCH_TIMEOUT = (get_float_setting("harvest_files_connect_timeout_seconds", 10.0),
+                       get_float_setting("harvest_files_read_timeout_seconds", 1800.0))
+
+
+def iter_fetched_files(response: requests.Response):
+    """File entries of a PID fetcher response, read incrementally when it is NDJSON.
+
+    Raises when the fetcher reports the listing as partial, so an incomplete dataset is never marked completed.
+    """
+    if response.headers.get("Content-Type", "").startswith("application/x-ndjson"):
+        for line in response.iter_lines():
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("partial") and "link" not in entry:
+                raise RuntimeError(f"Partial file listing: {entry.get('error')}")
+            yield entry
+        return
+    # Fetchers that do not stream answer with the whole {"files": [...]} document.
+    payload = response.json()
+    if payload.get("partial"):
+        raise RuntimeError(f"Partial file listing: {payload.get('error')}")
+    yield from payload.get("files", [])
+
+
+def file_metadata_model(fm: dict, pid: str) -> FileMetaDataModel:
+    return FileMetaDataModel(
+        name=fm['name'],
+        link=fm['link'],
+        size=fm['size'],
+        mime_type=fm['raw_metadata']['contentType'],
+        checksum_value=fm['raw_metadata']['checksum']['value'],
+        checksum_type=fm['raw_metadata']['checksum']['type'],
+        access_request=fm['raw_metadata']['fileAccessRequest'],
+        publication_date=fm['raw_metadata']['publicationDate'],
+        embargo=fm['raw_metadata']['embargo']['dateAvailable'] if 'embargo' in fm['raw_metadata'] else None,
+        file_pid=None,
+        dataset_pid=pid
+    )
+
+
 class OaiHarvesterClient():
 
     def __init__(self, repo: RepositoryModel):
@@ -41,59 +93,58 @@ class OaiHarvesterClient():
         update_repository_harvest_info(self.repo_id, harvest_start=datetime.now(),
                                           harvest_status="in_progress")
 
-        sickle = Sickle(self.oai_url)
+        sickle = traced_sickle.TracedSickle(self.oai_url)
         records = sickle.ListRecords(metadataPrefix=self.metadataPrefix)
 
         total_processed, total_skipped, total_inserted = 0, 0, 0
 
-        for record in records:
-            total_processed += 1
-            if record.header.deleted:
-                total_skipped += 1
-                logging.warning(f"Dataset - Skipping deleted record: {record.header.identifier}")
-                continue
-            if not record.header.identifier:
-                logging.error(f"Skipping empty identifier record: {record.header.identifier}")
-                continue
+        with track_harvest("identifiers", self.repo_id) as progress:
+            for record in records:
+                total_processed += 1
+                progress.add("records")
+                if record.header.deleted:
+                    total_skipped += 1
+                    _item_log.warning("Dataset - Skipping deleted record: %s", record.header.identifier)
+                    continue
+                if not record.header.identifier:
+                    logging.error(f"Skipping empty identifier record: {record.header.identifier}")
+                    continue
 
-            total_inserted += 1
-            pid_protocol = "doi"
-            if record.header.identifier.startswith('doi'):
-                record.header.identifier = record.header.identifier.replace('doi:', '')
-            elif record.header.identifier.startswith('hdl'):
-                record.header.identifier = record.header.identifier.replace('hdl:', '')
-                pid_protocol = "hdl"
-            elif record.header.identifier.startswith('ark'):
-                record.header.identifier = record.header.identifier.replace('ark:/', '')
-                pid_protocol = "ark"
-
-            a = record.metadata.get("date", None)
-            if a is not None:
-                if isinstance(a, list):
-                    record.metadata["date"] = a[0]
-
-            if dataset_exists(record.header.identifier, self.repo_id):
-                total_skipped += 1
-                logging.warning(f"Skipping --- Dataset already exists for PID: {record.header.identifier} in repo {self.repo_id}")
-                print("Skipping --- Dataset already exists for PID: " + record.header.identifier + " in repo " + str(self.repo_id))
-                # TODO: check if the harvest files are already in progress
-                continue
+                total_inserted += 1
+                pid_protocol = "doi"
+                if record.header.identifier.startswith('doi'):
+                    record.header.identifier = record.header.identifier.replace('doi:', '')
+                elif record.header.identifier.startswith('hdl'):
+                    record.header.identifier = record.header.identifier.replace('hdl:', '')
+                    pid_protocol = "hdl"
+                elif record.header.identifier.startswith('ark'):
+                    record.header.identifier = record.header.identifier.replace('ark:/', '')
+                    pid_protocol = "ark"
+
+                a = record.metadata.get("date", None)
+                if a is not None:
+                    if isinstance(a, list):
+                        record.metadata["date"] = a[0]
+
+                if dataset_exists(record.header.identifier, self.repo_id):
+                    total_skipped += 1
+                    _item_log.warning("Skipping --- Dataset already exists for PID: %s in repo %s",
+                                      record.header.identifier, self.repo_id)
+                    # TODO: check if the harvest files are already in progress
+                    continue
+
+                new_dataset = DatasetModel(
+                    repo_id=self.repo_id,
+                    pid=record.header.identifier,
+                    pid_protocol=pid_protocol,
+                    timestamp=parse_datestamp(record.header.datestamp),
+                    publication_date=parse_datestamp(record.metadata.get("date", None)),
+                    # publisher= "#".join(record.metadata.get('publisher', '')),
+                    # language=",".join(record.metadata.get('language', '')),
+                )
+                # print(new_dataset.model_dump())
+                insert_dataset(new_dataset)
 
-            new_dataset = DatasetModel(
-                repo_id=self.repo_id,
-                pid=record.header.identifier,
-                pid_protocol=pid_protocol,
-                timestamp=parse_datestamp(record.header.datestamp),
-                publication_date=parse_datestamp(record.metadata.get("date", None)),
-                # publisher= "#".join(record.metadata.get('publisher', '')),
-                # language=",".join(record.metadata.get('language', '')),
-            )
-            # print(new_dataset.model_dump())
-            insert_dataset(new_dataset)
-
-        print(f"Total Dataset records processed: {total_processed}")
-        print(f"Total Dataset records skipped: {total_skipped}")
-        print(f"Total Dataset records inserted: {total_inserted}")
         logging.info(f"Total Dataset records processed: {total_processed}")
         logging.info(f"Total Dataset records skipped: {total_skipped}")
         logging.info(f"Total Dataset records inserted: {total_inserted}")
@@ -104,78 +155,89 @@ class OaiHarvesterClient():
                 f"Total Dataset records processed: {total_processed}\nTotal Dataset records skipped: {total_skipped}\n"
                 f"Total Dataset records inserted: {total_inserted}")
 
-        send_mail(subject, body)
+        mail_outbox.enqueue(subject, body, digest=True)
         return total_processed
 
-    async def harvest_files(self, repo_id: int, pid: str, pid_fetcher_url: str = "https://pid-fetcher.labs.dansdemo.nl/") -> int| None:
+    async def harvest_files(self, repo_id: int, pid: str, pid_fetcher_url: str = "https://pid-fetcher.labs.dansdemo.nl/",
+                            progress: HarvestRun | None = None) -> int| None:
+        # `progress` is shared by all datasets of one repository run so datasets/sec covers the whole run.
+        progress = progress or HarvestRun("files", repo_id)
         start_time = time.time()
         logging.info(f'Starting file harvest for {pid} from repository {repo_id}')
-        print(f'Starting file harvest for {pid} from repository {repo_id}')
         update_dataset_harvest_fm_start_in_progress(pid)
         try:
-            #The default for the timeout parameter in requests.get (from the requests library) is None,
-            # which means it will wait indefinitely for a response unless a timeout is explicitly set.
-            # files_metadata = requests.get(f"{pid_fetcher_url}{pid}", timeout=1800)  # 30 minutes timeout
-            files_metadata = requests.get(f"{pid_fetcher_url}{pid}")
+            # Without a timeout requests waits indefinitely on a PID fetcher that stops answering.
+            fetch_start = time.perf_counter()
+            with get_tracer().start_as_current_span("pid_fetcher.request") as span:
+                span.set_attribute("filemetrix.pid", pid)
+                span.set_attribute("http.url", f"{pid_fetcher_url}{pid}")
+                # Ask for NDJSON so files can be stored while the PID fetcher is still listing them.
+                files_metadata = requests.get(f"{pid_fetcher_url}{pid}", params={"stream": "true"},
+                                              headers={"Accept": "application/x-ndjson"}, stream=True,
+                                              timeout=FILES_FETCH_TIMEOUT)
+                span.set_attribute("http.status_code", files_metadata.status_code)
+            PID_FETCH_SECONDS.labels("harvest_files", str(files_metadata.status_code)).observe(time.perf_counter() - fetch_start)
         except requests.exceptions.Timeout:
+            PID_FETCH_SECONDS.labels("harvest_files", "timeout").observe(time.perf_counter() - fetch_start)
             logging.error(f"Request for {pid} timed out.")
             subject = "FileMetrix Harvest Timeout"
             body = f"Request for {pid} timed out while fetching metadata files from repository {repo_id}."
-            send_mail(subject, body)
+            mail_outbox.enqueue(subject, body, digest=True)
+            return None
+        except requests.exceptions.RequestException as e:
+            # Connection refused, DNS or TLS errors: skip this dataset instead of ending the repository run.
+            PID_FETCH_SECONDS.labels("harvest_files", "error").observe(time.perf_counter() - fetch_start)
+            logging.error(f"Request for {pid} to the PID fetcher failed: {e}")
             return None
 
         if files_metadata.status_code != 200:
             logging.error(f"Failed to fetch metadata for {pid}: {files_metadata.status_code}")
+            files_metadata.close()
             return None
 
         logging.info(f"Fetched metadata for {pid} from repository {repo_id}, response status_code: {files_metadata.status_code}")
-        print(f'Fetched metadata for {pid} from repository {repo_id}, response status_code: {files_metadata.status_code}')
-        # print(files_metadata.json())
         total_processed, total_skipped, total_inserted = 0, 0, 0
-        # print(json.dumps(files_metadata.json()))
-        for fm in files_metadata.json().get('files', []):
-            total_processed += 1
-            # Logic for skipping records can increment total_skipped if needed
-            total_inserted += 1
-            fmdm = FileMetaDataModel(
-                name=fm['name'],
-                link=fm['link'],
-                size=fm['size'],
-                mime_type=fm['raw_metadata']['contentType'],
-                checksum_value=fm['raw_metadata']['checksum']['value'],
-                checksum_type=fm['raw_metadata']['checksum']['type'],
-                access_request=fm['raw_metadata']['fileAccessRequest'],
-                publication_date=fm['raw_metadata']['publicationDate'],
-                embargo=fm['raw_metadata']['embargo']['dateAvailable'] if 'embargo' in fm['raw_metadata'] else None,
-                file_pid=None,
-                dataset_pid=pid
-            )
-            logging.info("Inserting File Metadata: " + str(fmdm.link))
-            print("Inserting File Metadata: " + str(fmdm.link))
-
-            insert_file_metadata(fmdm)
-
-        print("Total File Metadata records processed:", total_processed)
-        print("Total File Metadata records skipped:", total_skipped)
-        print("Total File Metadata records inserted:", total_inserted)
+        batch = []
+        try:
+            with files_metadata:
+                for fm in iter_fetched_files(files_metadata):
+                    total_processed += 1
+                    # Logic for skipping records can increment total_skipped if needed
+                    batch.append(file_metadata_model(fm, pid))
+                    if len(batch) >= FILES_BATCH_SIZE:
+                        total_inserted += self._insert_files(batch, progress)
+                        batch = []
+                total_inserted += self._insert_files(batch, progress)
+        except Exception as e:
+            # Rows stored so far are dropped when the dataset is harvested again (it stays in_progress).
+            logging.error(f"File listing for {pid} failed after {total_processed} file(s): {e}")
+            return None
+
         logging.info(f"Total File Metadata records processed: {total_processed}")
         logging.info(f"Total File Metadata records skipped: {total_skipped}")
         logging.info(f"Total File Metadata records inserted: {total_inserted}")
-        print(f"Completed harvest files for dataset:{ pid}")
         logging.info(f"Completed harvest files for dataset:{ pid}")
         duration = time.time() - start_time
         logging.info(f"harvest_files for {pid} took {duration:.2f} seconds")
-        print(f"harvest_files for {pid} took {duration:.2f} seconds")
         if duration > 60:
             msg = f"harvest_files for {pid} took {duration:.2f} seconds, which exceeds 60 seconds."
-            print(msg)
             logging.warning(msg)
         update_dataset_harvest_fm_end_completed(pid)
+        progress.add("datasets")
         return total_processed
 
 
+    @staticmethod
+    def _insert_files(batch: list[FileMetaDataModel], progress: HarvestRun) -> int:
+        if not batch:
+            return 0
+        logging.info(f"Inserting {len(batch)} File Metadata records of {batch[0].dataset_pid}")
+        inserted = insert_file_metadata_batch(batch)
+        progress.add("files", inserted)
+        return inserted
+
     async def harvest_identifiers2(self, from_date=None, until_date=None, saved_token_file=f'{app_settings.PKL_TOKEN_FILE}/token.pkl'):
-        sickle = Sickle(self.oai_url)
+        sickle = traced_sickle.TracedSickle(self.oai_url)
         try:
             # Try to load saved resumptionToken
             resumption_token = None
@@ -183,7 +245,6 @@ class OaiHarvesterClient():
                 with open(saved_token_file, 'rb') as f:
                     resumption_token = pickle.load(f)
                     logging.info(f"Resuming with token: {saved_token_file}")
-                    print(f"Resuming with token: {resumption_token}")
             except FileNotFoundError:
                 pass  # Start from beginning
 
@@ -201,8 +262,7 @@ class OaiHarvesterClient():
 
             for header in records:
                 # Process header
-                print(f"Identifier: {header.identifier}")
-                logging.info(f"Identifier: {header.identifier}")
+                _item_log.info("Identifier: %s", header.identifier)
                 # Save current token after each step
                 if records.resumption_token is not None:
                     with open(saved_token_file, 'wb') as f:
@@ -213,5 +273,4 @@ class OaiHarvesterClient():
                 pickle.dump(None, f)
 
         except Exception as e:
-            print(f"Error: {e}")
             logging.error(f"Error during harvest_identifiers2: {e}")
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import threading
+import time
+
+from src.filemetrix.infra.commons import get_int_setting
+from src.filemetrix.infra.lazy_import import LazyModule
+
+oai_exceptions = LazyModule("sickle.oaiexceptions")
+traced_sickle = LazyModule("src.filemetrix.services.traced_sickle")
+
+
+def oai_base_url(oai: str) -> str:
+    """OAI-PMH base URL from a re3data `oai` value, which may carry a verb query string."""
+    return oai.split('?')[0]
+
+
+class OaiSetCache:
+    """Complete ListSets results per OAI base URL, kept for `ttl_seconds`.
+
+    Sickle follows resumption tokens, so paged set lists are enumerated completely. Concurrent
+    lookups of the same base URL share one enumeration.
+    """
+
+    def __init__(self, ttl_seconds: int = 86400, timeout: int = 60, concurrency: int = 4):
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._entries: dict[str, tuple[float, list[dict]]] = {}
+        self._lock = threading.Lock()
+        self._url_locks: dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "misses": 0, "failures": 0}
+
+    @classmethod
+    def from_settings(cls) -> "OaiSetCache":
+        return cls(
+            ttl_seconds=get_int_setting("oai_sets_ttl_seconds", 86400),
+            timeout=get_int_setting("oai_sets_request_timeout_seconds", 60),
+            concurrency=get_int_setting("oai_sets_concurrency", 4),
+        )
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and time.time() - entry[0] < self.ttl_seconds
+
+    def _enumerate(self, base_url: str) -> list[dict]:
+        sickle = traced_sickle.TracedSickle(base_url, timeout=self.timeout)
+        try:
+            sets = [{"setSpec": s.setSpec, "setName": getattr(s, "setName", None)} for s in sickle.ListSets()]
+        except oai_exceptions.NoSetHierarchy:
+            sets = []
+        logging.info(f"Enumerated {len(sets)} OAI sets from {base_url}")
+        return sets
+
+    def list_sets(self, base_url: str) -> list[dict]:
+        """All sets of `base_url` (blocking); raises on OAI/HTTP errors, which are not cached."""
+        with self._lock:
+            entry = self._entries.get(base_url)
+            url_lock = self._url_locks.setdefault(base_url, threading.Lock())
+        if self._fresh(entry):
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry[1]
+        with url_lock:
+            entry = self._entries.get(base_url)
+            if self._fresh(entry):
+                with self._lock:
+                    self._stats["hits"] += 1
+                return entry[1]
+            with self._lock:
+                self._stats["misses"] += 1
+            try:
+                sets = self._enumerate(base_url)
+            except Exception:
+                with self._lock:
+                    self._stats["failures"] += 1
+                raise
+            with self._lock:
+                self._entries[base_url] = (time.time(), sets)
+            return sets
+
+    async def list_sets_many(self, base_urls: list[str]) -> dict[str, list[dict] | Exception]:
+        """Enumerate several repositories concurrently (at most `concurrency` at a time); errors are returned per URL."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(base_url: str):
+            async with semaphore:
+                return await asyncio.to_thread(self.list_sets, base_url)
+
+        results = await asyncio.gather(*(one(url) for url in base_urls), return_exceptions=True)
+        return dict(zip(base_urls, results))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+oai_set_cache = OaiSetCache.from_settings()
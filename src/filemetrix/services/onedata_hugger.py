@@ -1,173 +1,299 @@
 
+import asyncio
 import logging
 import re
-import requests
+import threading
 import traceback
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from requests.exceptions import (
-    ConnectionError,
-    Timeout,
-    RequestException
-)
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.cookiejar import DefaultCookiePolicy
 from types import SimpleNamespace
 from urllib.parse import urlparse
 
+from src.filemetrix.infra.commons import app_settings, get_float_setting, get_int_setting
+from src.filemetrix.infra.deadline import Deadline, DeadlineExceeded
+from src.filemetrix.infra.lazy_import import LazyModule
+from src.filemetrix.services.onedata_shares import MISSING, onedata_share_cache
+
 
 DOI_RESOLVER_ADDRESS = "https://doi.org"
 MAX_REDIRECTS = 100
-REQUEST_TIMEOUT = 10.0
-MAX_THREADS = 8
+REQUEST_TIMEOUT = get_float_setting("onedata_redirect_timeout_seconds", 10.0)
+# Per-call limit for Onedata REST calls (directory listings can be slow); a request deadline can only shorten it.
+REST_API_TIMEOUT = get_float_setting("onedata_request_timeout_seconds", 30.0)
+# Directory pages fetched in parallel by one crawl.
+MAX_THREADS = get_int_setting("onedata_crawl_parallelism", 8)
+# Only overridden to point the crawler at a plain-HTTP mock server (benchmarks).
+REST_API_SCHEME = app_settings.get("onedata_rest_scheme") or "https"
+# Keep-alive connections kept per Onezone host, shared by all concurrent crawls.
+HTTP_POOL_SIZE = get_int_setting("onedata_http_pool_size", 32)
+
+requests = LazyModule("requests")
+
+
+def _build_session() -> "requests.Session":
+    session = requests.Session()
+    # Lookups of unrelated identifiers share this session; never carry cookies from one to another.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=max(HTTP_POOL_SIZE, MAX_THREADS))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
 
+def _get_session() -> "requests.Session":
+    # Built on the first Onedata lookup rather than at import, which would load requests at startup.
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
 
-def info(identifier: str):
+
+def _timeout(deadline: Deadline | None, cap: float) -> float:
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+def info(identifier: str, deadline: Deadline | None = None):
+    """Resolve `identifier` as a Onedata dataset; None when it is not one.
+
+    Raises DeadlineExceeded when `deadline` passes before any file could be listed. When it passes
+    during the listing, the files gathered so far are returned with `partial=True`.
+    """
     try:
         log_info(f"Attempting to resolve an identifier as a Onedata dataset: {identifier}")
-        metadata = info_unsafe(identifier, MAX_REDIRECTS)
+        metadata = info_unsafe(identifier, MAX_REDIRECTS, deadline)
         if not metadata:
             return None
         count = len(metadata.get("files"))
-        log_info(f"Successfully resolved a Onedata dataset - {count} file(s): {identifier}")
+        metadata["partial"] = bool(deadline and deadline.exceeded)
+        if metadata["partial"]:
+            log_warning(f"Deadline exceeded, returning a partial Onedata listing - {count} file(s): {identifier}")
+        else:
+            log_info(f"Successfully resolved a Onedata dataset - {count} file(s): {identifier}")
         return SimpleNamespace(**metadata)
+    except DeadlineExceeded:
+        log_warning(f"Deadline exceeded while resolving a Onedata dataset: {identifier}")
+        raise
     except Exception as e:
         tb = traceback.format_exc()
         log_error(f"Error fetching Onedata dataset metadata: {e}\n{tb}")
         return None
         
 
-def info_unsafe(identifier: str, max_redirects: int):
-    if max_redirects < 1:
-        log_error(
-            f"Resigning after reaching max redirects ({MAX_REDIRECTS}) "
-            f"with identifier: {identifier}")
+def info_unsafe(identifier: str, max_redirects: int, deadline: Deadline | None = None):
+    share = find_share(identifier, max_redirects, deadline)
+    if not share:
+        return None
+    return gather_info_from_dataset(*share, deadline)
+
+
+def find_share(identifier: str, max_redirects: int, deadline: Deadline | None = None):
+    """Follow redirects from `identifier` to a Onedata share URL; (onezone_domain, share_id) or None.
+
+    Answers from onedata_share_cache when it can. Definite outcomes are cached, including
+    identifiers that lead elsewhere; walks cut short by network errors or the deadline are not.
+    """
+    share = onedata_share_cache.get_share(identifier)
+    if share is not MISSING:
+        return share
+    share, definitive = _walk_redirects(identifier, max_redirects, deadline)
+    if definitive:
+        onedata_share_cache.put_share(identifier, share)
+    return share
+
+
+def _walk_redirects(identifier: str, max_redirects: int, deadline: Deadline | None = None):
+    """(share or None, whether that outcome is definite) for `identifier`."""
+    for _ in range(max_redirects):
+        url = identifier_to_url(identifier)
+        if not url:
+            return None, True
+
+        onezone_domain, share_id = identify_as_share_link(url)
+        if onezone_domain and share_id:
+            return (onezone_domain, share_id), True
+
+        redirect_url, definitive = _peek_redirect(url, deadline)
+        if not redirect_url:
+            return None, definitive
+        identifier = redirect_url
+
+    log_error(
+        f"Resigning after reaching max redirects ({max_redirects}) "
+        f"with identifier: {identifier}")
+    return None, True
+
+
+def _share_public(onezone_domain: str, share_id: str, deadline: Deadline | None = None) -> dict:
+    data = onedata_share_cache.get_public(onezone_domain, share_id)
+    if data is MISSING:
+        data = call_rest_api(onezone_domain, f"/shares/{share_id}/public", deadline=deadline)
+        onedata_share_cache.put_public(onezone_domain, share_id, data)
+    return data
+
+
+def iter_info_pages(identifier: str, deadline: Deadline | None = None):
+    """Streaming counterpart of info(): a generator of file-info pages, or None when not a Onedata dataset.
+
+    The share is located eagerly so callers know whether the identifier resolves before they start
+    a response; the listing is crawled no further ahead than the pages being fetched in parallel, so
+    memory stays bounded however large the dataset is.
+    """
+    log_info(f"Attempting to stream an identifier as a Onedata dataset: {identifier}")
+    share = find_share(identifier, MAX_REDIRECTS, deadline)
+    if not share:
         return None
+    return _iter_dataset_pages(*share, deadline)
 
-    url = identifier_to_url(identifier)
-    if not url:
+
+async def aiter_info_pages(identifier: str, deadline: Deadline | None = None, run=None):
+    """Async counterpart of iter_info_pages(): an async iterator of file-info pages, or None when not a Onedata dataset.
+
+    Every blocking step goes through `run` (`asyncio.to_thread` unless a pool's runner is given),
+    so the event loop never waits on Onedata.
+    """
+    run = run or asyncio.to_thread
+    pages = await run(iter_info_pages, identifier, deadline)
+    if pages is None:
         return None
-    
-    onezone_domain, share_id = identify_as_share_link(url)
-    if onezone_domain and share_id:
-        return gather_info_from_dataset(onezone_domain, share_id)
-    
-    redirect_url = peek_redirect(url)
+    return aiter_pages(pages, run)
 
-    if not redirect_url:
-        return False
 
-    return info_unsafe(redirect_url, max_redirects - 1)
-    
+async def aiter_pages(pages, run=None):
+    """Advance a blocking page generator from async code, one `next()` per page."""
+    run = run or asyncio.to_thread
+    while (page := await run(next, pages, None)) is not None:
+        yield page
+
 
-def gather_info_from_dataset(onezone_domain: str, share_id: str):
-    data = call_rest_api(onezone_domain, f"/shares/{share_id}/public") 
+def _iter_dataset_pages(onezone_domain: str, share_id: str, deadline: Deadline | None = None):
+    data = _share_public(onezone_domain, share_id, deadline)
+    space_id = data.get("spaceId", "unknown")
+    if data.get("fileType") == "REG":
+        yield [resolve_shared_file_info(onezone_domain, space_id, data.get("rootFileId"), deadline)]
+        return
+    if data.get("fileType") != "DIR":
+        log_error(f"Unexpected Onedata share fileType: {data.get("fileType", "unknown")}")
+        return
+
+    yield from crawl_directory(onezone_domain, space_id, data.get("rootFileId"), deadline)
+
+
+def gather_info_from_dataset(onezone_domain: str, share_id: str, deadline: Deadline | None = None):
+    data = _share_public(onezone_domain, share_id, deadline)
     root_file_id = data.get("rootFileId")
     space_id = data.get("spaceId", "unknown")
     if data.get("fileType") == "DIR":
         return {
-            "files": gather_file_infos_for_directory(onezone_domain, space_id, root_file_id)
+            "files": gather_file_infos_for_directory(onezone_domain, space_id, root_file_id, deadline=deadline)
         }
     elif data.get("fileType") == "REG":
         return {
-            "files": [resolve_shared_file_info(onezone_domain, space_id, root_file_id)]
+            "files": [resolve_shared_file_info(onezone_domain, space_id, root_file_id, deadline)]
         }
     else:
         log_error(f"Unexpected Onedata share fileType: {data.get("fileType", "unknown")}")
         return None
 
 
-def gather_file_infos_for_directory(
-    onezone_domain: str, 
-    space_id: str,
-    file_id: str, 
-    paging_token=None, 
-    executor=None
-):
-    dir_listing_data = call_rest_api(
-        onezone_domain, 
-        f"/shares/data/{file_id}/children",
+def list_directory_page(onezone_domain: str, dir_id: str, paging_token=None, deadline: Deadline | None = None):
+    return call_rest_api(
+        onezone_domain,
+        f"/shares/data/{dir_id}/children",
         body_json={
             "attributes": ["fileId", "name", "type", "size"],
             "token": paging_token
         },
         raise_for_status=False,
-        failure_log_details="Cannot fetch files inside a shared directory. All nested files will be omitted."
+        failure_log_details="Cannot fetch files inside a shared directory. All nested files will be omitted.",
+        deadline=deadline
     )
-    if not dir_listing_data:
-        return []
-    
-    children = dir_listing_data.get("children", [])
-    results = []
-
-    # create a shared executor at the root
-    is_root_executor = executor is None
-    if is_root_executor:
-        executor = ThreadPoolExecutor(max_workers=MAX_THREADS)
 
-    futures = []
 
+def crawl_directory(
+    onezone_domain: str,
+    space_id: str,
+    dir_id: str,
+    deadline: Deadline | None = None,
+    parallelism: int | None = None
+):
+    """Breadth-first crawl of a shared directory tree; yields the file infos of each listed page.
+
+    Directory pages (a subdirectory or the next page of a directory) wait in a queue and are fetched
+    by at most `parallelism` worker threads. Only the calling thread waits on the workers and fans out
+    their results, so no worker ever blocks on another and deep trees cannot exhaust the pool. A page
+    that cannot be listed is logged and its subtree omitted. Raises DeadlineExceeded, after the pages
+    already yielded, once `deadline` passes.
+    """
+    parallelism = max(1, parallelism or MAX_THREADS)
+    queue = deque([(dir_id, None)])
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="onedata-crawl")
     try:
-        for child in children:
-            child_id = child.get("fileId")
-
-            if child.get("type") == "DIR":
-                futures.append(
-                    executor.submit(
-                        gather_file_infos_for_directory,
-                        onezone_domain,
-                        space_id,
-                        child_id,
-                        None,
-                        executor,
-                    )
-                )
-            else:
-                futures.append(
-                    executor.submit(
-                        build_file_info,
-                        onezone_domain,
-                        space_id,
-                        child_id,
-                        child.get("name"),
-                        child.get("size"),
-                    )
-                )
-
-        for f in as_completed(futures):
-            try:
-                result = f.result()
-                if isinstance(result, list):
-                    results.extend(result)  # directory result
-                elif result:
-                    results.append(result)  # single file info
-            except Exception as e:
-                tb = traceback.format_exc()
-                log_error(f"Child task failed: {e}\n{tb}")
-
-        if not dir_listing_data.get("isLast"):
-            results.extend(
-                gather_file_infos_for_directory(
-                    onezone_domain,
-                    space_id,
-                    file_id,
-                    paging_token=dir_listing_data.get("nextPageToken"),
-                    executor=executor,
-                )
-            )
-
+        while queue or running:
+            while queue and len(running) < parallelism:
+                if deadline is not None and deadline.expired():
+                    raise deadline.fail()
+                current_dir, paging_token = queue.popleft()
+                future = executor.submit(list_directory_page, onezone_domain, current_dir, paging_token, deadline)
+                running[future] = current_dir
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                current_dir = running.pop(future)
+                try:
+                    page = future.result()
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    log_error(f"Cannot list shared directory {current_dir}, its files will be omitted: {e}")
+                    continue
+                if not page:
+                    continue
+                files = []
+                for child in page.get("children", []):
+                    if child.get("type") == "DIR":
+                        queue.append((child.get("fileId"), None))
+                    else:
+                        files.append(build_file_info(
+                            onezone_domain, space_id, child.get("fileId"), child.get("name"), child.get("size")))
+                if not page.get("isLast") and page.get("nextPageToken"):
+                    queue.append((current_dir, page.get("nextPageToken")))
+                yield files
     finally:
-        if is_root_executor:
-            executor.shutdown(wait=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+
 
+def gather_file_infos_for_directory(
+    onezone_domain: str,
+    space_id: str,
+    file_id: str,
+    deadline: Deadline | None = None,
+    parallelism: int | None = None
+):
+    results = []
+    try:
+        for files in crawl_directory(onezone_domain, space_id, file_id, deadline, parallelism):
+            results.extend(files)
+    except DeadlineExceeded:
+        log_warning(f"Deadline exceeded, omitting the rest of shared directory {file_id}")
     return results
 
 
-def resolve_shared_file_info(onezone_domain: str, space_id: str, file_id: str):
+def resolve_shared_file_info(onezone_domain: str, space_id: str, file_id: str, deadline: Deadline | None = None):
     attributes = call_rest_api(
         onezone_domain, 
         f"/shares/data/{file_id}",
         body_json={
             "attributes": ["fileId", "name", "size"]
-        }
+        },
+        deadline=deadline
     )
     return build_file_info(
         onezone_domain, 
@@ -199,10 +325,16 @@ def call_rest_api(
         path: str, 
         body_json=None, 
         raise_for_status=True,
-        failure_log_details=None
+        failure_log_details=None,
+        deadline: Deadline | None = None
     ):
     url = build_rest_api_uri(onezone_domain, path)
-    response = requests.get(url, json=body_json)
+    try:
+        response = _get_session().get(url, json=body_json, timeout=_timeout(deadline, REST_API_TIMEOUT))
+    except requests.Timeout:
+        if deadline is not None and deadline.expired():
+            raise deadline.fail()
+        raise
 
     if not response.ok:
         if failure_log_details:
@@ -223,7 +355,7 @@ def call_rest_api(
 
 
 def build_rest_api_uri(onezone_domain: str, path: str):
-    return f"https://{onezone_domain}/api/v3/onezone{path if path.startswith("/") else "/" + path}"
+    return f"{REST_API_SCHEME}://{onezone_domain}/api/v3/onezone{path if path.startswith("/") else "/" + path}"
 
 
 def identifier_to_url(identifier: str):
@@ -239,29 +371,37 @@ def identifier_to_url(identifier: str):
     return None
 
 
-def peek_redirect(url: str):
+def peek_redirect(url: str, deadline: Deadline | None = None):
+    return _peek_redirect(url, deadline)[0]
+
+
+def _peek_redirect(url: str, deadline: Deadline | None = None):
+    """(Location of a redirect from `url` or None, whether a None is definite rather than a network failure)."""
     try:
-        response = requests.head(url, allow_redirects=False, timeout=REQUEST_TIMEOUT)
-    except ConnectionError:
+        response = _get_session().head(url, allow_redirects=False, timeout=_timeout(deadline, REQUEST_TIMEOUT))
+    except requests.ConnectionError:
         log_warning(f"cannot resolve a redirection for url: {url}\n> Reason: connection error (host unreachable or DNS failure)")
-        return None
-    except Timeout:
+        return None, False
+    except requests.Timeout:
+        if deadline is not None and deadline.expired():
+            raise deadline.fail()
         log_warning(f"cannot resolve a redirection for url: {url}\n> Reason: request timed out after {REQUEST_TIMEOUT}s")
-        return None
-    except RequestException as e:
+        return None, False
+    except requests.RequestException as e:
         log_warning(f"cannot resolve a redirection for url: {url}\n> Reason: request failed ({type(e).__name__}: {e})")
-        return None
+        return None, False
     
     if 300 <= response.status_code < 400:
         redirect_url = response.headers.get("Location")
         if redirect_url:
-            return redirect_url
+            return redirect_url, True
         else:
             log_warning(f"cannot resolve a redirection for url: {url}\n> Reason: redirect response ({response.status_code}) without Location header")
-            return None
+            return None, True
 
     log_warning(f"cannot resolve a redirection for url: {url}\n> Reason: received a non-redirection HTTP code {response.status_code}")
-    return None
+    # Server errors and rate limiting may clear up; any other answer means the chain ends here.
+    return None, not (response.status_code >= 500 or response.status_code == 429)
 
 
 # Heuristics to guess that this is a Onedata dataset - each published dataset is based 
@@ -278,15 +418,12 @@ def identify_as_share_link(url: str):
 
 
 def log_info(msg: str):
-    print(f"INFO:     {msg}")
     logging.info(msg)
 
 
 def log_warning(msg: str):
-    print(f"WARNING:  {msg}")
     logging.warning(msg)
 
 
 def log_error(msg: str):
-    print(f"ERROR:    {msg}")
     logging.error(msg)
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src.filemetrix.infra.commons import get_int_setting
+from src.filemetrix.services.pid_cache import normalize_pid
+
+# Returned by the getters when nothing usable is cached (None is a cached "not a Onedata share").
+MISSING = object()
+
+
+class OnedataShareCache:
+    """Where identifiers lead on Onedata, so repeated resolutions skip the redirect walk and share lookup.
+
+    Two in-memory LRU maps: identifier -> (onezone_domain, share_id), or None for identifiers whose
+    redirect chain ended outside Onedata (kept for the shorter `negative_ttl_seconds`), and
+    (onezone_domain, share_id) -> the share's `/public` document. Lookups that failed on network
+    errors or deadlines are not stored. All methods are thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 86400, negative_ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._shares: OrderedDict[str, tuple[float, tuple | None]] = OrderedDict()
+        self._public: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"share_hits": 0, "negative_hits": 0, "share_misses": 0,
+                       "public_hits": 0, "public_misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_settings(cls) -> "OnedataShareCache":
+        return cls(
+            max_entries=get_int_setting("onedata_share_cache_max_entries", 10000),
+            ttl_seconds=get_int_setting("onedata_share_cache_ttl_seconds", 86400),
+            negative_ttl_seconds=get_int_setting("onedata_share_cache_negative_ttl_seconds", 3600),
+        )
+
+    def _lookup(self, entries: OrderedDict, key, ttl_of):
+        """Fresh cached value of `key` or MISSING; call with the lock held."""
+        entry = entries.get(key)
+        if entry is None:
+            return MISSING
+        stored_at, value = entry
+        if time.time() - stored_at >= ttl_of(value):
+            del entries[key]
+            return MISSING
+        entries.move_to_end(key)
+        return value
+
+    def _store(self, entries: OrderedDict, key, value):
+        with self._lock:
+            entries[key] = (time.time(), value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _share_ttl(self, share) -> int:
+        return self.ttl_seconds if share is not None else self.negative_ttl_seconds
+
+    def get_share(self, identifier: str):
+        """(onezone_domain, share_id), None when known not to be Onedata, or MISSING."""
+        with self._lock:
+            share = self._lookup(self._shares, normalize_pid(identifier), self._share_ttl)
+            if share is MISSING:
+                self._stats["share_misses"] += 1
+            else:
+                self._stats["share_hits" if share is not None else "negative_hits"] += 1
+            return share
+
+    def put_share(self, identifier: str, share: tuple | None):
+        self._store(self._shares, normalize_pid(identifier), share)
+
+    def get_public(self, onezone_domain: str, share_id: str):
+        """The share's `/public` document, or MISSING."""
+        with self._lock:
+            data = self._lookup(self._public, (onezone_domain, share_id), lambda value: self.ttl_seconds)
+            self._stats["public_misses" if data is MISSING else "public_hits"] += 1
+            return data
+
+    def put_public(self, onezone_domain: str, share_id: str, data: dict):
+        self._store(self._public, (onezone_domain, share_id), data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(shares=len(self._shares), public=len(self._public))
+        lookups = stats["share_hits"] + stats["negative_hits"] + stats["share_misses"]
+        stats["share_hit_ratio"] = round((stats["share_hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        stats.update(max_entries=self.max_entries, ttl_seconds=self.ttl_seconds,
+                     negative_ttl_seconds=self.negative_ttl_seconds)
+        return stats
+
+
+onedata_share_cache = OnedataShareCache.from_settings()
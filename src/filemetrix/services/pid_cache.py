@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from src.filemetrix.infra.commons import app_settings, get_int_setting
+
+_DOI_PREFIXES = ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:")
+
+
+def normalize_pid(pid: str) -> str:
+    """Cache key for a PID: URL-decoded, without resolver/`doi:` prefix, DOIs lower-cased (they are case-insensitive)."""
+    key = unquote(pid).strip()
+    lowered = key.lower()
+    for prefix in _DOI_PREFIXES:
+        if lowered.startswith(prefix):
+            key = key[len(prefix):]
+            lowered = key.lower()
+            break
+    if lowered.startswith("10."):
+        key = lowered
+    return key
+
+
+class PidCache:
+    """Two-tier cache of resolved file listings: in-memory LRU in front of an optional on-disk JSON store.
+
+    Entries older than `ttl_seconds` are treated as missing in both tiers. Disk hits are promoted
+    to memory. Memory holds at most `max_entries` listings and `max_files` file entries in total
+    (listings can have 100k+ files); a listing larger than `max_files` is only kept on disk. All
+    methods are thread-safe; disk writes go through a temp file and rename.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 86400, cache_dir: str | None = None,
+                 max_files: int = 200_000):
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._files = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0,
+                       "too_large": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> "PidCache":
+        return cls(
+            max_entries=get_int_setting("pid_cache_max_entries", 1000),
+            max_files=get_int_setting("pid_cache_max_files", 200_000),
+            ttl_seconds=get_int_setting("pid_cache_ttl_seconds", 86400),
+            cache_dir=app_settings.get("pid_cache_dir") or None,
+        )
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl_seconds
+
+    def _forget(self, key: str):
+        # Caller holds the lock.
+        _, files = self._entries.pop(key)
+        self._files -= len(files)
+
+    def _remember(self, key: str, stored_at: float, files: list):
+        with self._lock:
+            if key in self._entries:
+                self._forget(key)
+            if len(files) > self.max_files:
+                self._stats["too_large"] += 1
+                return
+            self._entries[key] = (stored_at, files)
+            self._files += len(files)
+            while len(self._entries) > self.max_entries or self._files > self.max_files:
+                self._forget(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def get(self, pid: str) -> list | None:
+        key = normalize_pid(pid)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                self._forget(key)
+                self._stats["expired"] += 1
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    doc = json.load(f)
+                if doc.get("pid") == key and self._fresh(doc.get("stored_at", 0)):
+                    self._remember(key, doc["stored_at"], doc["files"])
+                    self._count("disk_hits")
+                    return doc["files"]
+                self._count("expired")
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.warning(f"Failed to read PID cache entry for {key}: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, pid: str, files: list):
+        key = normalize_pid(pid)
+        stored_at = time.time()
+        self._remember(key, stored_at, files)
+        self._count("stores")
+        if not self.cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"pid": key, "stored_at": stored_at, "files": files}, f, default=str)
+            os.replace(tmp_path, self._disk_path(key))
+        except Exception as e:
+            logging.warning(f"Failed to write PID cache entry for {key}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["files"] = self._files
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats.update(max_entries=self.max_entries, max_files=self.max_files, ttl_seconds=self.ttl_seconds,
+                     disk_enabled=bool(self.cache_dir))
+        return stats
+
+
+pid_cache = PidCache.from_settings()
@@ -0,0 +1,174 @@
+import copy
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from src.filemetrix.infra.commons import app_settings, get_int_setting
+from src.filemetrix.infra.lazy_import import LazyModule
+
+requests = LazyModule("requests")
+
+RE3DATA_REPOSITORY_URL = "https://www.re3data.org/api/v1/repository/{r3id}"
+DEFAULT_TRANSFORMER_URL = "http://transformer.labs.dansdemo.nl/transform/r3data-xml-to-json.xsl"
+# Bump when the shape of cached documents changes; older entries are then ignored.
+CACHE_FORMAT_VERSION = 1
+REQUEST_TIMEOUT = 60
+# re3data ids (e.g. r3d100010214) become file names; anything else is only cached in memory.
+_SAFE_ID = re.compile(r"[A-Za-z0-9._-]+")
+
+
+class RepositoryDetailCache:
+    """re3data repository records, transformed to JSON, cached by re3data id in memory and on disk.
+
+    Each entry records the cache format version and the transform that produced it, so switching
+    between the remote transformer and a local XSLT (or editing the XSLT) invalidates old entries.
+    Lookups for the same id are serialized, so an expired entry costs one transform, not one per caller.
+    """
+
+    def __init__(self, ttl_seconds: int = 86400, cache_dir: str | None = None,
+                 transformer_url: str = DEFAULT_TRANSFORMER_URL, xslt_file: str | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.transformer_url = transformer_url
+        self.xslt_file = xslt_file
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._local = threading.local()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "remote_transforms": 0, "local_transforms": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> "RepositoryDetailCache":
+        return cls(
+            ttl_seconds=get_int_setting("re3data_detail_ttl_seconds", 86400),
+            cache_dir=app_settings.get("re3data_detail_cache_dir") or None,
+            transformer_url=app_settings.get("re3data_transformer_url") or DEFAULT_TRANSFORMER_URL,
+            xslt_file=app_settings.get("re3data_xslt_file") or None,
+        )
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _transform_id(self) -> str:
+        if self.xslt_file:
+            return f"xslt:{os.path.abspath(self.xslt_file)}:{os.path.getmtime(self.xslt_file)}"
+        return f"remote:{self.transformer_url}"
+
+    def _valid(self, entry: dict | None, transform_id: str) -> bool:
+        return (
+            entry is not None
+            and entry.get("format") == CACHE_FORMAT_VERSION
+            and entry.get("transform") == transform_id
+            and time.time() - entry.get("stored_at", 0) < self.ttl_seconds
+        )
+
+    def _disk_path(self, r3id: str) -> str | None:
+        if not self.cache_dir or not _SAFE_ID.fullmatch(r3id):
+            return None
+        return os.path.join(self.cache_dir, f"{r3id}.json")
+
+    def _read_disk(self, r3id: str) -> dict | None:
+        path = self._disk_path(r3id)
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Failed to read re3data detail cache entry for {r3id}: {e}")
+            return None
+
+    def _write_disk(self, r3id: str, entry: dict):
+        path = self._disk_path(r3id)
+        if not path:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.warning(f"Failed to write re3data detail cache entry for {r3id}: {e}")
+
+    def _local_xslt(self):
+        """Compiled stylesheet, one per thread (lxml XSLT objects should not be shared between threads)."""
+        xslt = getattr(self._local, "xslt", None)
+        if xslt is None or self._local.xslt_id != self._transform_id():
+            from lxml import etree
+
+            self._local.xslt = xslt = etree.XSLT(etree.parse(self.xslt_file))
+            self._local.xslt_id = self._transform_id()
+        return xslt
+
+    def _transform(self, r3id: str, xml_text: str) -> dict:
+        if self.xslt_file:
+            try:
+                from lxml import etree
+
+                result = self._local_xslt()(etree.fromstring(xml_text.encode("utf-8")))
+                self._count("local_transforms")
+                return json.loads(str(result))
+            except ImportError:
+                logging.warning("lxml is not installed; falling back to the remote transformer")
+        headers = {
+            "Content-Type": "application/xml",
+            "Authorization": f"Bearer {app_settings.METADATA_TRANSFORMER_SERVICE_API_KEY}"
+        }
+        transformer_response = requests.post(self.transformer_url, headers=headers, data=xml_text, timeout=REQUEST_TIMEOUT)
+        transformer_response.raise_for_status()
+        self._count("remote_transforms")
+        logging.info(f"Transformed re3data record {r3id} with {self.transformer_url}")
+        return json.loads(json.loads(transformer_response.text)["result"])
+
+    def get(self, r3id: str) -> dict:
+        """Transformed re3data record of `r3id` (blocking). Returns a copy the caller may modify."""
+        transform_id = self._transform_id()
+        with self._lock:
+            entry = self._entries.get(r3id)
+            key_lock = self._key_locks.setdefault(r3id, threading.Lock())
+        if self._valid(entry, transform_id):
+            self._count("memory_hits")
+            return copy.deepcopy(entry["document"])
+
+        with key_lock:
+            # Another caller may have refreshed the entry while we waited for the lock.
+            entry = self._entries.get(r3id)
+            if self._valid(entry, transform_id):
+                self._count("memory_hits")
+                return copy.deepcopy(entry["document"])
+            entry = self._read_disk(r3id)
+            if self._valid(entry, transform_id):
+                self._count("disk_hits")
+            else:
+                self._count("misses")
+                response = requests.get(RE3DATA_REPOSITORY_URL.format(r3id=r3id), timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                entry = {
+                    "format": CACHE_FORMAT_VERSION,
+                    "transform": transform_id,
+                    "stored_at": time.time(),
+                    "document": self._transform(r3id, response.text),
+                }
+                self._write_disk(r3id, entry)
+            with self._lock:
+                self._entries[r3id] = entry
+            return copy.deepcopy(entry["document"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats.update(ttl_seconds=self.ttl_seconds, disk_enabled=bool(self.cache_dir), local_xslt=bool(self.xslt_file))
+        return stats
+
+
+re3data_details = RepositoryDetailCache.from_settings()
@@ -0,0 +1,283 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from src.filemetrix.infra.commons import app_settings, get_int_setting
+from src.filemetrix.infra.lazy_import import LazyModule
+
+requests = LazyModule("requests")
+
+RE3DATA_REPOSITORIES_URL = "https://www.re3data.org/api/v1/repositories"
+# Minimum pause between refresh attempts, so a failing re3data is not retried on every request.
+RETRY_SECONDS = 60
+
+
+def normalize_name(name: str) -> str:
+    """Index key for repository names: case-folded, punctuation dropped, whitespace collapsed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", name.casefold()).split())
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class RepositoryIndex:
+    """Search index over one version of the repository list.
+
+    Names are matched on the normalized form: a sorted name list and a sorted word list answer
+    prefix queries with bisect, and a trigram index narrows substring queries to a few candidates.
+    Results are ordered by (match rank, name, id), which is also the key cursors point into.
+    """
+
+    # Match ranks, best first.
+    EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+    def __init__(self, repos: list[dict]):
+        self.repos = repos
+        self.names = [normalize_name(repo.get("name") or "") for repo in repos]
+        self._sorted_names = sorted((name, i) for i, name in enumerate(self.names))
+        self._sorted_words = sorted({(word, i) for i, name in enumerate(self.names) for word in name.split()})
+        self._trigrams: dict[str, set[int]] = {}
+        for i, name in enumerate(self.names):
+            for trigram in _trigrams(name):
+                self._trigrams.setdefault(trigram, set()).add(i)
+
+    @staticmethod
+    def _prefixed(sorted_pairs: list, prefix: str):
+        start = bisect.bisect_left(sorted_pairs, (prefix,))
+        for key, i in sorted_pairs[start:]:
+            if not key.startswith(prefix):
+                break
+            yield i
+
+    def _match(self, query: str) -> dict[int, int]:
+        """Rank of every repository whose name matches `query` (already normalized)."""
+        ranks: dict[int, int] = {}
+        for i in self._prefixed(self._sorted_names, query):
+            ranks[i] = self.EXACT if self.names[i] == query else self.PREFIX
+        for i in self._prefixed(self._sorted_words, query):
+            ranks.setdefault(i, self.WORD_PREFIX)
+        if len(query) >= 3:
+            candidates = None
+            for trigram in _trigrams(query):
+                candidates = self._trigrams.get(trigram, set()) if candidates is None else candidates & self._trigrams.get(trigram, set())
+                if not candidates:
+                    break
+            for i in candidates or ():
+                if query in self.names[i]:
+                    ranks.setdefault(i, self.SUBSTRING)
+        return ranks
+
+    def search(self, query: str | None = None, r3id: str | None = None, doi: str | None = None) -> list[tuple]:
+        """Sorted (rank, name, id, repo) tuples matching all given criteria."""
+        if query and normalize_name(query):
+            ranks = self._match(normalize_name(query))
+        else:
+            ranks = dict.fromkeys(range(len(self.repos)), self.EXACT)
+        doi = doi.lower().removeprefix("https://doi.org/") if doi else None
+        results = []
+        for i, rank in ranks.items():
+            repo = self.repos[i]
+            if r3id and repo.get("id") != r3id:
+                continue
+            if doi and (repo.get("doi") or "").lower().removeprefix("https://doi.org/") != doi:
+                continue
+            results.append((rank, self.names[i], repo.get("id") or "", repo))
+        results.sort(key=lambda result: result[:3])
+        return results
+
+
+class Re3dataRegistry:
+    """In-memory copy of the re3data repository list, indexed by id and by normalized name.
+
+    Readers never wait for the network: a stale list keeps being served while a background
+    refresh revalidates it with a conditional GET (ETag / Last-Modified). The last good list is
+    kept on disk so a restart serves it immediately.
+    """
+
+    def __init__(self, url: str = RE3DATA_REPOSITORIES_URL, refresh_seconds: int = 86400,
+                 cache_file: str | None = None, timeout: int = 60):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.cache_file = cache_file
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._last_attempt = 0.0
+        self._repos: list[dict] = []
+        self._by_id: dict[str, dict] = {}
+        self._by_name: dict[str, dict] = {}
+        self._json: bytes = b"[]"
+        self._index = RepositoryIndex([])
+        self.content_hash = ""
+        self.version = 0
+        self.fetched_at = 0.0
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self._stats = {"refreshes": 0, "not_modified": 0, "failures": 0}
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls) -> "Re3dataRegistry":
+        return cls(
+            url=app_settings.get("re3data_repositories_url") or RE3DATA_REPOSITORIES_URL,
+            refresh_seconds=get_int_setting("re3data_refresh_seconds", 86400),
+            cache_file=app_settings.get("re3data_cache_file") or "repositories_cache.json",
+            timeout=get_int_setting("re3data_request_timeout_seconds", 60),
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self.version > 0
+
+    @property
+    def repos(self) -> list[dict]:
+        return self._repos
+
+    def json_bytes(self) -> bytes:
+        """The repository list serialized once per version, for the `/repositories` response."""
+        return self._json
+
+    @property
+    def index(self) -> RepositoryIndex:
+        return self._index
+
+    def get(self, r3id: str) -> dict | None:
+        return self._by_id.get(r3id)
+
+    def find_by_name(self, name: str) -> dict | None:
+        return self._by_name.get(normalize_name(name))
+
+    def _install(self, repos: list[dict], fetched_at: float, etag: str | None, last_modified: str | None):
+        by_id = {repo["id"]: repo for repo in repos if repo.get("id")}
+        by_name = {}
+        for repo in repos:
+            if repo.get("name"):
+                by_name.setdefault(normalize_name(repo["name"]), repo)
+        serialized = json.dumps(repos).encode("utf-8")
+        index = RepositoryIndex(repos)
+        with self._lock:
+            self._repos, self._by_id, self._by_name, self._json = repos, by_id, by_name, serialized
+            self._index, self.content_hash = index, hashlib.sha1(serialized).hexdigest()
+            self.fetched_at, self.etag, self.last_modified = fetched_at, etag, last_modified
+            self.version += 1
+
+    def load_snapshot(self) -> bool:
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._install(snapshot["repos"], snapshot.get("fetched_at", 0.0),
+                          snapshot.get("etag"), snapshot.get("last_modified"))
+            logging.info(f"Loaded {len(self._repos)} re3data repositories from {self.cache_file}")
+            return True
+        except Exception as e:
+            logging.warning(f"Failed to read re3data snapshot {self.cache_file}: {e}")
+            return False
+
+    def _save_snapshot(self):
+        if not self.cache_file:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self.fetched_at, "etag": self.etag,
+                           "last_modified": self.last_modified, "repos": self._repos}, f)
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logging.warning(f"Failed to write re3data snapshot {self.cache_file}: {e}")
+
+    def refresh(self):
+        """Revalidate the list with re3data (blocking); keeps the current list on any failure."""
+        headers = {}
+        if self.loaded and self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.loaded and self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                with self._lock:
+                    self.fetched_at = time.time()
+                    self._stats["not_modified"] += 1
+                logging.info("re3data repository list not modified")
+                return
+            response.raise_for_status()
+            tree = ET.fromstring(response.content)
+            repos = [{elem.tag: elem.text for elem in node if elem.tag != "link"} for node in tree]
+            self._install(repos, time.time(), response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            with self._lock:
+                self._stats["refreshes"] += 1
+            logging.info(f"Refreshed re3data registry: {len(repos)} repositories")
+            self._save_snapshot()
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            logging.error(f"Failed to refresh re3data registry: {e}")
+
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at >= self.refresh_seconds
+
+    def refresh_in_background(self):
+        """Start a refresh on a worker thread unless one is running or was just attempted; returns immediately."""
+        with self._lock:
+            if self._refreshing or time.time() - self._last_attempt < RETRY_SECONDS:
+                return
+            self._refreshing = True
+            self._last_attempt = time.time()
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="re3data-refresh", daemon=True).start()
+
+    def ensure_fresh(self):
+        """Stale-while-revalidate: trigger a background refresh when the list is stale or missing."""
+        if not self.loaded or self.is_stale():
+            self.refresh_in_background()
+
+    async def refresh_periodically(self):
+        while True:
+            self.ensure_fresh()
+            await asyncio.sleep(max(RETRY_SECONDS, self.refresh_seconds // 4))
+
+    def start(self):
+        """Load the on-disk snapshot and keep the registry fresh from a background task (call from lifespan)."""
+        self.load_snapshot()
+        self._task = asyncio.create_task(self.refresh_periodically())
+
+    async def stop(self):
+        """Cancel the periodic refresh started by `start` (call from lifespan shutdown)."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(entries=len(self._repos), version=self.version, refreshing=self._refreshing)
+        stats.update(age_seconds=round(time.time() - self.fetched_at, 1) if self.fetched_at else None,
+                     refresh_seconds=self.refresh_seconds)
+        return stats
+
+
+re3data_registry = Re3dataRegistry.from_settings()
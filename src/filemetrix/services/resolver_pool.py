@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.filemetrix.infra.commons import get_int_setting
+from src.filemetrix.infra.deadline import Deadline
+from src.filemetrix.infra.stats import Histogram
+
+
+class ResolverBusyError(Exception):
+    """Raised when the resolver wait queue is full; callers should answer 503 with `Retry-After`."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PID resolver queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class ResolverPool:
+    """Dedicated thread pool for blocking PID resolvers (datahugger, Onedata) with admission control.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may wait for a thread;
+    further calls are rejected immediately with ResolverBusyError instead of piling up in the
+    default executor, which is shared with the rest of the application.
+
+    A call whose deadline passed while it waited is dropped when it reaches a thread. A call that
+    is already running cannot be stopped (datahugger takes no timeout): after its caller gave up
+    it keeps its thread, and counts against `max_workers`, until the resolver returns.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 32, retry_after: int = 5):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pid-resolver")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "expired": 0}
+        self.wait = Histogram()
+
+    @classmethod
+    def from_settings(cls) -> "ResolverPool":
+        return cls(
+            max_workers=get_int_setting("pid_resolver_workers", 8),
+            max_queue=get_int_setting("pid_resolver_queue_size", 32),
+            retry_after=get_int_setting("pid_resolver_retry_after_seconds", 5),
+        )
+
+    def _admit(self):
+        with self._lock:
+            # Admitted calls that have not finished, whether they already have a thread or not.
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                self._stats["rejected"] += 1
+                logging.warning(f"PID resolver rejected a call: {self._queued} queued, {self._running} running")
+                raise ResolverBusyError(self.retry_after)
+            self._queued += 1
+            self._stats["submitted"] += 1
+
+    def _dequeued(self, future):
+        # A call cancelled before it got a thread never runs, so it leaves the queue here.
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    async def run(self, fn, *args, deadline: Deadline | None = None):
+        """Run `fn(*args)` on the pool (with the caller's context, so trace spans nest) and await it.
+
+        Raises ResolverBusyError when the pool is full, and DeadlineExceeded without calling `fn`
+        when `deadline` passed before a thread was free.
+        """
+        self._admit()
+        submitted_at = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def call():
+            self.wait.observe(time.perf_counter() - submitted_at)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            outcome = "failed"
+            try:
+                if deadline is not None and deadline.expired():
+                    outcome = "expired"
+                    raise deadline.fail()
+                result = context.run(fn, *args)
+                outcome = "completed"
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats[outcome] += 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(self._dequeued)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(queued=self._queued, running=self._running)
+        stats.update(max_workers=self.max_workers, max_queue=self.max_queue, wait_seconds=self.wait.snapshot())
+        return stats
+
+
+resolver_pool = ResolverPool.from_settings()
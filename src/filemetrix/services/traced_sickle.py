@@ -0,0 +1,14 @@
+from sickle import Sickle
+
+from src.filemetrix.infra.tracing import get_tracer
+
+
+class TracedSickle(Sickle):
+    """Sickle client that wraps every OAI-PMH page request (including resumption pages) in a span."""
+
+    def harvest(self, **kwargs):
+        with get_tracer().start_as_current_span("oai.request") as span:
+            span.set_attribute("oai.endpoint", self.endpoint)
+            span.set_attribute("oai.verb", kwargs.get("verb", ""))
+            span.set_attribute("oai.resumption", "resumptionToken" in kwargs)
+            return super().harvest(**kwargs)
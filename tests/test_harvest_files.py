@@ -0,0 +1,38 @@
+import asyncio
+import socket
+import threading
+
+from src.filemetrix.infra.db import RepositoryModel
+from src.filemetrix.services import oai_harvester_client
+from src.filemetrix.services.oai_harvester_client import OaiHarvesterClient
+
+
+def _client(monkeypatch) -> OaiHarvesterClient:
+    monkeypatch.setattr(oai_harvester_client, "update_dataset_harvest_fm_start_in_progress", lambda pid: None)
+    repo = RepositoryModel(id=1, name="Test", url="http://oai.invalid/oai", metadata_prefix="oai_datacite")
+    return OaiHarvesterClient(repo)
+
+
+def test_unreachable_pid_fetcher_skips_the_dataset(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # closed again before the request, so the connection is refused
+    result = asyncio.run(_client(monkeypatch).harvest_files(1, "10.5072/refused", f"http://127.0.0.1:{port}/"))
+    assert result is None
+
+
+def test_silent_pid_fetcher_times_out(monkeypatch):
+    monkeypatch.setattr(oai_harvester_client, "FILES_FETCH_TIMEOUT", (1, 0.2))
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+    threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.getsockname()[1]}/"
+        result = asyncio.run(_client(monkeypatch).harvest_files(1, "10.5072/silent", url))
+    finally:
+        for conn, _ in accepted:
+            conn.close()
+        server.close()
+    assert result is None
@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.filemetrix.services import harvested_files
+
+
+def _dataset_lookup(calls: list):
+    async def lookup(candidates, harvested_after):
+        calls.append("dataset")
+        return SimpleNamespace(pid="doi:10.5072/abc")
+    return lookup
+
+
+def test_file_read_failure_falls_back_to_live(monkeypatch):
+    calls = []
+
+    async def broken_rows(dataset_pid):
+        calls.append("rows")
+        raise ConnectionRefusedError("database is down")
+
+    monkeypatch.setattr(harvested_files, "_db_unavailable_until", 0.0)
+    monkeypatch.setattr(harvested_files, "get_harvested_dataset_async", _dataset_lookup(calls))
+    monkeypatch.setattr(harvested_files, "get_file_metadata_by_dataset_pid_async", broken_rows)
+    assert asyncio.run(harvested_files.get_harvested_files("10.5072/abc")) is None
+    assert calls == ["dataset", "rows"]
+
+
+def test_database_is_skipped_until_the_retry_delay_passes(monkeypatch):
+    calls = []
+
+    async def unreachable(candidates, harvested_after):
+        calls.append("dataset")
+        raise TimeoutError("connect timed out")
+
+    monkeypatch.setattr(harvested_files, "_db_unavailable_until", 0.0)
+    monkeypatch.setattr(harvested_files, "DB_RETRY_SECONDS", 60.0)
+    monkeypatch.setattr(harvested_files, "get_harvested_dataset_async", unreachable)
+    assert asyncio.run(harvested_files.get_harvested_files("10.5072/abc")) is None
+    assert asyncio.run(harvested_files.get_harvested_extensions("10.5072/abc")) is None
+    assert asyncio.run(harvested_files.find_harvested_dataset_pid("10.5072/abc")) is None
+    assert calls == ["dataset"]
+
+    monkeypatch.setattr(harvested_files, "_db_unavailable_until", 0.0)  # retry delay over
+    monkeypatch.setattr(harvested_files, "get_harvested_dataset_async", _dataset_lookup(calls))
+    assert asyncio.run(harvested_files.find_harvested_dataset_pid("10.5072/abc")) == "doi:10.5072/abc"
+    assert calls == ["dataset", "dataset"]
@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.bench_import_time import measure
+
+BUDGET_MS = 1200  # the default --budget-ms of benchmarks/bench_import_time.py
+
+
+@pytest.mark.parametrize("module", ["src.filemetrix.main", "src.filemetrix.harvest_worker"])
+def test_startup_import_stays_within_budget_and_defers_heavy_clients(module):
+    if module == "src.filemetrix.main":
+        pytest.importorskip("akmi_utils.commons", reason="akmi-utils older than the locked version")
+    seconds, _, loaded = measure(module, runs=3)
+    assert loaded == [], f"imported at startup instead of on first use: {loaded}"
+    assert seconds * 1000 <= BUDGET_MS, f"import {module} took {seconds * 1000:.0f} ms"
@@ -0,0 +1,23 @@
+import os
+
+from src.filemetrix.infra import log_config
+from src.filemetrix.infra.log_config import process_log_file
+
+
+def _web_workers(monkeypatch, workers: int):
+    get_int_setting = log_config.get_int_setting
+    monkeypatch.setattr(log_config, "get_int_setting",
+                        lambda name, default: workers if name == "web_workers" else get_int_setting(name, default))
+
+
+def test_single_api_process_keeps_the_configured_file(monkeypatch):
+    _web_workers(monkeypatch, 1)
+    assert process_log_file("/var/log/filemetrix/fms.log", "api") == "/var/log/filemetrix/fms.log"
+
+
+def test_processes_sharing_a_log_directory_get_their_own_files(monkeypatch):
+    _web_workers(monkeypatch, 4)
+    pid = os.getpid()
+    assert process_log_file("/var/log/filemetrix/fms.log", "api") == f"/var/log/filemetrix/fms.api-{pid}.log"
+    _web_workers(monkeypatch, 1)
+    assert process_log_file("logs/slow-query.log", "harvest") == f"logs/slow-query.harvest-{pid}.log"
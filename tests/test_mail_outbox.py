@@ -0,0 +1,106 @@
+import socket
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src.filemetrix.infra import commons
+from src.filemetrix.infra.mail_outbox import MailOutbox
+
+
+class RecordingHandler:
+    """SMTP stand-in: keeps every message with the session (connection) it arrived on."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.messages = []
+        self.received = threading.Event()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.delay:
+            time.sleep(self.delay)  # a slow server, as seen by the sending thread
+        self.messages.append((id(session), envelope.content.decode()))
+        self.received.set()
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _use_smtp(monkeypatch, port: int):
+    overrides = {"mail_host": "127.0.0.1", "mail_port": port, "mail_use_tls": False, "mail_use_ssl": False,
+                 "mail_use_auth": False, "mail_to": ["ops@example.org"], "mail_from": "filemetrix@example.org"}
+    get = commons.app_settings.get
+    monkeypatch.setattr(commons.app_settings, "get", lambda name, default=None: overrides.get(name, get(name, default)))
+    monkeypatch.setenv("MAIL_SEND_RETRIES", "2")
+    monkeypatch.setenv("MAIL_SEND_INTERVAL", "1")
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    _use_smtp(monkeypatch, controller.port)
+    yield handler
+    controller.stop()
+
+
+def test_enqueue_does_not_wait_for_the_server(smtp_server):
+    smtp_server.delay = 0.2
+    outbox = MailOutbox(batch_size=10)
+    start = time.perf_counter()
+    assert all(outbox.enqueue(f"Harvest {i}", "done") for i in range(10))
+    assert time.perf_counter() - start < 0.1
+    outbox.close()
+    assert len(smtp_server.messages) == 10
+
+
+def test_full_outbox_drops_instead_of_blocking(smtp_server):
+    smtp_server.delay = 0.5
+    outbox = MailOutbox(max_size=2, batch_size=1)
+    start = time.perf_counter()
+    results = [outbox.enqueue(f"Harvest {i}", "done") for i in range(10)]
+    assert time.perf_counter() - start < 0.1
+    assert not all(results)
+    assert outbox.stats()["dropped"] == results.count(False)
+    outbox.close()
+
+
+def test_batch_is_sent_over_one_connection(smtp_server):
+    outbox = MailOutbox(batch_size=50)
+    for i in range(5):
+        outbox.enqueue(f"Harvest {i}", "done")
+    outbox.close()
+    assert len(smtp_server.messages) == 5
+    assert len({session for session, _ in smtp_server.messages}) == 1
+    assert outbox.stats()["connections"] == 1
+
+
+def test_digest_merges_notifications_into_one_email(smtp_server):
+    outbox = MailOutbox(digest_seconds=60)
+    for name in ("repo-a", "repo-b", "repo-c"):
+        outbox.enqueue("FileMetrix Harvest Completed", f"Harvest of {name} completed.", digest=True)
+    assert not smtp_server.received.wait(0.3)  # collected until the digest is due (or the outbox closes)
+    outbox.close()
+    assert len(smtp_server.messages) == 1
+    content = smtp_server.messages[0][1]
+    assert "FileMetrix notifications digest (3 notifications)" in content
+    assert all(f"Harvest of {name} completed." in content for name in ("repo-a", "repo-b", "repo-c"))
+    assert outbox.stats()["digests_sent"] == 1
+
+
+def test_unreachable_server_does_not_stall_callers(monkeypatch):
+    _use_smtp(monkeypatch, _free_port())  # nothing listens there
+    outbox = MailOutbox()
+    start = time.perf_counter()
+    for i in range(3):
+        assert outbox.enqueue(f"Harvest {i}", "done")
+    assert time.perf_counter() - start < 0.1
+    outbox.close(timeout=15)
+    stats = outbox.stats()
+    assert stats["failed"] == 3 and stats["sent"] == 0
@@ -0,0 +1,53 @@
+import os
+import socket
+import subprocess
+import sys
+import urllib.request
+
+from src.filemetrix.infra.metrics import serve_metrics
+
+_WORKER = """
+import os
+from src.filemetrix.infra.metrics import HARVESTS_IN_FLIGHT, HTTP_REQUEST_SECONDS, mark_process_stopped, \
+    publish_process_stats
+HTTP_REQUEST_SECONDS.labels("GET", "/api/v1/repos", "200").observe(0.01)
+HARVESTS_IN_FLIGHT.labels("files").inc()
+publish_process_stats()
+if {stopped}:
+    mark_process_stopped()
+print(os.getpid())
+"""
+
+_SCRAPE = """
+from prometheus_client import generate_latest
+from src.filemetrix.infra.metrics import metrics_registry
+print(generate_latest(metrics_registry()).decode())
+"""
+
+
+def _python(code: str, env: dict) -> str:
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_web_workers_are_summed_in_multiprocess_mode(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    # two worker processes that each served a request; the first one then shut down
+    stopped_pid = _python(_WORKER.format(stopped=True), env).strip()
+    live_pid = _python(_WORKER.format(stopped=False), env).strip()
+    exposition = _python(_SCRAPE, env)
+    assert 'filemetrix_http_request_duration_seconds_count{method="GET",route="/api/v1/repos",status="200"} 2.0' in exposition
+    assert 'filemetrix_harvests_in_flight{kind="files"} 1.0' in exposition
+    # per-process pool and resolver statistics stay on /metrics, one series per live worker
+    assert f'filemetrix_pid_resolver_queued{{pid="{live_pid}"}} 0.0' in exposition
+    assert f'pid="{stopped_pid}"' not in exposition
+    assert exposition.count("filemetrix_pid_resolver_queued{pid=") == 2  # the live worker and the scraping one
+
+
+def test_harvest_worker_serves_its_metrics():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    serve_metrics(port)
+    body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    assert "filemetrix_harvests_in_flight" in body
+    assert "filemetrix_db_pool_size" in body
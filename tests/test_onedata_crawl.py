@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from src.filemetrix.infra.deadline import Deadline, DeadlineExceeded
+from src.filemetrix.services import onedata_hugger
+
+PAGE_SIZE = 3
+
+
+def _files(dir_id: str, count: int) -> list[dict]:
+    return [{"fileId": f"{dir_id}-f{i}", "name": f"{dir_id}-{i}.txt", "type": "REG", "size": i} for i in range(count)]
+
+
+def _dir(dir_id: str) -> dict:
+    return {"fileId": dir_id, "name": dir_id, "type": "DIR"}
+
+
+# root -> a -> a1 -> a2 (deep), root -> b (one page too many for a single listing), root -> broken -> hidden
+TREE = {
+    "root": _files("root", 2) + [_dir("a"), _dir("b"), _dir("broken")],
+    "a": _files("a", 1) + [_dir("a1")],
+    "a1": _files("a1", 1) + [_dir("a2")],
+    "a2": _files("a2", 2),
+    "b": _files("b", 7),
+    "broken": [_dir("hidden")],
+    "hidden": _files("hidden", 1),
+}
+
+
+@pytest.fixture
+def listings(monkeypatch):
+    """Serves TREE through a stand-in call_rest_api, PAGE_SIZE children per page; records (dir, token) calls."""
+    calls = []
+    lock = threading.Lock()
+
+    def call_rest_api(onezone_domain, path, body_json=None, raise_for_status=True, failure_log_details=None,
+                      deadline=None):
+        dir_id = path.removeprefix("/shares/data/").removesuffix("/children")
+        with lock:
+            calls.append((dir_id, body_json.get("token")))
+        if dir_id == "broken":
+            raise ConnectionError("Onezone reset the connection")
+        children = TREE[dir_id]
+        start = int(body_json.get("token") or 0)
+        end = start + PAGE_SIZE
+        return {"children": children[start:end], "isLast": end >= len(children),
+                "nextPageToken": str(end) if end < len(children) else None}
+
+    monkeypatch.setattr(onedata_hugger, "call_rest_api", call_rest_api)
+    return calls
+
+
+def _names(files: list[dict]) -> list[str]:
+    return sorted(file["name"] for file in files)
+
+
+@pytest.mark.parametrize("parallelism", [1, 4])
+def test_nested_and_paged_directories_are_listed_completely(listings, parallelism):
+    files = onedata_hugger.gather_file_infos_for_directory("onezone.example.org", "space", "root",
+                                                           parallelism=parallelism)
+    expected = [file["name"] for dir_id in ("root", "a", "a1", "a2", "b") for file in TREE[dir_id]
+                if file["type"] == "REG"]
+    assert _names(files) == sorted(expected)
+    assert files[0]["ro_crate_extensions"]["onedata:spaceId"] == "space"
+    assert [token for dir_id, token in listings if dir_id == "b"] == [None, "3", "6"]
+    assert [token for dir_id, token in listings if dir_id == "root"] == [None, "3"]
+
+
+def test_directory_that_cannot_be_listed_only_omits_its_subtree(listings):
+    files = onedata_hugger.gather_file_infos_for_directory("onezone.example.org", "space", "root", parallelism=2)
+    assert "a2-1.txt" in _names(files) and "b-6.txt" in _names(files)
+    assert not any(name.startswith("hidden") for name in _names(files))
+    assert "hidden" not in [dir_id for dir_id, _ in listings]
+
+
+def test_crawl_returns_the_pages_listed_before_the_deadline(listings, monkeypatch):
+    list_page = onedata_hugger.call_rest_api
+
+    def slow_call_rest_api(*args, **kwargs):
+        time.sleep(0.2)
+        return list_page(*args, **kwargs)
+
+    monkeypatch.setattr(onedata_hugger, "call_rest_api", slow_call_rest_api)
+    files = onedata_hugger.gather_file_infos_for_directory("onezone.example.org", "space", "root", Deadline(0.3),
+                                                           parallelism=1)
+    assert _names(files) == ["a-0.txt", "root-0.txt", "root-1.txt"]  # root's first page, then a
+
+    with pytest.raises(DeadlineExceeded):
+        next(onedata_hugger.crawl_directory("onezone.example.org", "space", "root", Deadline(0)))
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.filemetrix.services import onedata_hugger, onedata_shares
+from src.filemetrix.services.onedata_shares import MISSING, OnedataShareCache
+
+SHARE_URL = "https://onezone.example.org/share/abc123"
+# DOI -> landing page -> share; the Zenodo DOI leads outside Onedata.
+REDIRECTS = {
+    "https://doi.org/10.5072/onedata": "https://landing.example.org/ds/1",
+    "https://landing.example.org/ds/1": SHARE_URL,
+    "https://doi.org/10.5072/mirror": SHARE_URL,
+    "https://doi.org/10.5281/zenodo.1": "https://zenodo.org/records/1",
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(onedata_shares, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def onezone(monkeypatch, clock):
+    """Fresh share cache, redirects from REDIRECTS and a stand-in call_rest_api; records every remote call."""
+    calls = []
+
+    def peek_redirect(url, deadline=None):
+        calls.append(("HEAD", url))
+        if url.endswith("/unreachable"):
+            return None, False
+        return REDIRECTS.get(url), True
+
+    def call_rest_api(onezone_domain, path, body_json=None, raise_for_status=True, failure_log_details=None,
+                      deadline=None):
+        calls.append(("GET", path))
+        if path.endswith("/public"):
+            return {"rootFileId": "file1", "spaceId": "space", "fileType": "REG"}
+        return {"fileId": "file1", "name": "data.csv", "size": 42}
+
+    monkeypatch.setattr(onedata_hugger, "onedata_share_cache",
+                        OnedataShareCache(ttl_seconds=600, negative_ttl_seconds=60))
+    monkeypatch.setattr(onedata_hugger, "_peek_redirect", peek_redirect)
+    monkeypatch.setattr(onedata_hugger, "call_rest_api", call_rest_api)
+    return calls
+
+
+def test_repeated_resolution_skips_the_redirect_walk(onezone):
+    share = onedata_hugger.find_share("10.5072/onedata", 100)
+    assert share == ("onezone.example.org", "abc123") and len(onezone) == 2
+    assert onedata_hugger.find_share("https://doi.org/10.5072/ONEDATA", 100) == share  # same PID, other spelling
+    assert len(onezone) == 2
+    assert onedata_hugger.onedata_share_cache.stats()["share_hits"] == 1
+
+
+def test_identifiers_outside_onedata_are_cached_for_the_negative_ttl(onezone, clock):
+    assert onedata_hugger.find_share("10.5281/zenodo.1", 100) is None
+    assert onedata_hugger.find_share("10.5281/zenodo.1", 100) is None
+    assert len(onezone) == 2  # DOI and Zenodo landing page, once
+    assert onedata_hugger.onedata_share_cache.stats()["negative_hits"] == 1
+
+    clock[0] += 61
+    assert onedata_hugger.find_share("10.5281/zenodo.1", 100) is None
+    assert len(onezone) == 4
+
+
+def test_failed_walks_are_not_cached(onezone):
+    assert onedata_hugger.find_share("https://landing.example.org/unreachable", 100) is None
+    assert onedata_hugger.onedata_share_cache.get_share("https://landing.example.org/unreachable") is MISSING
+    assert onedata_hugger.find_share("https://landing.example.org/unreachable", 100) is None
+    assert len(onezone) == 2
+
+
+def test_share_entries_expire_after_the_ttl(onezone, clock):
+    onedata_hugger.find_share("10.5072/onedata", 100)
+    clock[0] += 599
+    onedata_hugger.find_share("10.5072/onedata", 100)
+    assert len(onezone) == 2
+    clock[0] += 1
+    onedata_hugger.find_share("10.5072/onedata", 100)
+    assert len(onezone) == 4
+
+
+def test_identifiers_leading_to_the_same_share_fetch_its_public_document_once(onezone):
+    first = onedata_hugger.info("10.5072/onedata")
+    second = onedata_hugger.info("10.5072/mirror")
+    assert first.files == second.files and first.files[0]["name"] == "data.csv"
+    assert [call for call in onezone if call[0] == "GET"] == [
+        ("GET", "/shares/abc123/public"), ("GET", "/shares/data/file1"), ("GET", "/shares/data/file1")]
+    assert onedata_hugger.onedata_share_cache.stats()["public_hits"] == 1
@@ -0,0 +1,76 @@
+import time
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.api.v1 import pid_fetcher
+from src.filemetrix.services.pid_cache import PidCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """/batch with a stand-in resolver: `slow` takes 0.3s, `hang` 2s, `unsupported` and `broken` fail."""
+
+    def resolve(pid, deadline=None, onedata_fallback=True):
+        if pid.endswith("unsupported"):
+            raise LookupError(f"No repository for {pid}")
+        if pid.endswith("broken"):
+            raise RuntimeError("upstream returned garbage")
+        time.sleep({"slow": 0.3, "hang": 2}.get(pid.rsplit("/", 1)[-1], 0))
+        return SimpleNamespace(files=[{"name": f"{pid}.csv"}])
+
+    async def not_harvested(pid):
+        return None
+
+    monkeypatch.setattr(pid_fetcher, "datahugger", SimpleNamespace(RepositoryNotSupportedError=LookupError))
+    monkeypatch.setattr(pid_fetcher, "_resolve_metadata", resolve)
+    monkeypatch.setattr(pid_fetcher, "pid_cache", PidCache())
+    monkeypatch.setattr(pid_fetcher, "get_harvested_files", not_harvested)
+    monkeypatch.setattr(pid_fetcher, "PARTIAL_RESULT_GRACE_SECONDS", 0)
+    app = FastAPI()
+    app.include_router(pid_fetcher.router)
+    return TestClient(app)
+
+
+def _lines(response) -> list[dict]:
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [orjson.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_stream_in_completion_order(client):
+    response = client.post("/api/v1/batch", json=["10.5072/slow", "10.5072/fast"])
+    results = _lines(response)
+    assert [result["pid"] for result in results] == ["10.5072/fast", "10.5072/slow"]
+    assert results[0]["files"] == [{"name": "10.5072/fast.csv"}]
+    assert results[0]["cache"] == "MISS" and results[0]["duration"] < results[1]["duration"]
+
+
+def test_failures_are_reported_per_item(client):
+    response = client.post("/api/v1/batch", json={"pids": ["10.5072/unsupported", "10.5072/ok", "10.5072/broken"],
+                                                  "concurrency": 1})
+    results = {result["pid"]: result for result in _lines(response)}
+    assert response.status_code == 200 and len(results) == 3
+    assert results["10.5072/unsupported"]["error"] == "Repository not supported"
+    assert results["10.5072/broken"]["error"] == "Error fetching metadata"
+    assert "upstream returned garbage" in results["10.5072/broken"]["message"]
+    assert "error" not in results["10.5072/ok"] and len(results["10.5072/ok"]["files"]) == 1
+
+
+def test_unresolved_items_time_out_at_the_batch_deadline(client):
+    started = time.perf_counter()
+    response = client.post("/api/v1/batch", json=["10.5072/hang", "10.5072/fast"],
+                           headers={"X-Request-Timeout": "0.5"})
+    results = {result["pid"]: result for result in _lines(response)}
+    assert time.perf_counter() - started < 1.5
+    assert results["10.5072/hang"]["error"] == "Deadline exceeded"
+    assert "files" in results["10.5072/fast"]
+
+
+def test_malformed_batches_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(pid_fetcher, "BATCH_MAX_PIDS", 2)
+    assert client.post("/api/v1/batch", json={"pids": "10.5072/a"}).status_code == 400
+    assert client.post("/api/v1/batch", json=[1, 2]).status_code == 400
+    assert client.post("/api/v1/batch", json=["a", "b", "c"]).status_code == 400
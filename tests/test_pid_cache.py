@@ -0,0 +1,76 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.api.v1 import pid_fetcher
+from src.filemetrix.services.pid_cache import PidCache
+
+
+def _files(count: int) -> list[dict]:
+    return [{"name": f"part-{i}.csv"} for i in range(count)]
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = PidCache(ttl_seconds=0.2, cache_dir=str(tmp_path))
+    cache.put("doi:10.5072/ABC", _files(2))
+    assert cache.get("https://doi.org/10.5072/abc") == _files(2)
+    time.sleep(0.25)
+    assert cache.get("10.5072/abc") is None
+    assert cache.stats()["expired"] == 2  # memory and disk copy
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_least_recently_used_listing_is_evicted():
+    cache = PidCache(max_entries=2)
+    cache.put("10.5072/a", _files(1))
+    cache.put("10.5072/b", _files(1))
+    cache.get("10.5072/a")  # now b is the least recently used
+    cache.put("10.5072/c", _files(1))
+    assert cache.get("10.5072/b") is None
+    assert cache.get("10.5072/a") is not None and cache.get("10.5072/c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_is_bounded_by_total_files(tmp_path):
+    cache = PidCache(max_files=100, cache_dir=str(tmp_path))
+    cache.put("10.5072/a", _files(60))
+    cache.put("10.5072/b", _files(60))  # 120 files: a goes
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["files"] == 60 and stats["evictions"] == 1
+    cache.put("10.5072/huge", _files(500))  # larger than the whole budget: disk only
+    stats = cache.stats()
+    assert stats["too_large"] == 1 and stats["files"] == 60
+    assert len(cache.get("10.5072/huge")) == 500
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["files"] == 60
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def info(pid, options):
+        calls.append(pid)
+        return SimpleNamespace(files=_files(3))
+
+    monkeypatch.setattr(pid_fetcher, "datahugger", SimpleNamespace(info=info, RepositoryNotSupportedError=LookupError))
+    monkeypatch.setattr(pid_fetcher, "pid_cache", PidCache())
+
+    async def not_harvested(pid):
+        return None
+
+    monkeypatch.setattr(pid_fetcher, "get_harvested_files", not_harvested)
+    app = FastAPI()
+    app.include_router(pid_fetcher.router)
+    return TestClient(app), calls
+
+
+def test_no_cache_request_resolves_again(client):
+    client, calls = client
+    assert client.get("/api/v1/10.5072/cached").headers["X-Cache"] == "MISS"
+    assert client.get("/api/v1/10.5072/cached").headers["X-Cache"] == "HIT"
+    bypass = client.get("/api/v1/10.5072/cached", headers={"Cache-Control": "no-cache"})
+    assert bypass.headers["X-Cache"] == "BYPASS" and len(bypass.json()["files"]) == 3
+    assert len(calls) == 2
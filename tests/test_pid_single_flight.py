@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.filemetrix.api.v1 import pid_fetcher
+from src.filemetrix.infra.deadline import Deadline
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """Stand-in for _resolve_metadata: blocks until released, partial when it ran under a deadline."""
+    release = threading.Event()
+    calls = []
+
+    def resolve(pid, deadline=None, onedata_fallback=True):
+        calls.append(deadline)
+        release.wait(5)
+        return SimpleNamespace(files=["a", "b"] if deadline is None else ["a"], partial=deadline is not None)
+
+    monkeypatch.setattr(pid_fetcher, "_resolve_metadata", resolve)
+    return release, calls
+
+
+async def _resolve_concurrently(release, *deadlines):
+    tasks = []
+    for deadline in deadlines:
+        tasks.append(asyncio.create_task(pid_fetcher.resolve_metadata("10.5072/single-flight", deadline)))
+        await asyncio.sleep(0.05)  # let each request register (or join) before the next arrives
+    release.set()
+    return await asyncio.gather(*tasks)
+
+
+def test_callers_without_deadline_share_one_resolution(resolver):
+    release, calls = resolver
+    first, second = asyncio.run(_resolve_concurrently(release, None, None))
+    assert len(calls) == 1
+    assert first is second
+    assert not first.partial
+
+
+def test_caller_without_deadline_does_not_join_a_deadline_bound_resolution(resolver):
+    release, calls = resolver
+    short, unbounded = asyncio.run(_resolve_concurrently(release, Deadline(2), None))
+    assert len(calls) == 2
+    assert short.partial
+    assert not unbounded.partial
+    assert unbounded.files == ["a", "b"]
+
+
+def test_shorter_deadline_joins_a_longer_one(resolver):
+    release, calls = resolver
+    longer, shorter = asyncio.run(_resolve_concurrently(release, Deadline(30), Deadline(3)))
+    assert len(calls) == 1
+    assert longer is shorter
+    assert pid_fetcher.single_flight_stats()["in_flight"] == 0
+
+
+def test_one_timed_out_resolution_does_not_mark_another_partial(monkeypatch):
+    """A /batch shares one request deadline; each listing's `partial` reflects only its own resolution."""
+    slow_cut_short = threading.Event()
+
+    def resolve(pid, deadline=None, onedata_fallback=True):
+        if pid.endswith("slow"):
+            while not deadline.expired():
+                threading.Event().wait(0.01)
+            deadline.fail()  # the Onedata walk ran out of time
+            slow_cut_short.set()
+        else:
+            slow_cut_short.wait(5)  # finishes in time, but only after the slow one was cut short
+        return SimpleNamespace(files=["a"], partial=deadline.exceeded)
+
+    async def batch():
+        deadline = Deadline(0.3)
+        return await asyncio.gather(pid_fetcher.resolve_metadata("10.5072/slow", deadline),
+                                    pid_fetcher.resolve_metadata("10.5072/fast", deadline))
+
+    monkeypatch.setattr(pid_fetcher, "_resolve_metadata", resolve)
+    slow, fast = asyncio.run(batch())
+    assert slow.partial
+    assert not fast.partial
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.api.v1 import pid_fetcher
+from src.filemetrix.services.pid_cache import PidCache
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Live resolution through a stand-in datahugger: `10.5072/<n>` lists n files."""
+
+    def info(pid, options):
+        return SimpleNamespace(files=[{"name": f"part-{i}.csv", "size": i} for i in range(int(pid.rsplit("/", 1)[-1]))])
+
+    async def not_harvested(pid):
+        return None
+
+    monkeypatch.setattr(pid_fetcher, "datahugger", SimpleNamespace(info=info, RepositoryNotSupportedError=LookupError))
+    monkeypatch.setattr(pid_fetcher, "pid_cache", PidCache())
+    monkeypatch.setattr(pid_fetcher, "find_harvested_dataset_pid", not_harvested)
+    app = FastAPI()
+    app.include_router(pid_fetcher.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("count", [0, 1, 20000])
+def test_streamed_json_listing_is_valid(client, count):
+    for cache_status in ("MISS", "HIT"):  # live, then from the cache
+        response = client.get(f"/api/v1/10.5072/{count}", params={"stream": "true"})
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["X-Cache"] == cache_status
+        assert orjson.loads(response.content) == {"files": [{"name": f"part-{i}.csv", "size": i} for i in range(count)]}
+
+
+@pytest.mark.parametrize("count", [0, 1, 20000])
+def test_ndjson_listing_has_one_file_per_line(client, count):
+    response = client.get(f"/api/v1/10.5072/{count}", headers=NDJSON)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"name": f"part-{i}.csv", "size": i} for i in range(count)]
+
+
+async def _failing_listing():
+    yield {"name": "first.csv"}
+    raise ConnectionError("Onedata went away")
+
+
+async def _collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_listing_cut_short_is_still_valid_json_marked_partial():
+    listing = orjson.loads(asyncio.run(_collect(pid_fetcher._serialize_files(_failing_listing(), ndjson=False))))
+    assert listing == {"files": [{"name": "first.csv"}], "partial": True, "error": "Onedata went away"}
+    lines = asyncio.run(_collect(pid_fetcher._serialize_files(_failing_listing(), ndjson=True))).splitlines()
+    assert orjson.loads(lines[-1]) == {"partial": True, "error": "Onedata went away"}
+
+
+def test_client_disconnect_stops_fetching_pages():
+    fetched = []
+
+    def pages():
+        for number in range(100):
+            fetched.append(number)
+            yield [{"name": f"page-{number}-{i}.csv"} for i in range(10)]
+
+    async def read_then_disconnect():
+        body = pid_fetcher._serialize_files(pid_fetcher._iter_pages(pages()), ndjson=True)
+        received = [await anext(body) for _ in range(15)]  # one and a half pages
+        await body.aclose()  # what the server does when the client goes away
+        return received
+
+    received = asyncio.run(read_then_disconnect())
+    assert orjson.loads(received[-1]) == {"name": "page-1-4.csv"}
+    assert fetched == [0, 1]
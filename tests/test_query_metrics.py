@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.filemetrix.infra import query_metrics
+from src.filemetrix.infra.query_metrics import instrument_engine
+
+
+class AbortingCursor(sqlite3.Cursor):
+    """Postgres semantics on SQLite: after a failed statement, everything but a rollback fails."""
+
+    def execute(self, sql, parameters=()):
+        connection = self.connection
+        if connection.aborted and not sql.startswith("ROLLBACK"):
+            raise sqlite3.OperationalError("current transaction is aborted")
+        if sql.startswith("ROLLBACK"):
+            connection.aborted = False
+        if sql.startswith("EXPLAIN"):
+            connection.aborted = True
+            raise sqlite3.OperationalError("permission denied for EXPLAIN")
+        return super().execute(sql, parameters)
+
+
+class AbortingConnection(sqlite3.Connection):
+    aborted = False
+
+    def cursor(self, factory=AbortingCursor):
+        return super().cursor(factory)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(query_metrics, "SLOW_QUERY_SECONDS", 0.0)
+    monkeypatch.setattr(query_metrics, "EXPLAIN_SAMPLE_RATE", 1.0)
+    engine = create_engine("sqlite://", creator=lambda: sqlite3.connect(":memory:", factory=AbortingConnection))
+    instrument_engine(engine)
+    return engine
+
+
+def test_failed_explain_leaves_the_callers_transaction_usable(engine, caplog):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE dataset (pid TEXT)"))
+        conn.execute(text("INSERT INTO dataset VALUES ('10.5072/a')"))  # slow (threshold 0): EXPLAIN fails
+        conn.execute(text("INSERT INTO dataset VALUES ('10.5072/b')"))
+        assert conn.execute(text("SELECT count(*) FROM dataset")).scalar() == 2
+    assert "EXPLAIN failed: permission denied" in caplog.text
@@ -0,0 +1,45 @@
+import asyncio
+
+from src.filemetrix.services import re3data_registry as registry_module
+from src.filemetrix.services.re3data_registry import Re3dataRegistry
+
+
+class InlineThread:
+    """Runs the refresh on start(), so the test sees it finish before the next request."""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+def test_failed_refresh_is_not_retried_within_retry_seconds(monkeypatch):
+    registry = Re3dataRegistry(url="http://re3data.invalid/api", cache_file=None)
+    attempts = []
+    monkeypatch.setattr(registry, "refresh", lambda: attempts.append(1))
+    monkeypatch.setattr(registry_module.threading, "Thread", InlineThread)
+
+    registry.ensure_fresh()
+    registry.ensure_fresh()  # the first attempt finished (and failed); still inside RETRY_SECONDS
+    assert len(attempts) == 1
+
+    registry._last_attempt -= registry_module.RETRY_SECONDS
+    registry.ensure_fresh()
+    assert len(attempts) == 2
+
+
+def test_stop_cancels_the_periodic_refresh(monkeypatch):
+    registry = Re3dataRegistry(url="http://re3data.invalid/api", cache_file=None)
+    monkeypatch.setattr(registry, "ensure_fresh", lambda: None)
+
+    async def run():
+        registry.start()
+        task = registry._task
+        await asyncio.sleep(0)
+        await registry.stop()
+        return task
+
+    task = asyncio.run(run())
+    assert task.cancelled()
+    assert registry._task is None
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.api.v1 import repo_metrics
+from src.filemetrix.services import data_versions as data_versions_module
+from src.filemetrix.services.data_versions import DataVersions
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Versions and counts come from `rows` and `latest_file_id`; `queries` counts the metric aggregations."""
+    db = {
+        # repo_id, ds_start, ds_end, ds_status, newest dataset id, fm_start, fm_end, file harvest in progress
+        "rows": [(1, datetime(2024, 5, 1, 10), datetime(2024, 5, 1, 11), "completed", 40,
+                  datetime(2024, 5, 2, 9), datetime(2024, 5, 2, 10), False)],
+        "latest_file_id": 900,
+        "queries": 0,
+    }
+
+    async def repo_data_versions():
+        return db["rows"]
+
+    async def latest_file_metadata_id():
+        return db["latest_file_id"]
+
+    async def dataset_count():
+        db["queries"] += 1
+        return 40
+
+    async def repo_count():
+        return 1
+
+    monkeypatch.setattr(data_versions_module, "get_repo_data_versions_async", repo_data_versions)
+    monkeypatch.setattr(data_versions_module, "get_latest_file_metadata_id_async", latest_file_metadata_id)
+    monkeypatch.setattr(repo_metrics, "data_versions", DataVersions(ttl_seconds=0))
+    monkeypatch.setattr(repo_metrics, "get_dataset_count_async", dataset_count)
+    monkeypatch.setattr(repo_metrics, "get_repo_count_async", repo_count)
+    return db
+
+
+@pytest.fixture
+def client(database):
+    app = FastAPI()
+    app.include_router(repo_metrics.router)
+    return TestClient(app)
+
+
+def test_current_etag_is_not_modified_without_querying(client, database):
+    response = client.get("/api/v1/dataset/count")
+    assert response.status_code == 200 and response.json()["total-datasets"] == 40
+    revalidated = client.get("/api/v1/dataset/count", headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+    assert database["queries"] == 1
+
+
+def test_if_modified_since_last_harvest_is_not_modified(client, database):
+    last_modified = client.get("/api/v1/dataset/count").headers["Last-Modified"]
+    assert client.get("/api/v1/dataset/count", headers={"If-Modified-Since": last_modified}).status_code == 304
+    older = "Wed, 01 May 2024 00:00:00 GMT"
+    assert client.get("/api/v1/dataset/count", headers={"If-Modified-Since": older}).status_code == 200
+    assert database["queries"] == 2
+
+
+def test_no_if_modified_since_304_while_files_are_harvested(client, database):
+    last_modified = client.get("/api/v1/dataset/count").headers["Last-Modified"]
+    repo_id, ds_start, ds_end, ds_status, dataset_id, fm_start, _, _ = database["rows"][0]
+    database["rows"] = [(repo_id, ds_start, ds_end, ds_status, dataset_id, fm_start, None, True)]
+    # File rows arrive without a newer timestamp, so Last-Modified cannot tell the copy is stale.
+    assert client.get("/api/v1/dataset/count", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_etag_changes_when_rows_are_added(client, database):
+    etag = client.get("/api/v1/dataset/count").headers["ETag"]
+    repo_id, ds_start, ds_end, ds_status, _, fm_start, _, _ = database["rows"][0]
+    database["rows"] = [(repo_id, ds_start, ds_end, ds_status, 40, fm_start, None, True)]
+    harvesting = client.get("/api/v1/dataset/count", headers={"If-None-Match": etag})
+    assert harvesting.status_code == 200 and harvesting.headers["ETag"] != etag
+
+    database["latest_file_id"] += 250  # more file rows, same timestamps
+    more_files = client.get("/api/v1/dataset/count", headers={"If-None-Match": harvesting.headers["ETag"]})
+    assert more_files.status_code == 200 and more_files.headers["ETag"] != harvesting.headers["ETag"]
+
+    database["rows"] = [(repo_id, ds_start, ds_end, ds_status, 41, fm_start, None, True)]  # a new dataset
+    new_dataset = client.get("/api/v1/dataset/count", headers={"If-None-Match": more_files.headers["ETag"]})
+    assert new_dataset.status_code == 200 and new_dataset.headers["ETag"] != more_files.headers["ETag"]
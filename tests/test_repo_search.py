@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.api.v1 import repo_discovery
+from src.filemetrix.services.re3data_registry import Re3dataRegistry
+
+REPOS = [{"id": f"r3d{i:03}", "name": f"Data Archive {i:03}", "doi": f"10.17616/R3{i:03}"} for i in range(7)]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Re3dataRegistry(url="http://re3data.invalid/api", cache_file=None)
+    registry._install(list(REPOS), time.time(), None, None)
+    monkeypatch.setattr(repo_discovery, "re3data_registry", registry)
+    return registry
+
+
+@pytest.fixture
+def client(registry):
+    app = FastAPI()
+    app.include_router(repo_discovery.router)
+    return TestClient(app)
+
+
+def _page(client, **params) -> dict:
+    response = client.get("/api/v1/repositories/search", params={"q": "data archive", "limit": 3, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cursor_pages_through_every_result_once(client):
+    pages = [_page(client)]
+    while pages[-1]["next_cursor"]:
+        pages.append(_page(client, cursor=pages[-1]["next_cursor"]))
+    assert [len(page["items"]) for page in pages] == [3, 3, 1]
+    assert [item["id"] for page in pages for item in page["items"]] == [repo["id"] for repo in REPOS]
+    assert all(page["total"] == 7 for page in pages)
+
+
+def test_cursor_stays_valid_when_the_catalogue_changes(client, registry):
+    first = _page(client)
+    # A refresh adds a repository sorting before the cursor and drops one after it.
+    registry._install([{"id": "r3d999", "name": "Data Archive 000a"}] + REPOS[:4] + REPOS[5:], time.time(), None, None)
+    second = _page(client, cursor=first["next_cursor"])
+    assert [item["id"] for item in second["items"]] == ["r3d003", "r3d005", "r3d006"]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24=", "WzEsICJhIl0="])  # junk, "not json", [1, "a"]
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get("/api/v1/repositories/search", params={"q": "data", "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_unchanged_results_are_not_modified(client, registry):
+    response = client.get("/api/v1/repositories/search", params={"q": "archive"})
+    etag = response.headers["ETag"]
+    revalidated = client.get("/api/v1/repositories/search", params={"q": "archive"}, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+    other_query = client.get("/api/v1/repositories/search", params={"q": "data"}, headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    registry._install(REPOS[:3], time.time(), None, None)
+    changed = client.get("/api/v1/repositories/search", params={"q": "archive"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["total"] == 3
+    assert changed.headers["ETag"] != etag
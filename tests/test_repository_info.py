@@ -0,0 +1,71 @@
+import asyncio
+import socket
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.filemetrix.api.v1 import pid_fetcher
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(pid_fetcher, "REPOSITORY_INFO_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(pid_fetcher.re3data_registry, "ensure_fresh", lambda: None)
+    monkeypatch.setattr(type(pid_fetcher.re3data_registry), "loaded", property(lambda self: True))
+    monkeypatch.setattr(pid_fetcher.re3data_registry, "find_by_name", lambda name: {"id": "r3d100000001"})
+    app = FastAPI()
+    app.include_router(pid_fetcher.router)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def _publisher_lookup(monkeypatch, seconds: float):
+    def get_datapublisher_from_doi(doi):
+        time.sleep(seconds)
+        return "Example Archive"
+
+    monkeypatch.setattr(pid_fetcher, "datahugger_utils", SimpleNamespace(get_datapublisher_from_doi=get_datapublisher_from_doi))
+
+
+async def _get(app, *paths):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await asyncio.gather(*(client.get(path) for path in paths))
+
+
+def test_slow_publisher_lookup_times_out_without_blocking_other_requests(app, monkeypatch):
+    _publisher_lookup(monkeypatch, 1.0)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            info = asyncio.create_task(client.get("/api/v1/repository-info/10.5072/slow"))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            ping = await client.get("/ping")
+            return ping, time.perf_counter() - start, await info
+
+    ping, ping_seconds, info = asyncio.run(scenario())
+    assert ping.status_code == 200 and ping_seconds < 0.2
+    assert info.status_code == 504
+
+
+def test_unresponsive_oai_endpoint_times_out(app, monkeypatch):
+    _publisher_lookup(monkeypatch, 0.0)
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    oai = f"http://127.0.0.1:{server.getsockname()[1]}/oai"
+    monkeypatch.setattr(pid_fetcher.re3data_details, "get", lambda r3id: {"repository": {"oai": oai}})
+    try:
+        start = time.perf_counter()
+        (response,) = asyncio.run(_get(app, "/api/v1/repository-info/10.5072/silent"))
+    finally:
+        server.close()
+    assert response.status_code == 504
+    assert time.perf_counter() - start < 2
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.filemetrix.infra.deadline import Deadline, DeadlineExceeded
+from src.filemetrix.services.resolver_pool import ResolverBusyError, ResolverPool
+
+
+async def _burst(pool: ResolverPool, size: int, release: threading.Event, **kwargs) -> list:
+    tasks = [asyncio.create_task(pool.run(release.wait, 5, **kwargs)) for _ in range(size)]
+    await asyncio.sleep(0.1)
+    release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_burst_beyond_workers_and_queue_is_rejected():
+    pool = ResolverPool(max_workers=2, max_queue=3)
+    results = asyncio.run(_burst(pool, 9, threading.Event()))
+    assert sum(isinstance(result, ResolverBusyError) for result in results) == 4
+    assert results.count(True) == 5
+    stats = pool.stats()
+    assert stats["rejected"] == 4 and stats["queued"] == 0 and stats["running"] == 0
+
+
+def test_queued_call_whose_deadline_passed_is_not_run():
+    pool = ResolverPool(max_workers=1, max_queue=2)
+    started = []
+
+    async def scenario():
+        release = threading.Event()
+        busy = asyncio.create_task(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(pool.run(started.append, "late", deadline=Deadline(0.1)))
+        await asyncio.sleep(0.3)  # the deadline passes while the only thread is taken
+        release.set()
+        await busy
+        with pytest.raises(DeadlineExceeded):
+            await waiting
+
+    asyncio.run(scenario())
+    assert started == []
+    assert pool.stats()["expired"] == 1
+
+
+def test_abandoned_running_call_keeps_its_thread_until_it_returns():
+    pool = ResolverPool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.create_task(pool.run(release.wait, 5, deadline=Deadline(0.1)))
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(asyncio.shield(running), 0.2)  # the caller gives up
+        with pytest.raises(ResolverBusyError):
+            await pool.run(release.wait, 5)  # still counted: the resolver cannot be interrupted
+        release.set()
+        await running
+        assert await pool.run(lambda: "free again") == "free again"
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.filemetrix.infra.db import HarvestStatus, RepositoryModel
+from src.filemetrix.infra.responses import JSONResponse, add_compression, dumps
+
+
+def test_dumps_encodes_rows_and_datetimes():
+    repo = RepositoryModel(id=1, name="Repo", url="https://repo.example.org/oai", metadata_prefix="oai_dc",
+                           harvest_ds_start=datetime(2024, 1, 1, 12), harvest_ds_status=HarvestStatus.COMPLETED)
+    data = orjson.loads(dumps({"repos": [repo], "size": Decimal(10), 2: "int key"}))
+    assert data["repos"][0]["harvest_ds_start"] == "2024-01-01T12:00:00"
+    assert data["repos"][0]["harvest_ds_status"] == "completed"
+    assert data["size"] == 10 and data["2"] == "int key"
+
+
+def test_large_responses_are_compressed_as_the_client_accepts():
+    app = FastAPI(default_response_class=JSONResponse)
+    add_compression(app)
+
+    @app.get("/files")
+    async def files():
+        return JSONResponse(content={"files": [{"name": f"part-{i}.csv", "size": i} for i in range(500)]})
+
+    client = TestClient(app)
+    assert client.get("/files", headers={"Accept-Encoding": "br, gzip"}).headers["content-encoding"] == "br"
+    assert client.get("/files", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    plain = client.get("/files", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and len(plain.json()["files"]) == 500
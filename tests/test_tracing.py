@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy import create_engine, text
+
+from src.filemetrix.api.v1 import pid_fetcher
+from src.filemetrix.infra import tracing
+from src.filemetrix.infra.query_metrics import instrument_engine
+
+
+class RepositoryNotSupportedError(Exception):
+    pass
+
+
+@pytest.fixture
+def traced_app(monkeypatch):
+    # setup_tracing replaces the module-level tracer; restore it for the other tests.
+    monkeypatch.setattr(tracing, "_tracer", tracing._tracer)
+    exporter = InMemorySpanExporter()
+    app = FastAPI()
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    @app.get("/health")
+    async def health():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"status": "ok"}
+
+    @app.get("/sql")
+    def sql():
+        with engine.connect() as conn:
+            return {"value": conn.execute(text("SELECT 1")).scalar()}
+
+    app.include_router(pid_fetcher.router)
+    tracing.setup_tracing(app, exporter=exporter, sample_ratio=1.0)
+
+    files = [{"name": "a.csv", "size": 1}]
+    monkeypatch.setattr(pid_fetcher, "datahugger", SimpleNamespace(
+        info=lambda pid, options: SimpleNamespace(files=files),
+        RepositoryNotSupportedError=RepositoryNotSupportedError,
+    ))
+    monkeypatch.setattr(pid_fetcher.pid_cache, "put", lambda pid, files: None)
+    return TestClient(app), exporter
+
+
+def _spans(exporter):
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def test_request_and_sql_spans(traced_app):
+    client, exporter = traced_app
+    assert client.get("/sql").json() == {"value": 1}
+    spans = _spans(exporter)
+    sql = spans["SQL SELECT"]
+    request = spans["GET /sql"]
+    assert sql.attributes["db.statement"] == "SELECT 1"
+    assert sql.context.trace_id == request.context.trace_id
+
+
+def test_resolver_span_nests_under_request(traced_app):
+    client, exporter = traced_app
+    # no-cache skips the PID cache and the harvested-files lookup, so the resolver runs.
+    response = client.get("/api/v1/10.5072/health-metrics", headers={"Cache-Control": "no-cache"})
+    assert response.status_code == 200
+    assert response.json() == {"files": [{"name": "a.csv", "size": 1}]}
+    spans = _spans(exporter)
+    resolver = spans["datahugger.info"]
+    request = spans["GET /api/v1/{pid:path}"]
+    assert resolver.attributes["filemetrix.pid"] == "10.5072/health-metrics"
+    assert resolver.context.trace_id == request.context.trace_id
+
+
+def test_probes_are_not_traced(traced_app):
+    client, exporter = traced_app
+    assert client.get("/health").status_code == 200
+    assert not [name for name in _spans(exporter) if name.startswith("GET ")]